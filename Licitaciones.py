@@ -1,11 +1,33 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-from datetime import datetime, timedelta
-import re
+from datetime import datetime
+import io
+import os
+import threading
+import time
 import warnings
 warnings.filterwarnings('ignore')
 
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+from almacen import RUTA_ALMACEN, actualizar_stock, filas_con_texto, importar_archivo, info_almacen, leer_inventario
+from asignacion import POLITICAS_ASIGNACION, POLITICAS_SECUENCIALES, asignar_stock
+from carga import ORIGEN_TABLAS, cargar_concurrentemente, huella_contenido, leer_tabla, leer_tabla_por_bloques
+from catalogo import DIRECTORIO_CACHE, cargar_catalogo
+from esquema import ESQUEMA_DOCUMENTOS, ESQUEMA_INVENTARIO, ESQUEMA_LICITACIONES, preparar_documentos, preparar_licitaciones
+from exportacion import (
+    FORMATOS_EXPORTACION, TABLAS_EXPORTACION, exportar_en_cache, formatos_disponibles, tablas_analisis,
+    tablas_archivo_resultados
+)
+from extraccion import extraer_productos_medicos
+from instrumentacion import acumular, activar, estadisticas, medir, reiniciar, tabla_tiempos
+from motor import (
+    MINIMO_LICITACIONES_POR_TRABAJADOR, buscar_en_inventario, construir_indice_documentos, construir_indice_inventario,
+    escribir_resultados_por_bloques, evaluar_licitaciones, evaluar_por_bloques, firmas_productos, indice_a_fecha,
+    procesadores_disponibles, productos_por_licitacion, reevaluar_licitaciones, tabla_resultados
+)
+from registros import ProductoExtraido
+
 # Configuración de la página
 st.set_page_config(
     page_title="Sistema de Licitaciones Médicas",
@@ -13,921 +35,187 @@ st.set_page_config(
     layout="wide"
 )
 
-def normalizar_texto(texto):
-    """Normaliza texto para búsqueda"""
-    if pd.isna(texto) or texto is None:
-        return ""
-    
-    texto_str = str(texto).lower()
-    # Eliminar acentos básicos
-    acentos = {'á': 'a', 'é': 'e', 'í': 'i', 'ó': 'o', 'ú': 'u', 'ñ': 'n'}
-    for acento, sin_acento in acentos.items():
-        texto_str = texto_str.replace(acento, sin_acento)
-    
-    # Limpiar caracteres especiales
-    texto_str = re.sub(r'[^\w\s]', ' ', texto_str)
-    texto_str = re.sub(r'\s+', ' ', texto_str)
-    
-    return texto_str.strip()
+# Archivos leídos y preparados que se conservan entre reruns (por tipo de archivo)
+MAXIMO_ARCHIVOS_EN_CACHE = 8
 
-def clasificar_producto_medico(nombre):
-    """Clasifica productos médicos expandido"""
-    nombre_lower = nombre.lower()
-    
-    # Mapeo expandido de productos médicos
-    productos_medicos = {
-        # ANALGÉSICOS
-        'paracetamol': ['paracetamol', 'acetaminofen'],
-        'ibuprofeno': ['ibuprofeno', 'advil'],
-        'aspirina': ['aspirina', 'acido acetilsalicilico'],
-        'diclofenaco': ['diclofenaco', 'voltaren'],
-        'naproxeno': ['naproxeno'],
-        'ketorolaco': ['ketorolaco'],
-        'metamizol': ['metamizol', 'dipirona'],
-        'celecoxib': ['celecoxib'],
-        'meloxicam': ['meloxicam'],
-        
-        # ANTIBIÓTICOS
-        'amoxicilina': ['amoxicilina', 'amoxil'],
-        'ampicilina': ['ampicilina'],
-        'penicilina': ['penicilina'],
-        'cefalexina': ['cefalexina', 'keflex'],
-        'ciprofloxacino': ['ciprofloxacino', 'cipro'],
-        'levofloxacino': ['levofloxacino'],
-        'azitromicina': ['azitromicina', 'zitromax'],
-        'claritromicina': ['claritromicina'],
-        'eritromicina': ['eritromicina'],
-        'clindamicina': ['clindamicina'],
-        'metronidazol': ['metronidazol'],
-        'trimetoprima': ['trimetoprima', 'sulfametoxazol', 'bactrim'],
-        'doxiciclina': ['doxiciclina'],
-        'tetraciclina': ['tetraciclina'],
-        'ceftriaxona': ['ceftriaxona'],
-        'cefuroxima': ['cefuroxima'],
-        'vancomicina': ['vancomicina'],
-        'lincomicina': ['lincomicina'],
-        
-        # ANTIVIRALES
-        'aciclovir': ['aciclovir', 'zovirax'],
-        'oseltamivir': ['oseltamivir', 'tamiflu'],
-        'ribavirina': ['ribavirina'],
-        'ganciclovir': ['ganciclovir'],
-        'valaciclovir': ['valaciclovir'],
-        'zidovudina': ['zidovudina', 'azt'],
-        
-        # ANTIFÚNGICOS
-        'fluconazol': ['fluconazol'],
-        'itraconazol': ['itraconazol'],
-        'ketoconazol': ['ketoconazol'],
-        'nistatina': ['nistatina'],
-        'anfotericina': ['anfotericina'],
-        'terbinafina': ['terbinafina'],
-        
-        # VACUNAS
-        'vacuna_influenza': ['vacuna influenza', 'vacuna gripe', 'influenza'],
-        'vacuna_covid': ['vacuna covid', 'covid', 'coronavirus'],
-        'vacuna_hepatitis': ['vacuna hepatitis', 'hepatitis'],
-        'vacuna_tetano': ['vacuna tetano', 'tetano'],
-        'vacuna_sarampion': ['vacuna sarampion', 'sarampion'],
-        'vacuna_bcg': ['bcg', 'tuberculosis'],
-        'vacuna_neumococo': ['neumococo', 'pneumococo'],
-        
-        # CARDIOVASCULARES
-        'losartan': ['losartan', 'cozaar'],
-        'enalapril': ['enalapril'],
-        'captopril': ['captopril'],
-        'amlodipino': ['amlodipino'],
-        'nifedipino': ['nifedipino'],
-        'atenolol': ['atenolol'],
-        'metoprolol': ['metoprolol'],
-        'propranolol': ['propranolol'],
-        'carvedilol': ['carvedilol'],
-        'furosemida': ['furosemida', 'lasix'],
-        'hidroclorotiazida': ['hidroclorotiazida', 'hctz'],
-        'espironolactona': ['espironolactona'],
-        'digoxina': ['digoxina'],
-        'warfarina': ['warfarina'],
-        'clopidogrel': ['clopidogrel', 'plavix'],
-        'simvastatina': ['simvastatina'],
-        'atorvastatina': ['atorvastatina'],
-        'rosuvastatina': ['rosuvastatina'],
-        
-        # GASTROINTESTINALES
-        'omeprazol': ['omeprazol', 'prilosec'],
-        'lansoprazol': ['lansoprazol'],
-        'pantoprazol': ['pantoprazol'],
-        'ranitidina': ['ranitidina'],
-        'cimetidina': ['cimetidina'],
-        'sucralfato': ['sucralfato'],
-        'domperidona': ['domperidona'],
-        'metoclopramida': ['metoclopramida'],
-        'loperamida': ['loperamida'],
-        'lactulosa': ['lactulosa'],
-        'simeticona': ['simeticona'],
-        
-        # DIABETES
-        'metformina': ['metformina', 'glucophage'],
-        'glibenclamida': ['glibenclamida'],
-        'gliclazida': ['gliclazida'],
-        'insulina': ['insulina'],
-        'insulina_rapida': ['insulina rapida', 'insulina cristalina'],
-        'insulina_nph': ['insulina nph', 'insulina intermedia'],
-        'insulina_lenta': ['insulina lenta', 'insulina glargina'],
-        
-        # RESPIRATORIOS
-        'salbutamol': ['salbutamol', 'ventolin'],
-        'bromuro_ipratropio': ['ipratropio', 'atrovent'],
-        'budesonida': ['budesonida'],
-        'beclometasona': ['beclometasona'],
-        'prednisolona': ['prednisolona'],
-        'prednisona': ['prednisona'],
-        'dexametasona': ['dexametasona'],
-        'hidrocortisona': ['hidrocortisona'],
-        'teofilina': ['teofilina'],
-        'montelukast': ['montelukast'],
-        
-        # NEUROLÓGICOS Y PSIQUIÁTRICOS
-        'fenitoina': ['fenitoina'],
-        'carbamazepina': ['carbamazepina'],
-        'acido_valproico': ['acido valproico', 'valproato'],
-        'levodopa': ['levodopa'],
-        'haloperidol': ['haloperidol'],
-        'clorpromazina': ['clorpromazina'],
-        'risperidona': ['risperidona'],
-        'olanzapina': ['olanzapina'],
-        'quetiapina': ['quetiapina'],
-        'fluoxetina': ['fluoxetina', 'prozac'],
-        'sertralina': ['sertralina'],
-        'paroxetina': ['paroxetina'],
-        'amitriptilina': ['amitriptilina'],
-        'diazepam': ['diazepam', 'valium'],
-        'lorazepam': ['lorazepam'],
-        'clonazepam': ['clonazepam'],
-        'alprazolam': ['alprazolam'],
-        
-        # ANESTÉSICOS Y OPIOIDES
-        'morfina': ['morfina'],
-        'tramadol': ['tramadol'],
-        'codeina': ['codeina'],
-        'fentanilo': ['fentanilo'],
-        'lidocaina': ['lidocaina'],
-        'bupivacaina': ['bupivacaina'],
-        'procaina': ['procaina'],
-        
-        # HORMONAS
-        'levotiroxina': ['levotiroxina', 'eutirox'],
-        'metimazol': ['metimazol'],
-        'propiltiouracilo': ['propiltiouracilo'],
-        'estradiol': ['estradiol'],
-        'progesterona': ['progesterona'],
-        'testosterona': ['testosterona'],
-        
-        # SUEROS Y SOLUCIONES
-        'suero_fisiologico': ['suero fisiologico', 'solucion salina', 'nacl', 'cloruro sodio', 'suero'],
-        'dextrosa': ['dextrosa', 'glucosa'],
-        'hartmann': ['hartmann', 'lactato ringer', 'ringer'],
-        'agua_inyectable': ['agua inyectable', 'agua destilada'],
-        'bicarbonato_sodio': ['bicarbonato sodio', 'bicarbonato'],
-        'albumina': ['albumina'],
-        'plasma': ['plasma'],
-        
-        # MATERIAL DE CURACIÓN
-        'gasas': ['gasas', 'gasa', 'compresas', 'gasas esteriles'],
-        'vendas': ['vendas', 'venda', 'vendaje', 'vendas elasticas'],
-        'alcohol': ['alcohol', 'alcohol etilico', 'alcohol 70'],
-        'yodo': ['yodo', 'povidona yodada', 'isodine', 'betadine'],
-        'agua_oxigenada': ['agua oxigenada', 'peroxido hidrogeno'],
-        'algodon': ['algodon', 'torundas', 'hisopos'],
-        'suturas': ['suturas', 'sutura', 'hilo quirurgico'],
-        'apositos': ['apositos', 'aposito', 'curita', 'parches'],
-        'esparadrapo': ['esparadrapo', 'cinta adhesiva', 'tape'],
-        
-        # DISPOSITIVOS MÉDICOS
-        'jeringas': ['jeringas', 'jeringa', 'jeringuilla'],
-        'agujas': ['agujas', 'aguja', 'agujas hipodermicas'],
-        'cateter': ['cateter', 'sonda', 'canula'],
-        'scalp': ['scalp', 'mariposa', 'butterfly'],
-        'sondas_foley': ['sonda foley', 'foley'],
-        'sondas_nasogastricas': ['sonda nasogastrica', 'levine'],
-        'tubos_endotraqueales': ['tubo endotraqueal', 'tubo orotraqueal'],
-        
-        # EQUIPO DE PROTECCIÓN PERSONAL
-        'guantes_latex': ['guantes latex', 'guantes'],
-        'guantes_nitrilo': ['guantes nitrilo'],
-        'guantes_vinilo': ['guantes vinilo'],
-        'mascarillas': ['mascarillas', 'mascarilla', 'cubrebocas'],
-        'mascarillas_n95': ['mascarilla n95', 'n95', 'respirador'],
-        'batas': ['batas', 'bata', 'bata quirurgica'],
-        'gorros': ['gorros', 'gorro', 'gorro quirurgico'],
-        'botas': ['botas', 'cubre calzado'],
-        'gafas_proteccion': ['gafas proteccion', 'lentes proteccion'],
-        
-        # EQUIPOS MÉDICOS
-        'termometro': ['termometro', 'termometro digital'],
-        'estetoscopio': ['estetoscopio', 'fonendoscopio'],
-        'tensiometro': ['tensiometro', 'baumanometro', 'esfigmomanometro'],
-        'oximetro': ['oximetro', 'pulsioximetro', 'saturometro'],
-        'glucometro': ['glucometro', 'medidor glucosa'],
-        'otoscopio': ['otoscopio'],
-        'oftalmoscopio': ['oftalmoscopio'],
-        'laringoscopio': ['laringoscopio'],
-        'desfibrilador': ['desfibrilador'],
-        'electrocardiografo': ['electrocardiografo', 'ecg', 'ekg'],
-        'monitor_signos': ['monitor signos vitales', 'monitor paciente'],
-        'ventilador': ['ventilador mecanico', 'respirador'],
-        'bomba_infusion': ['bomba infusion', 'bomba volumetrica'],
-        'aspiradora': ['aspiradora', 'succionador'],
-        'microscopio': ['microscopio', 'microscopio optico'],
-        'centrifuga': ['centrifuga', 'centrifugadora'],
-        'autoclave': ['autoclave', 'esterilizador'],
-        'incubadora': ['incubadora'],
-        'refrigerador': ['refrigerador', 'nevera', 'congelador'],
-        
-        # INSTRUMENTAL QUIRÚRGICO
-        'bisturi': ['bisturi', 'escalpelo', 'hoja bisturi'],
-        'pinzas': ['pinzas', 'forceps', 'pinzas quirurgicas'],
-        'tijeras': ['tijeras', 'tijeras quirurgicas'],
-        'hemostatos': ['hemostatos', 'kelly', 'mosquito'],
-        'separadores': ['separadores', 'retractores'],
-        'portaagujas': ['portaagujas', 'porta agujas'],
-        'clamps': ['clamps', 'pinzas vasculares'],
-        'especulos': ['especulo', 'especulos'],
-        
-        # PRODUCTOS DE LIMPIEZA
-        'cloro': ['cloro', 'hipoclorito', 'hipoclorito sodio'],
-        'desinfectante': ['desinfectante', 'germicida'],
-        'alcohol_gel': ['alcohol gel', 'gel antibacterial'],
-        'glutaraldehido': ['glutaraldehido'],
-        'formaldehido': ['formaldehido', 'formol'],
-        'detergente': ['detergente', 'jabon', 'detergente enzimatico'],
-        
-        # OXÍGENO Y GASES
-        'oxigeno': ['oxigeno', 'o2'],
-        'tanque_oxigeno': ['tanque oxigeno', 'cilindro oxigeno'],
-        'concentrador_oxigeno': ['concentrador oxigeno'],
-        'regulador_oxigeno': ['regulador oxigeno', 'manometro'],
-        'mascarilla_oxigeno': ['mascarilla oxigeno'],
-        'canula_nasal': ['canula nasal', 'puntas nasales']
-    }
-    
-    # Buscar coincidencia exacta o parcial
-    for producto, variantes in productos_medicos.items():
-        if any(variante in nombre_lower for variante in variantes):
-            return producto
-    
-    # Búsqueda adicional por sufijos farmacéuticos comunes
-    sufijos_farmaceuticos = {
-        'cilina': 'antibiotico',
-        'floxacino': 'antibiotico',
-        'micina': 'antibiotico',
-        'prazol': 'inhibidor_bomba_protones',
-        'sartan': 'antihipertensivo',
-        'pril': 'antihipertensivo',
-        'olol': 'betabloqueador',
-        'statina': 'estatina',
-        'pine': 'bloqueador_calcio',
-        'zole': 'antifungico',
-        'vir': 'antiviral'
-    }
-    
-    for sufijo, categoria in sufijos_farmaceuticos.items():
-        if sufijo in nombre_lower:
-            return categoria
-    
-    return None
+# Licitaciones leídas y evaluadas por bloque en el modo streaming
+FILAS_POR_BLOQUE = 5000
 
-def determinar_categoria(producto):
-    """Determina la categoría médica del producto"""
-    categorias = {
-        # ANALGÉSICOS
-        'paracetamol': 'Analgésicos', 'ibuprofeno': 'Analgésicos', 'aspirina': 'Analgésicos',
-        'diclofenaco': 'Analgésicos', 'naproxeno': 'Analgésicos', 'ketorolaco': 'Analgésicos',
-        'metamizol': 'Analgésicos', 'celecoxib': 'Analgésicos', 'meloxicam': 'Analgésicos',
-        
-        # ANTIBIÓTICOS
-        'amoxicilina': 'Antibióticos', 'ampicilina': 'Antibióticos', 'penicilina': 'Antibióticos',
-        'cefalexina': 'Antibióticos', 'ciprofloxacino': 'Antibióticos', 'levofloxacino': 'Antibióticos',
-        'azitromicina': 'Antibióticos', 'claritromicina': 'Antibióticos', 'eritromicina': 'Antibióticos',
-        'clindamicina': 'Antibióticos', 'metronidazol': 'Antibióticos', 'trimetoprima': 'Antibióticos',
-        'doxiciclina': 'Antibióticos', 'tetraciclina': 'Antibióticos', 'ceftriaxona': 'Antibióticos',
-        'cefuroxima': 'Antibióticos', 'vancomicina': 'Antibióticos', 'lincomicina': 'Antibióticos',
-        'antibiotico': 'Antibióticos',
-        
-        # ANTIVIRALES
-        'aciclovir': 'Antivirales', 'oseltamivir': 'Antivirales', 'ribavirina': 'Antivirales',
-        'ganciclovir': 'Antivirales', 'valaciclovir': 'Antivirales', 'zidovudina': 'Antivirales',
-        'antiviral': 'Antivirales',
-        
-        # ANTIFÚNGICOS
-        'fluconazol': 'Antifúngicos', 'itraconazol': 'Antifúngicos', 'ketoconazol': 'Antifúngicos',
-        'nistatina': 'Antifúngicos', 'anfotericina': 'Antifúngicos', 'terbinafina': 'Antifúngicos',
-        'antifungico': 'Antifúngicos',
-        
-        # VACUNAS
-        'vacuna_influenza': 'Vacunas', 'vacuna_covid': 'Vacunas', 'vacuna_hepatitis': 'Vacunas',
-        'vacuna_tetano': 'Vacunas', 'vacuna_sarampion': 'Vacunas', 'vacuna_bcg': 'Vacunas',
-        'vacuna_neumococo': 'Vacunas',
-        
-        # CARDIOVASCULARES
-        'losartan': 'Cardiovasculares', 'enalapril': 'Cardiovasculares', 'captopril': 'Cardiovasculares',
-        'amlodipino': 'Cardiovasculares', 'nifedipino': 'Cardiovasculares', 'atenolol': 'Cardiovasculares',
-        'metoprolol': 'Cardiovasculares', 'propranolol': 'Cardiovasculares', 'carvedilol': 'Cardiovasculares',
-        'furosemida': 'Cardiovasculares', 'hidroclorotiazida': 'Cardiovasculares', 'espironolactona': 'Cardiovasculares',
-        'digoxina': 'Cardiovasculares', 'warfarina': 'Cardiovasculares', 'clopidogrel': 'Cardiovasculares',
-        'simvastatina': 'Cardiovasculares', 'atorvastatina': 'Cardiovasculares', 'rosuvastatina': 'Cardiovasculares',
-        'antihipertensivo': 'Cardiovasculares', 'betabloqueador': 'Cardiovasculares', 'estatina': 'Cardiovasculares',
-        'bloqueador_calcio': 'Cardiovasculares',
-        
-        # GASTROINTESTINALES
-        'omeprazol': 'Gastrointestinales', 'lansoprazol': 'Gastrointestinales', 'pantoprazol': 'Gastrointestinales',
-        'ranitidina': 'Gastrointestinales', 'cimetidina': 'Gastrointestinales', 'sucralfato': 'Gastrointestinales',
-        'domperidona': 'Gastrointestinales', 'metoclopramida': 'Gastrointestinales', 'loperamida': 'Gastrointestinales',
-        'lactulosa': 'Gastrointestinales', 'simeticona': 'Gastrointestinales',
-        'inhibidor_bomba_protones': 'Gastrointestinales',
-        
-        # ENDOCRINOLÓGICOS
-        'metformina': 'Endocrinológicos', 'glibenclamida': 'Endocrinológicos', 'gliclazida': 'Endocrinológicos',
-        'insulina': 'Endocrinológicos', 'insulina_rapida': 'Endocrinológicos', 'insulina_nph': 'Endocrinológicos',
-        'insulina_lenta': 'Endocrinológicos', 'levotiroxina': 'Endocrinológicos', 'metimazol': 'Endocrinológicos',
-        'propiltiouracilo': 'Endocrinológicos',
-        
-        # RESPIRATORIOS
-        'salbutamol': 'Respiratorios', 'bromuro_ipratropio': 'Respiratorios', 'budesonida': 'Respiratorios',
-        'beclometasona': 'Respiratorios', 'prednisolona': 'Respiratorios', 'prednisona': 'Respiratorios',
-        'dexametasona': 'Respiratorios', 'hidrocortisona': 'Respiratorios', 'teofilina': 'Respiratorios',
-        'montelukast': 'Respiratorios',
-        
-        # NEUROLÓGICOS
-        'fenitoina': 'Neurológicos', 'carbamazepina': 'Neurológicos', 'acido_valproico': 'Neurológicos',
-        'levodopa': 'Neurológicos', 'haloperidol': 'Neurológicos', 'clorpromazina': 'Neurológicos',
-        'risperidona': 'Neurológicos', 'olanzapina': 'Neurológicos', 'quetiapina': 'Neurológicos',
-        'fluoxetina': 'Neurológicos', 'sertralina': 'Neurológicos', 'paroxetina': 'Neurológicos',
-        'amitriptilina': 'Neurológicos', 'diazepam': 'Neurológicos', 'lorazepam': 'Neurológicos',
-        'clonazepam': 'Neurológicos', 'alprazolam': 'Neurológicos',
-        
-        # ANESTÉSICOS Y OPIOIDES
-        'morfina': 'Anestésicos y Opioides', 'tramadol': 'Anestésicos y Opioides', 'codeina': 'Anestésicos y Opioides',
-        'fentanilo': 'Anestésicos y Opioides', 'lidocaina': 'Anestésicos y Opioides', 'bupivacaina': 'Anestésicos y Opioides',
-        'procaina': 'Anestésicos y Opioides',
-        
-        # HORMONAS
-        'estradiol': 'Hormonas', 'progesterona': 'Hormonas', 'testosterona': 'Hormonas',
-        
-        # SUEROS Y SOLUCIONES
-        'suero_fisiologico': 'Sueros y Soluciones', 'dextrosa': 'Sueros y Soluciones',
-        'hartmann': 'Sueros y Soluciones', 'agua_inyectable': 'Sueros y Soluciones',
-        'bicarbonato_sodio': 'Sueros y Soluciones', 'albumina': 'Sueros y Soluciones', 'plasma': 'Sueros y Soluciones',
-        
-        # MATERIAL DE CURACIÓN
-        'gasas': 'Material de Curación', 'vendas': 'Material de Curación', 'alcohol': 'Material de Curación',
-        'yodo': 'Material de Curación', 'agua_oxigenada': 'Material de Curación', 'algodon': 'Material de Curación',
-        'suturas': 'Material de Curación', 'apositos': 'Material de Curación', 'esparadrapo': 'Material de Curación',
-        
-        # DISPOSITIVOS MÉDICOS
-        'jeringas': 'Dispositivos Médicos', 'agujas': 'Dispositivos Médicos', 'cateter': 'Dispositivos Médicos',
-        'scalp': 'Dispositivos Médicos', 'sondas_foley': 'Dispositivos Médicos', 'sondas_nasogastricas': 'Dispositivos Médicos',
-        'tubos_endotraqueales': 'Dispositivos Médicos',
-        
-        # EQUIPO DE PROTECCIÓN
-        'guantes_latex': 'Equipo de Protección', 'guantes_nitrilo': 'Equipo de Protección', 'guantes_vinilo': 'Equipo de Protección',
-        'mascarillas': 'Equipo de Protección', 'mascarillas_n95': 'Equipo de Protección', 'batas': 'Equipo de Protección',
-        'gorros': 'Equipo de Protección', 'botas': 'Equipo de Protección', 'gafas_proteccion': 'Equipo de Protección',
-        
-        # EQUIPOS MÉDICOS
-        'termometro': 'Equipos Médicos', 'estetoscopio': 'Equipos Médicos', 'tensiometro': 'Equipos Médicos',
-        'oximetro': 'Equipos Médicos', 'glucometro': 'Equipos Médicos', 'otoscopio': 'Equipos Médicos',
-        'oftalmoscopio': 'Equipos Médicos', 'laringoscopio': 'Equipos Médicos', 'desfibrilador': 'Equipos Médicos',
-        'electrocardiografo': 'Equipos Médicos', 'monitor_signos': 'Equipos Médicos', 'ventilador': 'Equipos Médicos',
-        'bomba_infusion': 'Equipos Médicos', 'aspiradora': 'Equipos Médicos', 'microscopio': 'Equipos Médicos',
-        'centrifuga': 'Equipos Médicos', 'autoclave': 'Equipos Médicos', 'incubadora': 'Equipos Médicos',
-        'refrigerador': 'Equipos Médicos',
-        
-        # INSTRUMENTAL QUIRÚRGICO
-        'bisturi': 'Instrumental Quirúrgico', 'pinzas': 'Instrumental Quirúrgico', 'tijeras': 'Instrumental Quirúrgico',
-        'hemostatos': 'Instrumental Quirúrgico', 'separadores': 'Instrumental Quirúrgico', 'portaagujas': 'Instrumental Quirúrgico',
-        'clamps': 'Instrumental Quirúrgico', 'especulos': 'Instrumental Quirúrgico',
-        
-        # PRODUCTOS DE LIMPIEZA
-        'cloro': 'Productos de Limpieza', 'desinfectante': 'Productos de Limpieza', 'alcohol_gel': 'Productos de Limpieza',
-        'glutaraldehido': 'Productos de Limpieza', 'formaldehido': 'Productos de Limpieza', 'detergente': 'Productos de Limpieza',
-        
-        # GASES MEDICINALES
-        'oxigeno': 'Gases Medicinales', 'tanque_oxigeno': 'Gases Medicinales', 'concentrador_oxigeno': 'Gases Medicinales',
-        'regulador_oxigeno': 'Gases Medicinales', 'mascarilla_oxigeno': 'Gases Medicinales', 'canula_nasal': 'Gases Medicinales'
-    }
-    
-    return categorias.get(producto, 'Medicamentos Generales')
+# Filas del archivo de resultados que se muestran en pantalla en el modo streaming
+FILAS_VISTA_PREVIA = 1000
 
-def extraer_productos_medicos(descripcion):
-    """Extrae productos médicos de la descripción con reconocimiento expandido"""
-    if pd.isna(descripcion):
-        return []
-    
-    texto = normalizar_texto(descripcion)
-    productos = []
-    
-    # Patrones mejorados para detectar productos médicos
-    patrones = [
-        r'(\d+)\s+([a-z\s]+?)(?=\d+\s+[a-z]|,|$)',
-        r'(\d+)\s*([a-z\s]+?)(?=,|$)',
-        r'([a-z\s]+?)\s+(\d+)',
-        r'(\d+)\s*(mg|ml|gr|kg|mcg|ui)?\s*([a-z\s]+?)(?=\d+|,|$)',
-        r'(licitacion|vacuna|medicamento)\s+([a-z\s]+?)(?=\d+|,|$)'
-    ]
-    # Primero, intentar extraer con patrones que incluyen cantidad
-    for patron in patrones[:3]:
-        matches = re.findall(patron, texto)
-        for match in matches:
-            try:
-                if len(match) == 2:
-                    cantidad_str, nombre = match
-                elif len(match) == 3:
-                    cantidad_str, unidad, nombre = match
-                else:
-                    continue
-                
-                # Intentar convertir a número
-                try:
-                    cantidad = int(cantidad_str)
-                except:
-                    # Si el primer elemento no es número, intercambiar
-                    try:
-                        cantidad = int(match[1] if len(match) == 2 else match[0])
-                        nombre = match[0] if len(match) == 2 else match[2]
-                    except:
-                        continue
-                
-                nombre = nombre.strip()
-                
-                if cantidad > 0 and cantidad <= 100000 and len(nombre) > 2:
-                    categoria = clasificar_producto_medico(nombre)
-                    if categoria:
-                        productos.append({
-                            'nombre': categoria,
-                            'cantidad': cantidad,
-                            'descripcion_original': nombre,
-                            'categoria': determinar_categoria(categoria)
-                        })
-            except:
-                continue
-    
-    # Si no se encontraron productos con cantidad, buscar por nombres de medicamentos conocidos
-    if not productos:
-        medicamentos_conocidos = [
-            'paracetamol', 'ibuprofeno', 'aspirina', 'amoxicilina', 'ciprofloxacino',
-            'aciclovir', 'oseltamivir', 'insulina', 'morfina', 'tramadol',
-            'omeprazol', 'losartan', 'metformina', 'salbutamol', 'dexametasona'
-        ]
-        
-        for medicamento in medicamentos_conocidos:
-            if medicamento in texto:
-                # Buscar cantidad cerca del medicamento
-                patron_cerca = f'(\d+)\s*.*?{medicamento}|{medicamento}\s*.*?(\d+)'
-                match = re.search(patron_cerca, texto)
-                cantidad = 1  # Cantidad por defecto
-                
-                if match:
-                    try:
-                        cantidad = int(match.group(1) or match.group(2))
-                    except:
-                        cantidad = 1
-                
-                categoria = clasificar_producto_medico(medicamento)
-                if categoria:
-                    productos.append({
-                        'nombre': categoria,
-                        'cantidad': cantidad,
-                        'descripcion_original': medicamento,
-                        'categoria': determinar_categoria(categoria)
-                    })
-    
-    # Extraer del nombre de la licitación si contiene nombres de medicamentos
-    if not productos:
-        # Buscar patrones como "Licitación Amoxicilina 3"
-        patron_licitacion = r'licitacion\s+([a-z]+)\s*(\d+)?'
-        match = re.search(patron_licitacion, texto)
-        
-        if match:
-            nombre_medicamento = match.group(1)
-            cantidad = int(match.group(2)) if match.group(2) else 1
-            
-            categoria = clasificar_producto_medico(nombre_medicamento)
-            if categoria:
-                productos.append({
-                    'nombre': categoria,
-                    'cantidad': cantidad,
-                    'descripcion_original': nombre_medicamento,
-                    'categoria': determinar_categoria(categoria)
-                })
-    
-    # Eliminar duplicados manteniendo la mayor cantidad
-    productos_unicos = {}
-    for producto in productos:
-        nombre = producto['nombre']
-        if nombre in productos_unicos:
-            if producto['cantidad'] > productos_unicos[nombre]['cantidad']:
-                productos_unicos[nombre] = producto
-        else:
-            productos_unicos[nombre] = producto
-    
-    return list(productos_unicos.values())
+# Archivos de resultados del modo streaming que se conservan (uno por análisis)
+DIRECTORIO_RESULTADOS = DIRECTORIO_CACHE / 'resultados'
+MAXIMO_RESULTADOS = 8
 
-def buscar_en_inventario(producto_buscado, inventario_df):
-    """Busca un producto en el inventario con mapeo expandido"""
-    if inventario_df.empty:
-        return {
-            'encontrado': False,
-            'stock_disponible': 0,
-            'producto_match': '',
-            'lote': '',
-            'caducidad': ''
-        }
-    
-    nombre_buscar = producto_buscado['nombre']
-    cantidad_necesaria = producto_buscado['cantidad']
-    
-    # Mapeo expandido para búsqueda en inventario
-    mapeo_busqueda = {
-        # ANALGÉSICOS
-        'paracetamol': ['paracetamol', 'acetaminofen', 'tylenol'],
-        'ibuprofeno': ['ibuprofeno', 'advil', 'motrin'],
-        'aspirina': ['aspirina', 'acido acetilsalicilico', 'asa'],
-        'diclofenaco': ['diclofenaco', 'voltaren'],
-        'naproxeno': ['naproxeno'],
-        'ketorolaco': ['ketorolaco'],
-        'metamizol': ['metamizol', 'dipirona', 'novalgin'],
-        
-        # ANTIBIÓTICOS
-        'amoxicilina': ['amoxicilina', 'amoxil'],
-        'ampicilina': ['ampicilina'],
-        'penicilina': ['penicilina'],
-        'cefalexina': ['cefalexina', 'keflex'],
-        'ciprofloxacino': ['ciprofloxacino', 'cipro', 'ciprofloxacina'],
-        'levofloxacino': ['levofloxacino', 'levofloxacina'],
-        'azitromicina': ['azitromicina', 'zitromax'],
-        'claritromicina': ['claritromicina'],
-        'eritromicina': ['eritromicina'],
-        'clindamicina': ['clindamicina'],
-        'metronidazol': ['metronidazol'],
-        'trimetoprima': ['trimetoprima', 'sulfametoxazol', 'bactrim'],
-        'ceftriaxona': ['ceftriaxona'],
-        'antibiotico': ['antibiotico', 'antimicrobiano'],
-        
-        # ANTIVIRALES
-        'aciclovir': ['aciclovir', 'zovirax'],
-        'oseltamivir': ['oseltamivir', 'tamiflu'],
-        'ribavirina': ['ribavirina'],
-        'antiviral': ['antiviral'],
-        
-        # ANTIFÚNGICOS
-        'fluconazol': ['fluconazol'],
-        'ketoconazol': ['ketoconazol'],
-        'antifungico': ['antifungico', 'antimicotico'],
-        
-        # VACUNAS
-        'vacuna_influenza': ['vacuna influenza', 'vacuna gripe', 'influenza'],
-        'vacuna_covid': ['vacuna covid', 'covid', 'coronavirus', 'sars-cov'],
-        'vacuna_hepatitis': ['vacuna hepatitis', 'hepatitis'],
-        'vacuna_tetano': ['vacuna tetano', 'tetano'],
-        
-        # CARDIOVASCULARES
-        'losartan': ['losartan', 'cozaar'],
-        'enalapril': ['enalapril'],
-        'captopril': ['captopril'],
-        'amlodipino': ['amlodipino', 'norvasc'],
-        'atenolol': ['atenolol'],
-        'metoprolol': ['metoprolol'],
-        'furosemida': ['furosemida', 'lasix'],
-        'simvastatina': ['simvastatina'],
-        'atorvastatina': ['atorvastatina', 'lipitor'],
-        'antihipertensivo': ['antihipertensivo', 'hipertension'],
-        'betabloqueador': ['betabloqueador', 'beta bloqueador'],
-        
-        # GASTROINTESTINALES
-        'omeprazol': ['omeprazol', 'prilosec'],
-        'lansoprazol': ['lansoprazol'],
-        'pantoprazol': ['pantoprazol'],
-        'ranitidina': ['ranitidina'],
-        'inhibidor_bomba_protones': ['inhibidor bomba protones', 'prazol'],
-        
-        # DIABETES
-        'metformina': ['metformina', 'glucophage'],
-        'glibenclamida': ['glibenclamida'],
-        'insulina': ['insulina'],
-        'insulina_rapida': ['insulina rapida', 'insulina cristalina'],
-        'insulina_nph': ['insulina nph', 'insulina intermedia'],
-        'antidiabetico': ['antidiabetico', 'diabetes'],
-        
-        # RESPIRATORIOS
-        'salbutamol': ['salbutamol', 'ventolin', 'albuterol'],
-        'prednisolona': ['prednisolona'],
-        'prednisona': ['prednisona'],
-        'dexametasona': ['dexametasona'],
-        'corticoide': ['corticoide', 'esteroide'],
-        
-        # ANESTÉSICOS Y OPIOIDES
-        'morfina': ['morfina'],
-        'tramadol': ['tramadol'],
-        'lidocaina': ['lidocaina'],
-        'fentanilo': ['fentanilo'],
-        
-        # SUEROS Y SOLUCIONES
-        'suero_fisiologico': ['suero fisiologico', 'solucion salina', 'nacl', 'suero', 'salina'],
-        'dextrosa': ['dextrosa', 'glucosa'],
-        'hartmann': ['hartmann', 'lactato ringer', 'ringer'],
-        'agua_inyectable': ['agua inyectable', 'agua destilada'],
-        
-        # MATERIAL DE CURACIÓN
-        'gasas': ['gasas', 'gasa', 'compresas', 'gasas esteriles'],
-        'vendas': ['vendas', 'venda', 'vendaje', 'vendas elasticas'],
-        'alcohol': ['alcohol', 'alcohol etilico', 'alcohol 70'],
-        'yodo': ['yodo', 'povidona', 'betadine', 'isodine'],
-        'algodon': ['algodon', 'torundas', 'hisopos'],
-        'suturas': ['suturas', 'sutura', 'hilo quirurgico'],
-        'apositos': ['apositos', 'aposito', 'parches', 'curitas'],
-        
-        # DISPOSITIVOS MÉDICOS
-        'jeringas': ['jeringas', 'jeringa', 'jeringuilla'],
-        'agujas': ['agujas', 'aguja', 'agujas hipodermicas'],
-        'cateter': ['cateter', 'sonda', 'canula'],
-        'scalp': ['scalp', 'mariposa', 'butterfly'],
-        'sondas': ['sondas', 'sonda'],
-        
-        # EQUIPO DE PROTECCIÓN
-        'guantes_latex': ['guantes latex', 'guantes'],
-        'guantes_nitrilo': ['guantes nitrilo'],
-        'mascarillas': ['mascarillas', 'mascarilla', 'cubrebocas'],
-        'mascarillas_n95': ['n95', 'respirador n95'],
-        'batas': ['batas', 'bata', 'bata quirurgica'],
-        'gorros': ['gorros', 'gorro', 'gorro quirurgico'],
-        
-        # EQUIPOS MÉDICOS
-        'termometro': ['termometro', 'termometro digital'],
-        'estetoscopio': ['estetoscopio', 'fonendoscopio'],
-        'tensiometro': ['tensiometro', 'baumanometro', 'esfigmomanometro'],
-        'oximetro': ['oximetro', 'pulsioximetro', 'saturometro'],
-        'glucometro': ['glucometro', 'medidor glucosa'],
-        'microscopio': ['microscopio', 'microscopio optico'],
-        'centrifuga': ['centrifuga', 'centrifugadora'],
-        'desfibrilador': ['desfibrilador'],
-        
-        # INSTRUMENTAL QUIRÚRGICO
-        'bisturi': ['bisturi', 'escalpelo', 'hoja bisturi'],
-        'pinzas': ['pinzas', 'forceps', 'pinzas quirurgicas'],
-        'tijeras': ['tijeras', 'tijeras quirurgicas'],
-        
-        # PRODUCTOS DE LIMPIEZA
-        'cloro': ['cloro', 'hipoclorito', 'hipoclorito sodio'],
-        'desinfectante': ['desinfectante', 'germicida'],
-        'alcohol_gel': ['alcohol gel', 'gel antibacterial'],
-        'detergente': ['detergente', 'jabon'],
-        
-        # OXÍGENO
-        'oxigeno': ['oxigeno', 'o2'],
-        'tanque_oxigeno': ['tanque oxigeno', 'cilindro oxigeno']
-    }
-    
-    # Obtener términos de búsqueda para el producto
-    terminos_busqueda = mapeo_busqueda.get(nombre_buscar, [nombre_buscar])
-    
-    # Buscar en el inventario
-    for _, fila in inventario_df.iterrows():
-        # Crear texto completo de la fila para búsqueda
-        texto_fila = ""
-        for col in fila.index:
-            if pd.notna(fila[col]):
-                texto_fila += str(fila[col]).lower() + " "
-        
-        # Verificar si algún término coincide
-        for termino in terminos_busqueda:
-            if termino in texto_fila:
-                # Obtener stock de diferentes columnas posibles
-                stock = 0
-                for col_stock in ['stock', 'cantidad', 'existencia', 'disponible', 'inventario', 'qty', 'unidades']:
-                    if col_stock in fila.index and pd.notna(fila[col_stock]):
-                        try:
-                            stock = int(float(fila[col_stock]))
-                            break
-                        except:
-                            continue
-                
-                # Obtener información adicional del producto
-                nombre_producto = str(fila.get('nombre', fila.get('producto', fila.get('descripcion', fila.get('item', 'Producto')))))
-                lote = str(fila.get('lote', fila.get('batch', fila.get('numero_lote', ''))))
-                
-                # Buscar fecha de caducidad en diferentes columnas
-                caducidad = ''
-                for col_cad in ['caducidad', 'vencimiento', 'expiry', 'fecha_vencimiento', 'fecha_caducidad', 'expiracion']:
-                    if col_cad in fila.index and pd.notna(fila[col_cad]):
-                        caducidad = str(fila[col_cad])
-                        break
-                
-                return {
-                    'encontrado': True,
-                    'stock_disponible': stock,
-                    'stock_suficiente': stock >= cantidad_necesaria,
-                    'producto_match': nombre_producto,
-                    'lote': lote if lote != 'nan' else '',
-                    'caducidad': caducidad if caducidad != 'nan' else ''
-                }
-    
-    return {
-        'encontrado': False,
-        'stock_disponible': 0,
-        'stock_suficiente': False,
-        'producto_match': '',
-        'lote': '',
-        'caducidad': ''
-    }
+# Coincidencias que se ofrecen al ajustar el stock del inventario guardado
+FILAS_AJUSTE_STOCK = 50
 
-def verificar_caducidad(fecha_str):
-    """Verifica si un producto está próximo a caducar"""
-    if not fecha_str or pd.isna(fecha_str) or fecha_str == 'nan':
-        return {'estado': 'sin_fecha', 'dias_restantes': None, 'alerta': False}
-    
-    try:
-        formatos = ['%Y-%m-%d', '%d/%m/%Y', '%m/%d/%Y', '%d-%m-%Y', '%Y/%m/%d']
-        fecha_cad = None
-        
-        for formato in formatos:
-            try:
-                fecha_cad = datetime.strptime(str(fecha_str).strip(), formato)
-                break
-            except:
-                continue
-        
-        if not fecha_cad:
-            return {'estado': 'formato_invalido', 'dias_restantes': None, 'alerta': False}
-        
-        dias_restantes = (fecha_cad - datetime.now()).days
-        
-        if dias_restantes < 0:
-            return {'estado': 'caducado', 'dias_restantes': dias_restantes, 'alerta': True}
-        elif dias_restantes <= 30:
-            return {'estado': 'proximo_caducar', 'dias_restantes': dias_restantes, 'alerta': True}
-        elif dias_restantes <= 90:
-            return {'estado': 'vigilar', 'dias_restantes': dias_restantes, 'alerta': False}
-        else:
-            return {'estado': 'vigente', 'dias_restantes': dias_restantes, 'alerta': False}
-    except:
-        return {'estado': 'error', 'dias_restantes': None, 'alerta': False}
+# Las funciones se cachean por huella del contenido; los argumentos con '_' no se hashean
+@st.cache_resource(max_entries=MAXIMO_ARCHIVOS_EN_CACHE, show_spinner=False)
+def cargar_licitaciones(huella, nombre, _contenido):
+    """Licitaciones con columnas canónicas y su esquema"""
+    return preparar_licitaciones(leer_tabla(_contenido, nombre, huella, ESQUEMA_LICITACIONES))
 
-def obtener_documentos_requeridos(licitacion_id, documentos_df):
-    """Obtiene la lista de documentos requeridos para una licitación específica."""
-    if documentos_df is None or documentos_df.empty:
-        return []
+@st.cache_resource(max_entries=MAXIMO_ARCHIVOS_EN_CACHE, show_spinner=False)
+def extraer_productos_licitaciones(huella, _licitaciones_df):
+    """Productos extraídos de cada licitación (misma huella que el archivo de licitaciones)"""
+    return productos_por_licitacion(_licitaciones_df)
 
-    documentos = []
+@st.cache_resource(max_entries=MAXIMO_ARCHIVOS_EN_CACHE, show_spinner=False)
+def cargar_inventario(huella, nombre, _contenido):
+    """Inventario y su índice de búsqueda"""
+    inventario_df = leer_tabla(_contenido, nombre, huella)
+    return inventario_df, construir_indice_inventario(inventario_df)
 
-    # Verificar si la columna 'documentos' existe en el DataFrame
-    if 'documentos' not in documentos_df.columns:
-        st.error("❌ El archivo de documentos requeridos debe tener una columna llamada 'documentos'.")
-        return []
+@st.cache_resource(max_entries=MAXIMO_ARCHIVOS_EN_CACHE, show_spinner=False)
+def cargar_inventario_guardado(huella, ruta):
+    """Inventario guardado en SQLite (solo las columnas del esquema) y su índice, que busca con consultas a la base"""
+    inventario_df = leer_inventario(ruta, ESQUEMA_INVENTARIO)
+    return inventario_df, construir_indice_inventario(inventario_df, almacen=ruta)
 
-    # Buscar por un ID único si la columna existe (asumiendo que es 'nombre' en tu caso)
-    # y que la columna de la licitación en el archivo de documentos es 'nombre'
-    if 'nombre' in documentos_df.columns:
-        # Normalizar el texto de búsqueda para una coincidencia flexible
-        nombre_licitacion_normalizado = normalizar_texto(licitacion_id)
-        
-        # Filtrar el DataFrame donde el nombre de la licitación coincide
-        docs_encontrados = documentos_df[documentos_df['nombre'].apply(lambda x: nombre_licitacion_normalizado in normalizar_texto(x))]
-        
-        if not docs_encontrados.empty:
-            # Iterar sobre las filas encontradas
-            for _, row in docs_encontrados.iterrows():
-                # Dividir la cadena de documentos por comas y limpiar espacios
-                doc_list = [doc.strip() for doc in str(row['documentos']).split(',')]
-                documentos.extend(doc_list)
-    
-    return documentos
+@st.cache_resource(max_entries=MAXIMO_ARCHIVOS_EN_CACHE, show_spinner=False)
+def cargar_documentos(huella, nombre, _contenido):
+    """Documentos requeridos con columnas canónicas, su esquema y su índice por licitación"""
+    documentos_df, esquema = preparar_documentos(leer_tabla(_contenido, nombre, huella, ESQUEMA_DOCUMENTOS))
+    return documentos_df, esquema, construir_indice_documentos(documentos_df)
 
-def evaluar_licitacion(fila, inventario_df, documentos_df=None):
-    """Evalúa una licitación completa"""
-    resultado = {
-        'estado': 'verde',
-        'observaciones': [],
-        'productos_analizados': 0,
-        'productos_con_stock': 0,
-        'productos_sin_stock': [],
-        'productos_con_stock_insuficiente': [],
-        'productos_disponibles': [],
-        'alertas_caducidad': [],
-        'categorias_productos': {},
-        'documentos_necesarios': []
-    }
-    
-    # Obtener descripción de la licitación
-    descripcion = ""
-    for col in ['descripcion', 'detalle', 'productos', 'items', 'especificaciones']:
-        if col in fila.index and pd.notna(fila[col]):
-            descripcion += str(fila[col]) + " "
-    
-    if not descripcion.strip():
-        resultado['estado'] = 'amarillo'
-        resultado['observaciones'].append("Sin descripción de productos")
-        return resultado
-    
-    # Extraer productos usando función médica especializada
-    productos = extraer_productos_medicos(descripcion)
-    
-    # Obtener documentos requeridos (nueva funcionalidad)
-    licitacion_id = fila.get('id', fila.get('nombre', ''))
-    resultado['documentos_necesarios'] = obtener_documentos_requeridos(licitacion_id, documentos_df)
+# Detalle por licitación: se muestran por páginas y solo se construye el de la seleccionada
+LICITACIONES_POR_PAGINA = 20
 
-    if not productos:
-        resultado['estado'] = 'amarillo'
-        resultado['observaciones'].append("No se identificaron productos médicos específicos")
-        return resultado
-    
-    resultado['productos_analizados'] = len(productos)
+ETIQUETAS_ESTADO = {
+    'VERDE': '🟢 APTA',
+    'AMARILLO': '🟡 REVISAR',
+    'ROJO': '🔴 NO APTA'
+}
+
+def limpiar_resultados():
+    """Borra los archivos de resultados del modo streaming más antiguos por encima de MAXIMO_RESULTADOS"""
+    try:
+        archivos = sorted(DIRECTORIO_RESULTADOS.glob('resultados_*.csv'), key=lambda ruta: ruta.stat().st_mtime)
+    except OSError:
+        return
+    for ruta in archivos[:-MAXIMO_RESULTADOS]:
+        try:
+            ruta.unlink()
+        except OSError:
+            pass
+
+def texto_lotes(lotes):
+    """Lotes usados para un producto: 'L001: 300 (cad. 2026-09-01), L002: 200'"""
+    partes = []
+    for lote, unidades, caducidad in lotes:
+        texto = f"{lote if lote and lote != 'nan' else 'sin lote'}: {unidades}"
+        if caducidad and caducidad != 'nan':
+            texto += f" (cad. {caducidad})"
+        partes.append(texto)
+    return ", ".join(partes)
+
+def botones_descarga(tablas, clave, archivo_csv=None):
+    """Un botón por formato; el archivo se escribe en disco por bloques solo al pulsar su botón"""
+    tabla = 'resumen'
+    if len(tablas) > 1:
+        tabla = st.selectbox(
+            "Tabla para CSV y Parquet",
+            list(tablas),
+            format_func=TABLAS_EXPORTACION.get,
+            help="El Excel incluye todas las tablas, una por hoja"
+        )
+
+    def generar(formato):
+        """Archivo abierto para la descarga (se llama al pulsar, en otro hilo; se reutiliza mientras no cambie el análisis)"""
+        # Se devuelve el archivo, no su contenido: Streamlit lo lee al servirlo, sin una copia más en memoria,
+        # y abierto sigue siendo legible aunque la limpieza de la caché lo borre mientras tanto
+        if formato == 'csv' and tabla == 'resumen' and archivo_csv is not None:
+            return open(archivo_csv, 'rb')
+        return open(exportar_en_cache(tablas, formato, clave, tabla), 'rb')
+    
+    fecha = datetime.now().strftime('%Y%m%d_%H%M')
+    formatos = formatos_disponibles()
+    for columna, formato in zip(st.columns(len(formatos)), formatos):
+        etiqueta, mime = FORMATOS_EXPORTACION[formato]
+        sufijo = '' if formato == 'xlsx' or tabla == 'resumen' else f"_{tabla}"
+        columna.download_button(
+            label=f"📥 Descargar Análisis Completo ({etiqueta})",
+            data=lambda formato=formato: generar(formato),
+            file_name=f"analisis_licitaciones_medicas_{fecha}{sufijo}.{formato}",
+            mime=mime,
+            on_click='ignore'
+        )
+
+def mostrar_detalle_licitacion(evaluacion):
+    """Detalle de una licitación evaluada: documentos, caducidades, stock y categorías"""
+    # Documentos Requeridos (Nuevo)
+    if evaluacion.documentos_necesarios:
+        st.markdown("#### 📝 Documentos Requeridos:")
+        st.markdown("<ul>" + "".join([f"<li>{doc}</li>" for doc in evaluacion.documentos_necesarios]) + "</ul>", unsafe_allow_html=True)
+        st.markdown("---")
+    
+    # Alertas de caducidad (prioritario)
+    alertas = evaluacion.alertas_caducidad
+    if alertas:
+        st.markdown("#### ⚠️ Alertas de Caducidad:")
+        for producto in alertas:
+            if producto.estado_caducidad == 'caducado':
+                st.error(f"🚨 **{producto.nombre}** - CADUCADO (venció hace {abs(producto.dias_caducidad)} días)")
+            else:
+                st.warning(f"⏰ **{producto.nombre}** - Caduca en {producto.dias_caducidad} días")
+        st.markdown("---")
+    
+    # Productos sin stock
+    sin_stock = evaluacion.productos_sin_stock
+    if sin_stock:
+        st.markdown("#### ❌ Productos NO Disponibles:")
+        for producto in sin_stock:
+            st.error(f"**{producto.nombre_visible}** - Cantidad: {producto.cantidad_requerida} - Categoría: {producto.categoria}")
+        st.markdown("---")
+    
+    # Productos con stock insuficiente
+    insuficientes = evaluacion.productos_con_stock_insuficiente
+    if insuficientes:
+        st.markdown("#### ⚠️ Productos con Stock Insuficiente:")
+        for producto in insuficientes:
+            lotes_info = f" - Lotes: {texto_lotes(producto.lotes)}" if producto.lotes else ""
+            st.warning(f"**{producto.nombre_visible}** - Requiere: {producto.cantidad_requerida}, Disponible: {producto.stock_disponible}, Faltan: {producto.faltante}{lotes_info}")
+        st.markdown("---")
+    
+    # Productos de los que solo hay un nombre parecido en el inventario
+    posibles = evaluacion.posibles_coincidencias
+    if posibles:
+        st.markdown("#### 🔍 Posibles Coincidencias (revisar):")
+        for producto in posibles:
+            st.info(f"**{producto.nombre_visible}** - Requiere: {producto.cantidad_requerida} - En inventario: {producto.producto_inventario} (su stock no se cuenta)")
+        st.markdown("---")
+    
+    # Productos disponibles
+    disponibles = evaluacion.productos_disponibles
+    if disponibles:
+        st.markdown("#### ✅ Productos Disponibles:")
+        for producto in disponibles:
+            if len(producto.lotes) > 1:
+                # Pedido repartido entre varios lotes (el que caduca antes, primero)
+                lote_info, caducidad_info = f" - Lotes: {texto_lotes(producto.lotes)}", ""
+            else:
+                lote_info = f" - Lote: {producto.lote}" if producto.lote and producto.lote != 'nan' else ""
+                caducidad_info = f" - Caduca: {producto.caducidad}" if producto.caducidad and producto.caducidad != 'nan' else ""
+            
+            st.success(f"**{producto.nombre_visible}** - Requiere: {producto.cantidad_requerida}, Disponible: {producto.stock_disponible}{lote_info}{caducidad_info}")
     
-    # Evaluar cada producto médico
-    for producto in productos:
-        categoria = producto['categoria']
-        if categoria not in resultado['categorias_productos']:
-            resultado['categorias_productos'][categoria] = {'total': 0, 'disponibles': 0}
-        resultado['categorias_productos'][categoria]['total'] += 1
-        
-        busqueda = buscar_en_inventario(producto, inventario_df)
+    # Resumen por categorías
+    categorias = evaluacion.categorias_productos
+    if categorias:
+        st.markdown("---")
+        st.markdown("#### 📊 Resumen por Categoría:")
         
-        if busqueda['encontrado']:
-            # Verificar caducidad
-            info_caducidad = verificar_caducidad(busqueda['caducidad'])
+        for categoria, (total_cat, disp_cat) in categorias.items():
+            porcentaje = (disp_cat / total_cat) * 100 if total_cat > 0 else 0
             
-            if busqueda['stock_suficiente']:
-                resultado['productos_con_stock'] += 1
-                resultado['categorias_productos'][categoria]['disponibles'] += 1
-                
-                producto_info = {
-                    'nombre': producto['nombre'].replace('_', ' ').title(),
-                    'cantidad_requerida': producto['cantidad'],
-                    'stock_disponible': busqueda['stock_disponible'],
-                    'producto_inventario': busqueda['producto_match'],
-                    'categoria': categoria,
-                    'lote': busqueda['lote'],
-                    'caducidad': busqueda['caducidad']
-                }
-                
-                if info_caducidad['alerta']:
-                    resultado['alertas_caducidad'].append({
-                        'producto': producto['nombre'],
-                        'estado': info_caducidad['estado'],
-                        'dias': info_caducidad['dias_restantes']
-                    })
-                    producto_info['alerta_caducidad'] = info_caducidad
-                
-                resultado['productos_disponibles'].append(producto_info)
+            if porcentaje == 100:
+                st.success(f"✅ **{categoria}**: {disp_cat}/{total_cat} productos ({porcentaje:.0f}%)")
+            elif porcentaje >= 50:
+                st.warning(f"⚠️ **{categoria}**: {disp_cat}/{total_cat} productos ({porcentaje:.0f}%)")
             else:
-                # Stock insuficiente
-                resultado['productos_con_stock_insuficiente'].append({
-                    'nombre': producto['nombre'].replace('_', ' ').title(),
-                    'cantidad_requerida': producto['cantidad'],
-                    'stock_disponible': busqueda['stock_disponible'],
-                    'faltante': producto['cantidad'] - busqueda['stock_disponible'],
-                    'categoria': categoria
-                })
-        else:
-            # No encontrado en inventario
-            resultado['productos_sin_stock'].append({
-                'nombre': producto['nombre'].replace('_', ' ').title(),
-                'cantidad_requerida': producto['cantidad'],
-                'categoria': categoria
-            })
-    
-    # Determinar estado final
-    if resultado['productos_sin_stock']:
-        resultado['estado'] = 'rojo'
-    elif resultado['productos_con_stock_insuficiente'] or resultado['alertas_caducidad']:
-        resultado['estado'] = 'amarillo'
-    
-    # Generar observaciones
-    observaciones = []
-    
-    if resultado['productos_sin_stock']:
-        nombres = [p['nombre'] for p in resultado['productos_sin_stock'][:3]]
-        observaciones.append(f"Sin inventario: {', '.join(nombres)}")
-    
-    if resultado['productos_con_stock_insuficiente']:
-        nombres = [f"{p['nombre']} (faltan {p['faltante']})" for p in resultado['productos_con_stock_insuficiente'][:2]]
-        observaciones.append(f"Stock insuficiente: {', '.join(nombres)}")
-    
-    if resultado['alertas_caducidad']:
-        caducados = [a for a in resultado['alertas_caducidad'] if a['estado'] == 'caducado']
-        if caducados:
-            observaciones.append(f"Productos caducados: {len(caducados)}")
-        else:
-            observaciones.append(f"Próximos a caducar: {len(resultado['alertas_caducidad'])}")
-    
-    if not observaciones and resultado['productos_disponibles']:
-        observaciones.append(f"Todos los productos disponibles ({len(resultado['productos_disponibles'])})")
-    
-    # Estadística general
-    porcentaje = (resultado['productos_con_stock'] / resultado['productos_analizados']) * 100 if resultado['productos_analizados'] > 0 else 0
-    observaciones.append(f"Disponibilidad: {porcentaje:.0f}%")
-    
-    resultado['observaciones'] = observaciones
-    return resultado
+                st.error(f"❌ **{categoria}**: {disp_cat}/{total_cat} productos ({porcentaje:.0f}%)")
 
 # INTERFAZ DE USUARIO
 st.title("🏥 Sistema de Licitaciones Médicas")
@@ -955,7 +243,18 @@ with st.sidebar:
         help="Archivo con la lista de documentos para cada licitación. Debe tener columnas 'id_licitacion' y 'documento'."
     )
     
-    if archivo_licitaciones and archivo_inventario:
+    # Inventario persistente: el archivo subido se importa una vez y, sin archivo, se usa el último guardado
+    usar_almacen = st.checkbox(
+        "Guardar inventario (SQLite)",
+        False,
+        help="Importa el inventario a una base local con índice de texto completo para no subirlo en cada sesión. "
+             "Volver a subir el mismo archivo conserva los ajustes de stock; uno distinto lo sustituye."
+    )
+    inventario_guardado = info_almacen() if usar_almacen else None
+    if inventario_guardado:
+        st.caption(f"💾 Inventario guardado: {inventario_guardado['nombre']} ({inventario_guardado['filas']} filas)")
+    
+    if archivo_licitaciones and (archivo_inventario or inventario_guardado):
         st.success("✅ Archivos cargados correctamente")
     
     st.markdown("---")
@@ -963,9 +262,32 @@ with st.sidebar:
     
     mostrar_detalles = st.checkbox("Mostrar análisis detallado", True)
     mostrar_debug = st.checkbox("Mostrar información de debug", False)
+    trabajadores = st.number_input(
+        "Procesos de evaluación",
+        min_value=1,
+        max_value=procesadores_disponibles(),
+        value=1,
+        help="Número de procesos que evalúan las licitaciones en paralelo "
+             f"(solo con al menos {MINIMO_LICITACIONES_POR_TRABAJADOR} licitaciones por proceso)"
+    )
+    modo_streaming = st.checkbox(
+        "Modo streaming (archivos muy grandes)",
+        False,
+        help="Lee y evalúa las licitaciones por bloques y guarda los resultados en disco en lugar de en memoria"
+    )
+    # Sin política, cada licitación se evalúa contra todo el inventario
+    politica_asignacion = st.selectbox(
+        "Asignación de stock",
+        [None] + [politica for politica in POLITICAS_ASIGNACION if not modo_streaming or politica in POLITICAS_SECUENCIALES],
+        format_func=lambda politica: "Independiente (sin reservar stock)" if politica is None else POLITICAS_ASIGNACION[politica],
+        help="Reserva el stock entre todas las licitaciones para que cada unidad cuente una sola vez"
+    )
+
+# Tiempos por etapa solo con el debug activo; apagada, la instrumentación no mide nada
+activar(mostrar_debug)
 
 # Verificar archivos
-if not archivo_licitaciones or not archivo_inventario:
+if not archivo_licitaciones or not (archivo_inventario or inventario_guardado):
     st.info("👆 Por favor, carga los archivos de licitaciones e inventario para comenzar el análisis.")
     
     with st.expander("📖 Guía de uso"):
@@ -995,55 +317,123 @@ if not archivo_licitaciones or not archivo_inventario:
 
 # Cargar y procesar archivos
 try:
-    # Cargar licitaciones
-    if archivo_licitaciones.name.endswith('.csv'):
-        licitaciones_df = pd.read_csv(archivo_licitaciones)
-    else:
-        licitaciones_df = pd.read_excel(archivo_licitaciones)
-    
-    # Cargar inventario
-    if archivo_inventario.name.endswith('.csv'):
-        inventario_df = pd.read_csv(archivo_inventario)
+    # Cada archivo se lee y se prepara una sola vez por contenido; los reruns reutilizan la caché
+    contenido_licitaciones = archivo_licitaciones.getvalue()
+    huella_licitaciones = huella_contenido(contenido_licitaciones)
+    huella_documentos = None
+    
+    if usar_almacen:
+        # La huella es la de la versión guardada: cambia al importar otro archivo y con cada ajuste de stock
+        if archivo_inventario:
+            with st.spinner("Importando inventario..."):
+                huella_inventario = importar_archivo(archivo_inventario.getvalue(), archivo_inventario.name)
+        else:
+            huella_inventario = inventario_guardado['huella']
+        tareas = {'inventario': lambda: cargar_inventario_guardado(huella_inventario, str(RUTA_ALMACEN))}
     else:
-        inventario_df = pd.read_excel(archivo_inventario)
-    
-    # Cargar documentos (opcional)
-    documentos_df = None
+        contenido_inventario = archivo_inventario.getvalue()
+        huella_inventario = huella_contenido(contenido_inventario)
+        tareas = {
+            'inventario': lambda: cargar_inventario(huella_inventario, archivo_inventario.name, contenido_inventario)
+        }
+    if not modo_streaming:
+        tareas['licitaciones'] = lambda: cargar_licitaciones(
+            huella_licitaciones, archivo_licitaciones.name, contenido_licitaciones
+        )
     if archivo_documentos:
-        if archivo_documentos.name.endswith('.csv'):
-            documentos_df = pd.read_csv(archivo_documentos)
-        else:
-            documentos_df = pd.read_excel(archivo_documentos)
-    
-    # Limpiar datos
-    licitaciones_df = licitaciones_df.dropna(how='all')
-    inventario_df = inventario_df.dropna(how='all')
-    if documentos_df is not None:
-        documentos_df = documentos_df.dropna(how='all')
+        contenido_documentos = archivo_documentos.getvalue()
+        huella_documentos = huella_contenido(contenido_documentos)
+        tareas['documentos'] = lambda: cargar_documentos(
+            huella_documentos, archivo_documentos.name, contenido_documentos
+        )
+    
+    # Los archivos se cargan a la vez; los hilos comparten el contexto de esta ejecución de Streamlit
+    contexto_ejecucion = get_script_run_ctx()
+    cargas = cargar_concurrentemente(
+        tareas, inicializador=lambda: add_script_run_ctx(threading.current_thread(), contexto_ejecucion)
+    )
     
-    st.success(f"📊 Datos cargados: {len(licitaciones_df)} licitaciones, {len(inventario_df)} productos en inventario")
+    inventario_df, indice_inventario = cargas['inventario'][0]
+    licitaciones_df, esquema_licitaciones = cargas['licitaciones'][0] if 'licitaciones' in cargas else (None, None)
+    documentos_df, esquema_documentos, indice_documentos = cargas['documentos'][0] if 'documentos' in cargas else (None, None, None)
+    if esquema_documentos is not None and not esquema_documentos['documentos']:
+        st.error("❌ El archivo de documentos requeridos debe tener una columna llamada 'documentos'.")
     
+    if modo_streaming:
+        st.success(f"📊 Datos cargados: licitaciones por bloques de {FILAS_POR_BLOQUE}, {len(inventario_df)} productos en inventario")
+    else:
+        st.success(f"📊 Datos cargados: {len(licitaciones_df)} licitaciones, {len(inventario_df)} productos en inventario")
+    st.caption("⏱️ Tiempo de carga: " + ", ".join(f"{nombre} {segundos:.2f} s" for nombre, (_, segundos) in cargas.items()))
+
 except Exception as e:
     st.error(f"❌ Error al cargar archivos: {str(e)}")
     st.info("Verifica que los archivos no estén corruptos y tengan el formato correcto.")
     st.stop()
 
+# Ajustes de stock en el inventario guardado: se escriben en la base y el análisis los ve como un inventario nuevo
+if usar_almacen:
+    with st.sidebar.expander("✏️ Ajustar stock del inventario guardado"):
+        busqueda_stock = st.text_input("Producto o lote", help="Busca en el índice de texto completo del inventario guardado")
+        texto_busqueda = busqueda_stock.strip().lower()
+        posiciones_stock = filas_con_texto(texto_busqueda)[:FILAS_AJUSTE_STOCK] if texto_busqueda else []
+        if posiciones_stock:
+            posicion_stock = st.selectbox(
+                "Fila del inventario",
+                posiciones_stock,
+                format_func=lambda posicion: (
+                    f"{indice_inventario['nombre_fila'][posicion]} "
+                    f"(lote {indice_inventario['lote_fila'][posicion] or 'sin lote'})"
+                )
+            )
+            nuevo_stock = st.number_input("Nuevo stock", min_value=0, value=indice_inventario['stock'][posicion_stock], step=1)
+            if st.button("💾 Guardar stock"):
+                actualizar_stock(posicion_stock, nuevo_stock)
+                st.rerun()
+        elif texto_busqueda:
+            st.caption("Sin coincidencias en el inventario guardado")
+
 # Mostrar información de debug si está habilitada
 if mostrar_debug:
     with st.expander("🔍 Información de Debug"):
+        st.write(f"**Catálogo médico:** versión {cargar_catalogo()['version']}")
+        
+        # Origen de las hojas de cálculo: caché Arrow en disco o lectura de Excel
+        etiquetas_cache = {
+            'acierto': "✅ acierto (Arrow mapeado en memoria)",
+            'fallo': "🆕 fallo (leído con Excel y guardado en caché)",
+            'sin_cache': "⚪ sin caché (pyarrow no instalado o columnas no convertibles)"
+        }
+        for archivo, huella in [
+            (archivo_licitaciones, huella_licitaciones),
+            (archivo_inventario, huella_inventario),
+            (archivo_documentos, huella_documentos)
+        ]:
+            if archivo is not None and not archivo.name.endswith('.csv') and huella in ORIGEN_TABLAS:
+                st.write(f"**Caché de tablas ({archivo.name}):** {etiquetas_cache[ORIGEN_TABLAS[huella]]}")
         col1, col2 = st.columns(2)
         
         with col1:
+            muestra_licitaciones, esquema_muestra = licitaciones_df, esquema_licitaciones
+            if muestra_licitaciones is None:
+                # Modo streaming: la muestra sale del primer bloque del archivo
+                primer_bloque = next(leer_tabla_por_bloques(
+                    io.BytesIO(contenido_licitaciones), archivo_licitaciones.name, 3, ESQUEMA_LICITACIONES
+                ), pd.DataFrame())
+                muestra_licitaciones, esquema_muestra = preparar_licitaciones(primer_bloque)
+            
+            licitaciones_originales = muestra_licitaciones.drop(columns=['_id', '_nombre', '_descripcion'])
             st.write("**Columnas en Licitaciones:**")
-            st.write(list(licitaciones_df.columns))
+            st.write(list(licitaciones_originales.columns))
+            st.write("**Esquema detectado:**")
+            st.write(esquema_muestra)
             st.write("**Muestra de datos:**")
-            st.dataframe(licitaciones_df.head(3))
+            st.dataframe(licitaciones_originales.head(3))
             
             # Debug de extracción
             st.write("**🔍 Prueba de extracción:**")
-            for idx, fila in licitaciones_df.head(2).iterrows():
-                nombre_lic = fila.get('nombre', f'Licitación {idx+1}')
-                descripcion = fila.get('descripcion', 'Sin descripción')
+            for idx, fila in muestra_licitaciones.head(2).iterrows():
+                nombre_lic = fila['_nombre']
+                descripcion = fila['_descripcion'] or 'Sin descripción'
                 
                 st.write(f"**{nombre_lic}:**")
                 st.write(f"*Descripción:* {descripcion[:50]}...")
@@ -1051,13 +441,18 @@ if mostrar_debug:
                 productos = extraer_productos_medicos(descripcion)
                 if productos:
                     for prod in productos:
-                        st.write(f"  ✅ {prod['nombre']}: {prod['cantidad']} - {prod['categoria']}")
+                        st.write(f"  ✅ {prod.nombre}: {prod.cantidad} - {prod.categoria}")
                 else:
                     st.write("  ❌ No se extrajeron productos")
         
         with col2:
             st.write("**Columnas en Inventario:**")
             st.write(list(inventario_df.columns))
+            st.write("**Esquema detectado:**")
+            st.write(indice_inventario['esquema'])
+            if esquema_documentos is not None:
+                st.write("**Esquema de Documentos:**")
+                st.write(esquema_documentos)
             st.write("**Muestra de datos:**")
             st.dataframe(inventario_df.head(3))
             
@@ -1065,184 +460,293 @@ if mostrar_debug:
             st.write("**🔍 Prueba de búsqueda:**")
             productos_test = ['paracetamol', 'ciprofloxacino', 'aciclovir', 'gasas', 'jeringas']
             for prod_name in productos_test:
-                producto_test = {'nombre': prod_name, 'cantidad': 10}
-                resultado = buscar_en_inventario(producto_test, inventario_df)
+                producto_test = ProductoExtraido(prod_name, 10)
+                resultado = buscar_en_inventario(producto_test, inventario_df, indice_inventario)
                 
                 if resultado['encontrado']:
                     st.write(f"✅ {prod_name}: {resultado['producto_match'][:30]}...")
                 else:
                     st.write(f"❌ {prod_name}: No encontrado")
+        
+        # Se rellena al final del script, cuando ya se midió el renderizado
+        panel_tiempos = st.container()
 
-# Botón de análisis
+# Clave del análisis: contenido de los tres archivos, versión del catálogo, día de referencia y modo
+clave_analisis = (
+    huella_licitaciones,
+    huella_inventario,
+    huella_documentos,
+    cargar_catalogo()['version'],
+    datetime.now().date(),
+    modo_streaming,
+    politica_asignacion
+)
+
+# Botón de análisis (solo recalcula si cambió la clave; los reruns muestran el último análisis)
 if st.button("🔍 Analizar Licitaciones Médicas", type="primary"):
-    with st.spinner("Procesando análisis médico especializado..."):
-        resultados = []
-        evaluaciones_detalladas = []
-        
-        for idx, fila in licitaciones_df.iterrows():
-            evaluacion = evaluar_licitacion(fila, inventario_df, documentos_df)
-            evaluaciones_detalladas.append(evaluacion)
-            
-            # Obtener nombre de licitación
-            nombre_licitacion = "Sin nombre"
-            for col in ['nombre', 'titulo', 'licitacion', 'descripcion']:
-                if col in fila.index and pd.notna(fila[col]):
-                    nombre_licitacion = str(fila[col])[:60] + ("..." if len(str(fila[col])) > 60 else "")
-                    break
-            
-            # Preparar resultado para tabla
-            resultado = {
-                'ID': idx + 1,
-                'Licitación': nombre_licitacion,
-                'Estado': evaluacion['estado'].upper(),
-                'Productos': evaluacion['productos_analizados'],
-                'Disponibles': evaluacion['productos_con_stock'],
-                'Sin_Stock': len(evaluacion['productos_sin_stock']),
-                'Stock_Insuficiente': len(evaluacion['productos_con_stock_insuficiente']),
-                'Alertas_Caducidad': len(evaluacion['alertas_caducidad']),
-                'Observaciones': ' | '.join(evaluacion['observaciones'])
-            }
-            resultados.append(resultado)
-        
-        # Crear DataFrame de resultados
-        if resultados:
-            resultados_df = pd.DataFrame(resultados)
-            
-            # Métricas generales
-            total = len(resultados_df)
-            verdes = len(resultados_df[resultados_df['Estado'] == 'VERDE'])
-            amarillos = len(resultados_df[resultados_df['Estado'] == 'AMARILLO'])
-            rojos = len(resultados_df[resultados_df['Estado'] == 'ROJO'])
-            
-            st.markdown("### 📈 Resumen Ejecutivo")
-            col1, col2, col3, col4 = st.columns(4)
-            col1.metric("Total Licitaciones", total)
-            col2.metric("✅ Aptas", verdes, f"{verdes/total*100:.1f}%" if total > 0 else "0%")
-            col3.metric("⚠️ Revisar", amarillos, f"{amarillos/total*100:.1f}%" if total > 0 else "0%")
-            col4.metric("❌ No Aptas", rojos, f"{rojos/total*100:.1f}%" if total > 0 else "0%")
-            
-            # Alertas importantes
-            total_alertas = resultados_df['Alertas_Caducidad'].sum()
-            if total_alertas > 0:
-                st.warning(f"⚠️ {total_alertas} productos con alertas de caducidad detectados")
-            
-            # Tabla de resultados
-            st.subheader("📋 Resultados por Licitación")
-            
-            # Mapear estados a emojis
-            resultados_display = resultados_df.copy()
-            resultados_display['Estado'] = resultados_display['Estado'].map({
-                'VERDE': '🟢 APTA',
-                'AMARILLO': '🟡 REVISAR', 
-                'ROJO': '🔴 NO APTA'
-            })
+    analisis = st.session_state.get('analisis')
+    reiniciar()
+    if modo_streaming and (analisis is None or analisis['clave'] != clave_analisis):
+        # Lectura, evaluación y escritura por bloques: en memoria solo el bloque actual y los contadores
+        # (caducidades a la fecha de hoy en una copia: el índice en caché lo comparten otras sesiones)
+        indice_analisis = indice_a_fecha(indice_inventario, datetime.now())
+        # Un archivo por análisis: cualquier cambio de la clave (documentos, día, política...) escribe otro
+        DIRECTORIO_RESULTADOS.mkdir(parents=True, exist_ok=True)
+        ruta_resultados = DIRECTORIO_RESULTADOS / f"resultados_{huella_contenido(repr(clave_analisis).encode())}.csv"
+        
+        fuente = io.BytesIO(contenido_licitaciones)
+        bloques = leer_tabla_por_bloques(fuente, archivo_licitaciones.name, FILAS_POR_BLOQUE, ESQUEMA_LICITACIONES)
+        evaluados = evaluar_por_bloques(
+            bloques, inventario_df, documentos_df, indice_analisis, trabajadores, indice_documentos,
+            politica_asignacion
+        )
+        
+        progreso = st.progress(0.0, text="Procesando análisis médico especializado...")
+        metricas = st.empty()
+        contadores = {'total': 0, 'VERDE': 0, 'AMARILLO': 0, 'ROJO': 0, 'productos': 0, 'disponibles': 0, 'alertas': 0}
+        inicio_analisis = time.perf_counter()
+        
+        for resultados_bloque in escribir_resultados_por_bloques(evaluados, ruta_resultados):
+            contadores['total'] += len(resultados_bloque)
+            for estado, cuantas in resultados_bloque['Estado'].value_counts().items():
+                contadores[estado] += int(cuantas)
+            contadores['productos'] += int(resultados_bloque['Productos'].sum())
+            contadores['disponibles'] += int(resultados_bloque['Disponibles'].sum())
+            contadores['alertas'] += int(resultados_bloque['Alertas_Caducidad'].sum())
             
-            st.dataframe(resultados_display, use_container_width=True)
-            
-            # Análisis detallado
-            if mostrar_detalles:
-                st.subheader("🔍 Análisis Detallado por Licitación")
-                
-                for idx, evaluacion in enumerate(evaluaciones_detalladas):
-                    nombre_lic = resultados[idx]['Licitación']
-                    estado = evaluacion['estado']
-                    
-                    emoji = "🟢" if estado == "verde" else ("🟡" if estado == "amarillo" else "🔴")
-                    
-                    with st.expander(f"{emoji} Licitación {idx+1}: {nombre_lic}"):
-                        
-                        # Documentos Requeridos (Nuevo)
-                        if evaluacion['documentos_necesarios']:
-                            st.markdown("#### 📝 Documentos Requeridos:")
-                            st.markdown("<ul>" + "".join([f"<li>{doc}</li>" for doc in evaluacion['documentos_necesarios']]) + "</ul>", unsafe_allow_html=True)
-                            st.markdown("---")
-                        
-                        # Alertas de caducidad (prioritario)
-                        if evaluacion['alertas_caducidad']:
-                            st.markdown("#### ⚠️ Alertas de Caducidad:")
-                            for alerta in evaluacion['alertas_caducidad']:
-                                if alerta['estado'] == 'caducado':
-                                    st.error(f"🚨 **{alerta['producto']}** - CADUCADO (venció hace {abs(alerta['dias'])} días)")
-                                else:
-                                    st.warning(f"⏰ **{alerta['producto']}** - Caduca en {alerta['dias']} días")
-                            st.markdown("---")
-                        
-                        # Productos sin stock
-                        if evaluacion['productos_sin_stock']:
-                            st.markdown("#### ❌ Productos NO Disponibles:")
-                            for producto in evaluacion['productos_sin_stock']:
-                                st.error(f"**{producto['nombre']}** - Cantidad: {producto['cantidad_requerida']} - Categoría: {producto['categoria']}")
-                            st.markdown("---")
-                        
-                        # Productos con stock insuficiente
-                        if evaluacion['productos_con_stock_insuficiente']:
-                            st.markdown("#### ⚠️ Productos con Stock Insuficiente:")
-                            for producto in evaluacion['productos_con_stock_insuficiente']:
-                                st.warning(f"**{producto['nombre']}** - Requiere: {producto['cantidad_requerida']}, Disponible: {producto['stock_disponible']}, Faltan: {producto['faltante']}")
-                            st.markdown("---")
-                        
-                        # Productos disponibles
-                        if evaluacion['productos_disponibles']:
-                            st.markdown("#### ✅ Productos Disponibles:")
-                            for producto in evaluacion['productos_disponibles']:
-                                lote_info = f" - Lote: {producto['lote']}" if producto['lote'] and producto['lote'] != 'nan' else ""
-                                caducidad_info = f" - Caduca: {producto['caducidad']}" if producto['caducidad'] and producto['caducidad'] != 'nan' else ""
-                                
-                                st.success(f"**{producto['nombre']}** - Requiere: {producto['cantidad_requerida']}, Disponible: {producto['stock_disponible']}{lote_info}{caducidad_info}")
-                        
-                        # Resumen por categorías
-                        if evaluacion['categorias_productos']:
-                            st.markdown("---")
-                            st.markdown("#### 📊 Resumen por Categoría:")
-                            
-                            for categoria, stats in evaluacion['categorias_productos'].items():
-                                total_cat = stats['total']
-                                disp_cat = stats['disponibles']
-                                porcentaje = (disp_cat / total_cat) * 100 if total_cat > 0 else 0
-                                
-                                if porcentaje == 100:
-                                    st.success(f"✅ **{categoria}**: {disp_cat}/{total_cat} productos ({porcentaje:.0f}%)")
-                                elif porcentaje >= 50:
-                                    st.warning(f"⚠️ **{categoria}**: {disp_cat}/{total_cat} productos ({porcentaje:.0f}%)")
-                                else:
-                                    st.error(f"❌ **{categoria}**: {disp_cat}/{total_cat} productos ({porcentaje:.0f}%)")
+            # Avance estimado por los bytes ya leídos del archivo
+            fraccion = min(1.0, fuente.tell() / max(1, len(contenido_licitaciones)))
+            progreso.progress(fraccion, text=f"{contadores['total']} licitaciones evaluadas")
+            with metricas.container():
+                col1, col2, col3, col4 = st.columns(4)
+                col1.metric("Total Licitaciones", contadores['total'])
+                col2.metric("✅ Aptas", contadores['VERDE'])
+                col3.metric("⚠️ Revisar", contadores['AMARILLO'])
+                col4.metric("❌ No Aptas", contadores['ROJO'])
+        
+        progreso.empty()
+        metricas.empty()
+        limpiar_resultados()
+        acumular('analisis_total', time.perf_counter() - inicio_analisis)
+        st.session_state['analisis'] = {
+            'clave': clave_analisis,
+            'streaming': True,
+            'ruta': ruta_resultados,
+            'contadores': contadores,
+            'tiempos': estadisticas()
+        }
+    elif analisis is None or analisis['clave'] != clave_analisis:
+        with st.spinner("Procesando análisis médico especializado..."), medir('analisis_total'):
+            # Una sola fecha de referencia para todas las caducidades de esta ejecución, en una copia del
+            # índice en caché (otras sesiones pueden estar analizando con otra fecha)
+            indice_analisis = indice_a_fecha(indice_inventario, datetime.now())
+            productos = extraer_productos_licitaciones(huella_licitaciones, licitaciones_df)
             
-            # Descarga de resultados
-            csv_resultado = resultados_df.to_csv(index=False)
-            st.download_button(
-                label="📥 Descargar Análisis Completo (CSV)",
-                data=csv_resultado,
-                file_name=f"analisis_licitaciones_medicas_{datetime.now().strftime('%Y%m%d_%H%M')}.csv",
-                mime="text/csv"
+            # Si solo cambió el inventario (o el día), se reevalúan las licitaciones afectadas;
+            # con stock reservado entre licitaciones cualquier cambio puede afectar a todas
+            misma_base = (
+                analisis is not None
+                and not analisis.get('streaming')
+                and politica_asignacion is None
+                and analisis['clave'][0] == clave_analisis[0]
+                and analisis['clave'][2:4] == clave_analisis[2:4]
+                and analisis['clave'][6] is None
             )
+            if misma_base:
+                evaluaciones_detalladas, firmas, afectadas = reevaluar_licitaciones(
+                    licitaciones_df, inventario_df, documentos_df, indice_analisis, productos,
+                    analisis['evaluaciones'], analisis['firmas'], trabajadores=trabajadores,
+                    indice_documentos=indice_documentos
+                )
+                st.info(f"♻️ Inventario actualizado: {len(afectadas)} de {len(licitaciones_df)} licitaciones reevaluadas")
+            else:
+                asignaciones = asignar_stock(productos, indice_analisis, politica_asignacion) if politica_asignacion else None
+                evaluaciones_detalladas = evaluar_licitaciones(
+                    licitaciones_df, inventario_df, documentos_df, indice_analisis,
+                    trabajadores=trabajadores, productos=productos, indice_documentos=indice_documentos,
+                    asignaciones=asignaciones
+                )
+                firmas = firmas_productos(productos, inventario_df, indice_analisis)
             
-            # Estadísticas adicionales
-            st.markdown("### 📊 Estadísticas Generales")
+            # Tabla de resultados en columnas: la leen el resumen, el detalle y las descargas
+            with medir('tabla_resultados'):
+                resultados_df = tabla_resultados(licitaciones_df, evaluaciones_detalladas)
+        
+        st.session_state['analisis'] = {
+            'clave': clave_analisis,
+            'resultados': resultados_df,
+            'evaluaciones': evaluaciones_detalladas,
+            'firmas': firmas,
+            'tiempos': estadisticas()
+        }
+
+# Mostrar el análisis guardado mientras los archivos no cambien
+inicio_renderizado = time.perf_counter()
+analisis = st.session_state.get('analisis')
+if analisis is not None and analisis['clave'] == clave_analisis and analisis.get('streaming'):
+    contadores = analisis['contadores']
+    total = contadores['total']
+    
+    try:
+        # Se marca como reciente para que la limpieza de otros análisis no lo borre mientras se consulta
+        os.utime(analisis['ruta'])
+        en_cache = True
+    except FileNotFoundError:
+        en_cache = False
+    
+    if not en_cache:
+        st.warning("El archivo de resultados ya no está en la caché: vuelve a analizar las licitaciones.")
+    elif total > 0:
+        verdes, amarillos, rojos = contadores['VERDE'], contadores['AMARILLO'], contadores['ROJO']
+        
+        st.markdown("### 📈 Resumen Ejecutivo")
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Total Licitaciones", total)
+        col2.metric("✅ Aptas", verdes, f"{verdes/total*100:.1f}%")
+        col3.metric("⚠️ Revisar", amarillos, f"{amarillos/total*100:.1f}%")
+        col4.metric("❌ No Aptas", rojos, f"{rojos/total*100:.1f}%")
+        
+        if contadores['alertas'] > 0:
+            st.warning(f"⚠️ {contadores['alertas']} productos con alertas de caducidad detectados")
+        
+        # Solo una vista previa: el resultado completo está en disco
+        st.subheader("📋 Resultados por Licitación")
+        st.caption(f"Primeras {FILAS_VISTA_PREVIA} filas; el análisis completo está en el archivo descargable.")
+        st.dataframe(pd.read_csv(analisis['ruta'], nrows=FILAS_VISTA_PREVIA), use_container_width=True)
+        
+        if contadores['productos'] > 0:
+            st.write(f"Disponibilidad general: {contadores['disponibles'] / contadores['productos'] * 100:.1f}%")
+        
+        # El CSV ya está en disco; Parquet y Excel se convierten desde él por bloques al pulsar
+        botones_descarga(
+            tablas_archivo_resultados(analisis['ruta']), huella_contenido(repr(clave_analisis).encode()),
+            archivo_csv=analisis['ruta']
+        )
+        
+        if mostrar_detalles:
+            st.info("El análisis detallado por licitación no está disponible en el modo streaming.")
+    else:
+        st.error("No se pudieron procesar las licitaciones. Verifica el formato de los archivos.")
+
+elif analisis is not None and analisis['clave'] == clave_analisis:
+    resultados_df = analisis['resultados']
+    evaluaciones_detalladas = analisis['evaluaciones']
+    
+    if not resultados_df.empty:
+        # Métricas generales
+        total = len(resultados_df)
+        por_estado = resultados_df['Estado'].value_counts()
+        verdes, amarillos, rojos = int(por_estado['VERDE']), int(por_estado['AMARILLO']), int(por_estado['ROJO'])
+        
+        st.markdown("### 📈 Resumen Ejecutivo")
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Total Licitaciones", total)
+        col2.metric("✅ Aptas", verdes, f"{verdes/total*100:.1f}%" if total > 0 else "0%")
+        col3.metric("⚠️ Revisar", amarillos, f"{amarillos/total*100:.1f}%" if total > 0 else "0%")
+        col4.metric("❌ No Aptas", rojos, f"{rojos/total*100:.1f}%" if total > 0 else "0%")
+        
+        # Alertas importantes
+        total_alertas = resultados_df['Alertas_Caducidad'].sum()
+        if total_alertas > 0:
+            st.warning(f"⚠️ {total_alertas} productos con alertas de caducidad detectados")
+        
+        # Tabla de resultados
+        st.subheader("📋 Resultados por Licitación")
+        
+        # Mapear estados a emojis
+        resultados_display = resultados_df.copy()
+        resultados_display['Estado'] = resultados_display['Estado'].map(ETIQUETAS_ESTADO)
+        
+        st.dataframe(resultados_display, use_container_width=True)
+        
+        # Análisis detallado: filtrado, paginado y solo de la licitación seleccionada
+        if mostrar_detalles:
+            st.subheader("🔍 Análisis Detallado por Licitación")
             
             col1, col2 = st.columns(2)
+            estados_filtro = col1.multiselect("Filtrar por estado", list(ETIQUETAS_ESTADO), format_func=ETIQUETAS_ESTADO.get)
+            categorias = sorted({producto.categoria for evaluacion in evaluaciones_detalladas for producto in evaluacion.productos})
+            categorias_filtro = col2.multiselect("Filtrar por categoría", categorias)
             
-            with col1:
-                st.markdown("**Distribución por Estado:**")
-                st.write(f"🟢 Aptas: {verdes} ({verdes/total*100:.1f}%)")
-                st.write(f"🟡 Para revisar: {amarillos} ({amarillos/total*100:.1f}%)")
-                st.write(f"🔴 No aptas: {rojos} ({rojos/total*100:.1f}%)")
+            # El estado se filtra sobre la tabla; la categoría, sobre los productos de cada evaluación
+            seleccion = resultados_df['Estado'].isin(estados_filtro) if estados_filtro else pd.Series(True, index=resultados_df.index)
+            if categorias_filtro:
+                seleccion &= [
+                    any(producto.categoria in categorias_filtro for producto in evaluacion.productos)
+                    for evaluacion in evaluaciones_detalladas
+                ]
+            posiciones = seleccion.to_numpy().nonzero()[0].tolist()
             
-            with col2:
-                st.markdown("**Productos Analizados:**")
-                total_productos = resultados_df['Productos'].sum()
-                productos_disponibles = resultados_df['Disponibles'].sum()
+            if not posiciones:
+                st.info("Ninguna licitación coincide con los filtros seleccionados.")
+            else:
+                paginas = -(-len(posiciones) // LICITACIONES_POR_PAGINA)
+                # El valor del control vive solo en session_state; al filtrar puede haber menos páginas que la seleccionada
+                if st.session_state.setdefault('pagina_detalle', 1) > paginas:
+                    st.session_state['pagina_detalle'] = paginas
+                pagina = st.number_input(f"Página (de {paginas})", min_value=1, max_value=paginas, key='pagina_detalle')
                 
-                if total_productos > 0:
-                    porcentaje_general = (productos_disponibles / total_productos) * 100
-                    st.write(f"Total de productos: {total_productos}")
-                    st.write(f"Productos disponibles: {productos_disponibles}")
-                    st.write(f"Disponibilidad general: {porcentaje_general:.1f}%")
+                inicio = (pagina - 1) * LICITACIONES_POR_PAGINA
+                posiciones_pagina = posiciones[inicio:inicio + LICITACIONES_POR_PAGINA]
+                st.caption(f"{len(posiciones)} licitaciones; mostrando {inicio + 1}-{inicio + len(posiciones_pagina)}")
+                st.dataframe(resultados_display.iloc[posiciones_pagina], use_container_width=True, hide_index=True)
                 
-                if total_alertas > 0:
-                    st.write(f"⚠️ Productos con alertas: {total_alertas}")
+                seleccionada = st.selectbox(
+                    "Licitación a detallar",
+                    posiciones_pagina,
+                    format_func=lambda posicion: (
+                        f"{ETIQUETAS_ESTADO[resultados_df['Estado'].iat[posicion]]} - "
+                        f"Licitación {posicion + 1}: {resultados_df['Licitación'].iat[posicion]}"
+                    )
+                )
+                with st.container(border=True):
+                    mostrar_detalle_licitacion(evaluaciones_detalladas[seleccionada])
+        
+        # Descarga de resultados: resumen, líneas de producto, alertas y documentos (y, con el debug activo,
+        # los tiempos del análisis); nada se genera hasta pulsar un botón
+        st.markdown("**📥 Descargas:**")
+        tablas = tablas_analisis(resultados_df, evaluaciones_detalladas)
+        if mostrar_debug and analisis.get('tiempos'):
+            tablas['tiempos'] = lambda: iter([pd.DataFrame(tabla_tiempos(analisis['tiempos']))])
+        botones_descarga(tablas, huella_contenido(repr((clave_analisis, 'tiempos' in tablas)).encode()))
+        
+        # Estadísticas adicionales
+        st.markdown("### 📊 Estadísticas Generales")
         
-        else:
-            st.error("No se pudieron procesar las licitaciones. Verifica el formato de los archivos.")
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            st.markdown("**Distribución por Estado:**")
+            st.write(f"🟢 Aptas: {verdes} ({verdes/total*100:.1f}%)")
+            st.write(f"🟡 Para revisar: {amarillos} ({amarillos/total*100:.1f}%)")
+            st.write(f"🔴 No aptas: {rojos} ({rojos/total*100:.1f}%)")
+        
+        with col2:
+            st.markdown("**Productos Analizados:**")
+            total_productos = resultados_df['Productos'].sum()
+            productos_disponibles = resultados_df['Disponibles'].sum()
+            
+            if total_productos > 0:
+                porcentaje_general = (productos_disponibles / total_productos) * 100
+                st.write(f"Total de productos: {total_productos}")
+                st.write(f"Productos disponibles: {productos_disponibles}")
+                st.write(f"Disponibilidad general: {porcentaje_general:.1f}%")
+            
+            if total_alertas > 0:
+                st.write(f"⚠️ Productos con alertas: {total_alertas}")
+    
+    else:
+        st.error("No se pudieron procesar las licitaciones. Verifica el formato de los archivos.")
+
+# Tiempos por etapa: los del último análisis, la carga de archivos y el renderizado de esta ejecución
+if mostrar_debug:
+    contadores_tiempos = dict(analisis.get('tiempos', {})) if analisis is not None and analisis['clave'] == clave_analisis else {}
+    contadores_tiempos['renderizado'] = (1, time.perf_counter() - inicio_renderizado)
+    for nombre, (_, segundos) in cargas.items():
+        contadores_tiempos[f"carga_{nombre}"] = (1, segundos)
+    with panel_tiempos:
+        st.write("**⏱️ Tiempos por etapa:**")
+        st.dataframe(pd.DataFrame(tabla_tiempos(contadores_tiempos)), use_container_width=True, hide_index=True)
 
 # Footer informativo
 st.markdown("---")
@@ -1321,13 +825,14 @@ st.markdown("""
    - **Documentos Requeridos (Opcional)**: CSV/Excel con columnas 'id_licitacion' y 'documento'
 
 2. **Cargar archivos** usando los selectores en la barra lateral
+   - Con **Guardar inventario (SQLite)** el inventario queda guardado entre sesiones y su stock se ajusta sin volver a subirlo; las búsquedas se hacen en la base y en memoria solo quedan las columnas que usa el análisis
 
 3. **Ejecutar análisis** presionando el botón "Analizar Licitaciones Médicas"
 
 4. **Revisar resultados**:
    - Métricas ejecutivas
    - Tabla de resultados por licitación
-   - Análisis detallado expandible
+   - Análisis detallado por páginas, filtrable por estado y categoría
    - Descarga de reporte CSV
 
 ### Soporte Técnico:
@@ -1336,5 +841,5 @@ st.markdown("""
 - Genera alertas de caducidad automáticas
 - Clasifica por 15+ categorías médicas especializadas
 
-**Nota**: Si un producto no es reconocido, revisa la ortografía o contacta soporte para agregar nuevos términos al vocabulario médico.
+**Nota**: Si un producto no es reconocido, revisa la ortografía o agrega sus variantes y sinónimos al catálogo `catalogo_medico.json` (no requiere cambios de código).
 """)
\ No newline at end of file
@@ -0,0 +1,227 @@
+"""Inventario persistente en SQLite: se importa una vez y se busca con un índice de texto completo (FTS5) y de palabras"""
+import os
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+
+import pandas as pd
+
+from carga import huella_contenido, leer_tabla
+from catalogo import DIRECTORIO_CACHE
+from esquema import ESQUEMA_INVENTARIO, detectar_esquema, filtro_columnas
+from instrumentacion import etapa
+from motor import palabras_texto, texto_fila
+
+RUTA_ALMACEN = Path(os.environ.get('LICITACIONES_ALMACEN', DIRECTORIO_CACHE / 'inventario.sqlite'))
+
+# Versión de las tablas: a los almacenes de la versión 1 les falta la tabla de palabras, que se crea al leerlos
+FORMATO_ALMACEN = 2
+
+def _fts5_disponible():
+    """Indica si el SQLite de Python tiene FTS5 con el tokenizador de trigramas (SQLite 3.34 o posterior)"""
+    try:
+        with closing(sqlite3.connect(':memory:')) as conexion:
+            conexion.execute("CREATE VIRTUAL TABLE prueba USING fts5(texto, tokenize='trigram')")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+# Sin FTS5, los textos se guardan en una tabla normal y se recorren con instr()
+FTS5_DISPONIBLE = _fts5_disponible()
+
+def _conectar(ruta=None, solo_lectura=False):
+    """Conexión nueva al almacén (una por operación: no se comparten entre hilos ni procesos)"""
+    ruta = Path(ruta or RUTA_ALMACEN)
+    if solo_lectura:
+        return sqlite3.connect(f"{ruta.resolve().as_uri()}?mode=ro", uri=True)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    return sqlite3.connect(ruta)
+
+def _identificador(nombre):
+    """Nombre de columna entre comillas para usarlo en una sentencia SQL"""
+    return '"' + str(nombre).replace('"', '""') + '"'
+
+def _metadatos(conexion):
+    """{clave: valor} de la tabla de metadatos (vacío si el almacén aún no tiene inventario)"""
+    try:
+        return dict(conexion.execute("SELECT clave, valor FROM metadatos"))
+    except sqlite3.OperationalError:
+        return {}
+
+def info_almacen(ruta=None):
+    """Metadatos del inventario guardado (huella, origen, nombre, filas, columna_stock) o None si no hay"""
+    if not Path(ruta or RUTA_ALMACEN).exists():
+        return None
+    with closing(_conectar(ruta, solo_lectura=True)) as conexion:
+        return _metadatos(conexion) or None
+
+def _leer(conexion, esquema=None):
+    """Tabla del inventario tal como quedó guardada, en el orden del archivo importado (con esquema, solo sus columnas)"""
+    columnas = '*'
+    if esquema is not None:
+        aceptada = filtro_columnas(esquema)
+        nombres = [fila[1] for fila in conexion.execute("PRAGMA table_info(inventario)") if fila[1] != '_fila']
+        columnas = ', '.join(['_fila'] + [_identificador(nombre) for nombre in nombres if aceptada(nombre)])
+    return pd.read_sql(f"SELECT {columnas} FROM inventario ORDER BY _fila", conexion).drop(columns='_fila')
+
+def _insertar_palabras(conexion, filas_textos):
+    """Añade a la tabla de palabras las palabras completas de cada (fila, texto), las mismas que indexa la memoria"""
+    # En el orden de la clave primaria, cada inserción va al final del árbol (varias veces más rápido)
+    conexion.executemany(
+        "INSERT INTO palabras (palabra, fila) VALUES (?, ?)",
+        sorted((palabra, fila) for fila, texto in filas_textos for palabra in palabras_texto(texto))
+    )
+
+def _crear_palabras(conexion):
+    """Tabla de palabras por fila y su índice, desde los textos de búsqueda ya guardados"""
+    # La clave primaria es el índice: sin rowid, cada palabra y sus filas se guardan juntas y ordenadas
+    conexion.execute(
+        "CREATE TABLE palabras (palabra TEXT NOT NULL, fila INTEGER NOT NULL, PRIMARY KEY (palabra, fila)) WITHOUT ROWID"
+    )
+    _insertar_palabras(conexion, conexion.cursor().execute("SELECT rowid, texto FROM busqueda"))
+
+def _actualizar_formato(ruta=None):
+    """Completa un almacén de una versión anterior (solo la primera vez que se lee)"""
+    metadatos = info_almacen(ruta)
+    if metadatos is None or metadatos.get('formato') == str(FORMATO_ALMACEN):
+        return
+    with closing(_conectar(ruta)) as conexion:
+        with conexion:
+            if _metadatos(conexion).get('formato') != str(FORMATO_ALMACEN):
+                conexion.execute("DROP TABLE IF EXISTS palabras")
+                _crear_palabras(conexion)
+                conexion.execute("INSERT OR REPLACE INTO metadatos VALUES ('formato', ?)", (str(FORMATO_ALMACEN),))
+
+@etapa('importacion_almacen')
+def importar_inventario(inventario_df, origen, nombre='', ruta=None):
+    """Sustituye el inventario guardado por el de un archivo; devuelve la huella de la nueva versión"""
+    ruta = Path(ruta or RUTA_ALMACEN)
+    # Se escribe en un archivo aparte y se reemplaza al final: quien lea a la vez ve el inventario completo
+    temporal = ruta.with_suffix(f'.{os.getpid()}.tmp')
+    temporal.unlink(missing_ok=True)
+    try:
+        with closing(_conectar(temporal)) as conexion:
+            inventario_df.reset_index(drop=True).to_sql('inventario', conexion, index=True, index_label='_fila')
+            # Los textos se generan desde lo guardado, igual que el índice que se construye al leerlo
+            guardado = _leer(conexion)
+            if FTS5_DISPONIBLE:
+                conexion.execute("CREATE VIRTUAL TABLE busqueda USING fts5(texto, tokenize='trigram')")
+            else:
+                conexion.execute("CREATE TABLE busqueda (texto TEXT)")
+            conexion.executemany(
+                "INSERT INTO busqueda (rowid, texto) VALUES (?, ?)",
+                ((posicion, texto_fila(valores)) for posicion, valores in enumerate(guardado.itertuples(index=False, name=None)))
+            )
+            _crear_palabras(conexion)
+            
+            columnas_stock = detectar_esquema(guardado, ESQUEMA_INVENTARIO)['stock']
+            metadatos = {
+                'huella': origen,
+                'origen': origen,
+                'nombre': nombre,
+                'filas': str(len(guardado)),
+                'columna_stock': columnas_stock[0] if columnas_stock else '',
+                'formato': str(FORMATO_ALMACEN)
+            }
+            conexion.execute("CREATE TABLE metadatos (clave TEXT PRIMARY KEY, valor TEXT)")
+            conexion.executemany("INSERT INTO metadatos VALUES (?, ?)", metadatos.items())
+            conexion.commit()
+        os.replace(temporal, ruta)
+    finally:
+        temporal.unlink(missing_ok=True)
+    return origen
+
+def importar_archivo(contenido, nombre, ruta=None):
+    """Importa un archivo subido salvo que sea el último importado; devuelve la huella del inventario guardado"""
+    origen = huella_contenido(contenido)
+    info = info_almacen(ruta)
+    if info is not None and info.get('origen') == origen:
+        # El mismo archivo otra vez: se conservan los cambios de stock hechos desde entonces
+        return info['huella']
+    return importar_inventario(leer_tabla(contenido, nombre, origen), origen, nombre, ruta)
+
+def leer_inventario(ruta=None, esquema=None):
+    """Inventario guardado como DataFrame (mismas columnas y orden que el archivo importado; con esquema, solo sus columnas)"""
+    if info_almacen(ruta) is None:
+        raise ValueError(f"No hay inventario guardado en {ruta or RUTA_ALMACEN}")
+    _actualizar_formato(ruta)
+    with closing(_conectar(ruta, solo_lectura=True)) as conexion:
+        return _leer(conexion, esquema)
+
+@etapa('consulta_almacen')
+def filas_con_texto(termino, ruta=None):
+    """Posiciones ordenadas de las filas cuyo texto contiene el término, con el índice de texto completo"""
+    with closing(_conectar(ruta, solo_lectura=True)) as conexion:
+        if FTS5_DISPONIBLE and len(termino) >= 3:
+            # La frase entre comillas busca la subcadena por sus trigramas; instr() descarta coincidencias
+            # que solo lo son sin distinguir mayúsculas
+            cursor = conexion.execute(
+                "SELECT rowid FROM busqueda WHERE busqueda MATCH ? AND instr(texto, ?) > 0 ORDER BY rowid",
+                ('"' + termino.replace('"', '""') + '"', termino)
+            )
+        else:
+            # Menos de tres caracteres no forman un trigrama: se recorre la tabla
+            cursor = conexion.execute("SELECT rowid FROM busqueda WHERE instr(texto, ?) > 0 ORDER BY rowid", (termino,))
+        return [posicion for (posicion,) in cursor]
+
+@etapa('consulta_almacen')
+def filas_con_palabras(termino, ruta=None):
+    """Posiciones ordenadas de las filas con todas las palabras del término, juntas y en orden si son varias"""
+    partes = termino.split()
+    if not partes:
+        return []
+    condiciones = ["rowid IN (SELECT fila FROM palabras WHERE palabra = ?)"] * len(partes)
+    parametros = list(partes)
+    if len(partes) > 1:
+        condiciones.append("instr(texto, ?) > 0")
+        parametros.append(termino)
+    with closing(_conectar(ruta, solo_lectura=True)) as conexion:
+        cursor = conexion.execute(
+            f"SELECT rowid FROM busqueda WHERE {' AND '.join(condiciones)} ORDER BY rowid", parametros
+        )
+        return [posicion for (posicion,) in cursor]
+
+def palabras_guardadas(ruta=None):
+    """Palabras distintas del inventario guardado (vocabulario de la búsqueda aproximada), sin leer las filas"""
+    with closing(_conectar(ruta, solo_lectura=True)) as conexion:
+        return [palabra for (palabra,) in conexion.execute("SELECT DISTINCT palabra FROM palabras")]
+
+def texto_guardado(posicion, ruta=None):
+    """Texto de búsqueda de una fila del inventario guardado"""
+    with closing(_conectar(ruta, solo_lectura=True)) as conexion:
+        fila = conexion.execute("SELECT texto FROM busqueda WHERE rowid = ?", (int(posicion),)).fetchone()
+    return fila[0] if fila else ''
+
+def actualizar_stock(posicion, stock, ruta=None):
+    """Cambia en el sitio el stock de una fila del inventario guardado; devuelve la huella de la nueva versión"""
+    _actualizar_formato(ruta)
+    with closing(_conectar(ruta)) as conexion:
+        with conexion:
+            metadatos = _metadatos(conexion)
+            if not metadatos:
+                raise ValueError(f"No hay inventario guardado en {ruta or RUTA_ALMACEN}")
+            if not metadatos['columna_stock']:
+                raise ValueError("El inventario guardado no tiene columna de stock")
+            
+            cursor = conexion.execute(
+                f"UPDATE inventario SET {_identificador(metadatos['columna_stock'])} = ? WHERE _fila = ?",
+                (int(stock), int(posicion))
+            )
+            if cursor.rowcount == 0:
+                raise ValueError(f"El inventario guardado no tiene la fila {posicion}")
+            
+            # El stock forma parte del texto de búsqueda de la fila y de sus palabras
+            (anterior,) = conexion.execute("SELECT texto FROM busqueda WHERE rowid = ?", (int(posicion),)).fetchone()
+            fila = pd.read_sql("SELECT * FROM inventario WHERE _fila = ?", conexion, params=(int(posicion),))
+            texto = texto_fila(next(fila.drop(columns='_fila').itertuples(index=False, name=None)))
+            conexion.execute("UPDATE busqueda SET texto = ? WHERE rowid = ?", (texto, int(posicion)))
+            conexion.executemany(
+                "DELETE FROM palabras WHERE palabra = ? AND fila = ?",
+                ((palabra, int(posicion)) for palabra in palabras_texto(anterior))
+            )
+            _insertar_palabras(conexion, [(int(posicion), texto)])
+            
+            # Nueva versión: la huella cambia con cada actualización y con ella las cachés que dependen del inventario
+            huella = huella_contenido(f"{metadatos['huella']}:{posicion}:{stock}".encode())
+            conexion.execute("UPDATE metadatos SET valor = ? WHERE clave = 'huella'", (huella,))
+    return huella
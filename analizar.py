@@ -0,0 +1,112 @@
+"""Análisis de licitaciones por línea de comandos, sin Streamlit (trabajos nocturnos)
+
+Uso: python analizar.py licitaciones.csv inventario.xlsx [--documentos documentos.csv]
+         [--salida resultados.csv] [--detalle evaluaciones.json] [--trabajadores N]
+         [--asignacion {prioridad,fefo,cobertura}] [--almacen inventario.sqlite]
+
+Con --almacen el inventario se importa a SQLite (si no es el último importado) y se busca con su índice;
+sin archivo de inventario se analiza el que ya está guardado.
+"""
+import argparse
+import json
+import sqlite3
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+from asignacion import POLITICAS_ASIGNACION, asignar_stock
+from carga import cargar_concurrentemente, leer_tabla
+from esquema import ESQUEMA_DOCUMENTOS, ESQUEMA_INVENTARIO, ESQUEMA_LICITACIONES, preparar_documentos, preparar_licitaciones
+from motor import (
+    actualizar_caducidades, construir_indice_inventario, evaluar_licitaciones,
+    productos_por_licitacion, tabla_resultados
+)
+
+def leer_archivo(ruta, esquema=None):
+    """DataFrame de un archivo CSV o Excel del disco"""
+    ruta = Path(ruta)
+    return leer_tabla(ruta.read_bytes(), ruta.name, esquema=esquema)
+
+def leer_almacen(ruta_inventario, almacen):
+    """Inventario guardado en SQLite, importando antes el archivo si se indica"""
+    from almacen import importar_archivo, leer_inventario
+    
+    if ruta_inventario:
+        ruta_inventario = Path(ruta_inventario)
+        importar_archivo(ruta_inventario.read_bytes(), ruta_inventario.name, almacen)
+    # Solo las columnas del esquema: las búsquedas se hacen en la base
+    return leer_inventario(almacen, ESQUEMA_INVENTARIO)
+
+def cargar_archivos(ruta_licitaciones, ruta_inventario, ruta_documentos=None, almacen=None):
+    """Lee los archivos a la vez; devuelve {nombre: (DataFrame, segundos)}"""
+    tareas = {
+        'licitaciones': lambda: preparar_licitaciones(leer_archivo(ruta_licitaciones, ESQUEMA_LICITACIONES))[0],
+        'inventario': lambda: leer_almacen(ruta_inventario, almacen) if almacen else leer_archivo(ruta_inventario)
+    }
+    if ruta_documentos:
+        tareas['documentos'] = lambda: preparar_documentos(leer_archivo(ruta_documentos, ESQUEMA_DOCUMENTOS))[0]
+    return cargar_concurrentemente(tareas)
+
+def analizar(ruta_licitaciones, ruta_inventario, ruta_documentos=None, trabajadores=1, fecha_referencia=None,
+             politica=None, almacen=None):
+    """Evalúa los archivos y devuelve (tabla de resultados, evaluaciones detalladas, tiempos de carga)"""
+    cargas = cargar_archivos(ruta_licitaciones, ruta_inventario, ruta_documentos, almacen)
+    licitaciones_df = cargas['licitaciones'][0]
+    inventario_df = cargas['inventario'][0]
+    documentos_df = cargas['documentos'][0] if 'documentos' in cargas else None
+    
+    indice_inventario = construir_indice_inventario(inventario_df, almacen=almacen)
+    actualizar_caducidades(indice_inventario, fecha_referencia or datetime.now())
+    
+    productos = productos_por_licitacion(licitaciones_df)
+    evaluaciones = evaluar_licitaciones(
+        licitaciones_df, inventario_df, documentos_df, indice_inventario, trabajadores=trabajadores,
+        productos=productos, asignaciones=asignar_stock(productos, indice_inventario, politica) if politica else None
+    )
+    resultados = tabla_resultados(licitaciones_df, evaluaciones)
+    tiempos = {nombre: segundos for nombre, (_, segundos) in cargas.items()}
+    return resultados, evaluaciones, tiempos
+
+def main(argumentos=None):
+    """Punto de entrada de la línea de comandos"""
+    parser = argparse.ArgumentParser(description="Evalúa licitaciones médicas contra el inventario")
+    parser.add_argument('licitaciones', help="Archivo de licitaciones (CSV o Excel)")
+    parser.add_argument('inventario', nargs='?', help="Archivo de inventario (CSV o Excel); opcional con --almacen")
+    parser.add_argument('--documentos', help="Archivo de documentos requeridos (opcional)")
+    parser.add_argument('--salida', default='resultados_licitaciones.csv', help="CSV con la tabla de resultados")
+    parser.add_argument('--detalle', help="JSON con las evaluaciones detalladas (opcional)")
+    parser.add_argument('--trabajadores', type=int, default=1, help="Procesos de evaluación en paralelo")
+    parser.add_argument('--asignacion', choices=list(POLITICAS_ASIGNACION),
+                        help="Reserva el stock entre las licitaciones con esta política (por defecto, sin reservar)")
+    parser.add_argument('--almacen', help="Base SQLite con el inventario persistente (se crea al importar)")
+    args = parser.parse_args(argumentos)
+    if not args.inventario and not args.almacen:
+        parser.error("indica el archivo de inventario o --almacen")
+    
+    inicio = time.perf_counter()
+    try:
+        resultados, evaluaciones, tiempos = analizar(
+            args.licitaciones, args.inventario, args.documentos, args.trabajadores, politica=args.asignacion,
+            almacen=args.almacen
+        )
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"Error al cargar archivos: {e}", file=sys.stderr)
+        return 1
+    
+    resultados.to_csv(args.salida, index=False)
+    if args.detalle:
+        with open(args.detalle, 'w', encoding='utf-8') as archivo:
+            json.dump([evaluacion.como_dict() for evaluacion in evaluaciones], archivo, ensure_ascii=False, indent=2)
+    
+    estados = resultados['Estado'].value_counts()
+    print("Carga: " + ", ".join(f"{nombre} {segundos:.2f} s" for nombre, segundos in tiempos.items()))
+    print(
+        f"{len(resultados)} licitaciones en {time.perf_counter() - inicio:.2f} s: "
+        f"{estados['VERDE']} aptas, {estados['AMARILLO']} para revisar, {estados['ROJO']} no aptas"
+    )
+    print(f"Resultados: {args.salida}" + (f" | Detalle: {args.detalle}" if args.detalle else ""))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
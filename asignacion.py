@@ -0,0 +1,121 @@
+"""Reserva del stock entre todas las licitaciones de un análisis (cada unidad se asigna una sola vez)"""
+import heapq
+
+from instrumentacion import etapa
+from motor import clave_fefo, lotes_producto
+
+# Políticas de asignación: orden en que las licitaciones y los lotes reciben el stock
+POLITICAS_ASIGNACION = {
+    'prioridad': "Prioridad (orden del archivo)",
+    'fefo': "FEFO (primero el lote que caduca antes)",
+    'cobertura': "Máximo de licitaciones cubiertas"
+}
+
+# Las que reservan licitación a licitación en el orden del archivo y sirven para el modo streaming
+POLITICAS_SECUENCIALES = ('prioridad', 'fefo')
+
+def nueva_reserva(indice_inventario, politica='prioridad', por_bloques=False):
+    """Estado de una asignación: stock restante por fila y un montículo de lotes por producto"""
+    if politica not in POLITICAS_ASIGNACION:
+        raise ValueError(f"Política de asignación desconocida: {politica}")
+    if por_bloques and politica not in POLITICAS_SECUENCIALES:
+        raise ValueError(f"La política '{politica}' necesita todas las licitaciones a la vez")
+    
+    return {
+        'indice': indice_inventario,
+        'politica': politica,
+        'restante': list(indice_inventario['stock']),
+        'monticulos': {}
+    }
+
+def _clave_lote(reserva, posicion):
+    """Orden de consumo de un lote: fila del archivo, o el mismo orden FEFO que la búsqueda en el inventario"""
+    if reserva['politica'] == 'fefo':
+        return clave_fefo(reserva['indice'], posicion)
+    return posicion
+
+def _monticulo(reserva, nombre):
+    """Lotes del producto con stock, ordenados para consumirse (se crea al pedirlo por primera vez)"""
+    monticulo = reserva['monticulos'].get(nombre)
+    if monticulo is None:
+        restante = reserva['restante']
+        monticulo = [
+            (_clave_lote(reserva, posicion), posicion)
+            for posicion in lotes_producto(reserva['indice'], nombre)
+            if restante[posicion] > 0
+        ]
+        heapq.heapify(monticulo)
+        reserva['monticulos'][nombre] = monticulo
+    return monticulo
+
+def reservar_producto(reserva, nombre, cantidad):
+    """Toma hasta cantidad unidades de los lotes del producto; devuelve (reservado, ((fila, unidades), ...))"""
+    monticulo = _monticulo(reserva, nombre)
+    restante = reserva['restante']
+    tomados = []
+    pendiente = cantidad
+    while pendiente > 0 and monticulo:
+        _, posicion = monticulo[0]
+        # Una fila puede ser lote de varios productos: pudo agotarse desde otro montículo
+        if restante[posicion] > 0:
+            unidades = min(pendiente, restante[posicion])
+            restante[posicion] -= unidades
+            pendiente -= unidades
+            tomados.append((posicion, unidades))
+        if restante[posicion] == 0:
+            heapq.heappop(monticulo)
+    return cantidad - pendiente, tuple(tomados)
+
+def liberar(reserva, asignacion):
+    """Devuelve al stock lo reservado para una licitación"""
+    for nombre, (_, tomados) in asignacion.items():
+        monticulo = _monticulo(reserva, nombre)
+        for posicion, unidades in tomados:
+            reserva['restante'][posicion] += unidades
+            # Puede quedar repetido en el montículo: la copia agotada se descarta al llegar a ella
+            heapq.heappush(monticulo, (_clave_lote(reserva, posicion), posicion))
+
+def reservar(reserva, productos, completa=False):
+    """Reserva los productos de una licitación; con completa, None (sin reservar nada) si alguno no se cubre"""
+    asignacion = {}
+    for producto in productos:
+        if not lotes_producto(reserva['indice'], producto.nombre):
+            if completa:
+                liberar(reserva, asignacion)
+                return None
+            continue
+        asignacion[producto.nombre] = reservar_producto(reserva, producto.nombre, producto.cantidad)
+        if completa and asignacion[producto.nombre][0] < producto.cantidad:
+            liberar(reserva, asignacion)
+            return None
+    return asignacion
+
+@etapa('asignacion_stock')
+def asignar_stock(productos, indice_inventario, politica='prioridad'):
+    """Reserva por licitación para todo el análisis ({producto: (reservado, lotes)} por licitación, en orden)"""
+    reserva = nueva_reserva(indice_inventario, politica)
+    if politica in POLITICAS_SECUENCIALES:
+        return [reservar(reserva, productos_licitacion) for productos_licitacion in productos]
+    
+    # Cobertura: primero, y sin repartos parciales, las licitaciones que menos stock escaso piden
+    totales = {}
+    for productos_licitacion in productos:
+        for producto in productos_licitacion:
+            if producto.nombre not in totales:
+                lotes = lotes_producto(indice_inventario, producto.nombre)
+                totales[producto.nombre] = sum(reserva['restante'][posicion] for posicion in lotes)
+    
+    orden = sorted(
+        (sum(producto.cantidad / max(1, totales[producto.nombre]) for producto in productos_licitacion), posicion)
+        for posicion, productos_licitacion in enumerate(productos)
+        if productos_licitacion
+    )
+    asignaciones = [None] * len(productos)
+    for _, posicion in orden:
+        asignaciones[posicion] = reservar(reserva, productos[posicion], completa=True)
+    
+    # Lo que sobra se reparte entre las no cubiertas por orden del archivo
+    return [
+        asignacion if asignacion is not None else reservar(reserva, productos_licitacion)
+        for asignacion, productos_licitacion in zip(asignaciones, productos)
+    ]
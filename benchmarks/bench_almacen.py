@@ -0,0 +1,73 @@
+"""Benchmark del inventario guardado en SQLite frente al índice en memoria
+
+Para cada tamaño genera un inventario sintético, lo importa al almacén y busca
+los lotes de todos los productos del catálogo con los dos índices (deben dar
+las mismas filas). Mide la importación, la lectura desde la base y la búsqueda.
+
+Uso: python benchmarks/bench_almacen.py [--tamanos 1000 10000 100000] [--semilla S]
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from almacen import FTS5_DISPONIBLE, importar_inventario, leer_inventario
+from catalogo import cargar_catalogo
+from esquema import ESQUEMA_INVENTARIO
+from generador import generar_inventario
+from motor import construir_indice_inventario, lotes_producto
+
+def buscar_todos(indice, productos):
+    """(lotes por producto, segundos) buscando cada producto una vez con el índice dado"""
+    inicio = time.perf_counter()
+    lotes = {producto: lotes_producto(indice, producto) for producto in productos}
+    return lotes, time.perf_counter() - inicio
+
+def medir_tamano(tamano, semilla, directorio):
+    """Tiempos de importación, lectura y búsqueda para un inventario de tamano filas"""
+    inventario_df = generar_inventario(tamano, semilla)
+    productos = list(cargar_catalogo()['variantes'])
+    ruta = Path(directorio) / f"inventario_{tamano}.sqlite"
+    
+    inicio = time.perf_counter()
+    importar_inventario(inventario_df, f"sintetico_{tamano}", ruta=ruta)
+    importacion = time.perf_counter() - inicio
+    
+    inicio = time.perf_counter()
+    guardado_df = leer_inventario(ruta, ESQUEMA_INVENTARIO)
+    lectura = time.perf_counter() - inicio
+    
+    memoria, segundos_memoria = buscar_todos(construir_indice_inventario(inventario_df), productos)
+    almacen, segundos_almacen = buscar_todos(construir_indice_inventario(guardado_df, almacen=ruta), productos)
+    assert memoria == almacen, "El almacén no encuentra las mismas filas que el índice en memoria"
+    
+    return {
+        'tamano': tamano,
+        'importacion_s': importacion,
+        'lectura_s': lectura,
+        'busqueda_memoria_s': segundos_memoria,
+        'busqueda_almacen_s': segundos_almacen,
+        'archivo_mb': ruta.stat().st_size / 1e6
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del inventario guardado en SQLite")
+    parser.add_argument('--tamanos', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--semilla', type=int, default=0)
+    args = parser.parse_args()
+    
+    print(f"FTS5 con trigramas: {'sí' if FTS5_DISPONIBLE else 'no (se recorre la tabla con instr)'}")
+    print(f"{'filas':>8} {'importar':>9} {'leer':>7} {'buscar mem.':>12} {'buscar SQLite':>14} {'archivo':>9}")
+    with tempfile.TemporaryDirectory() as directorio:
+        for tamano in args.tamanos:
+            fila = medir_tamano(tamano, args.semilla, directorio)
+            print(
+                f"{fila['tamano']:>8} {fila['importacion_s']:>8.2f}s {fila['lectura_s']:>6.2f}s "
+                f"{fila['busqueda_memoria_s']:>11.3f}s {fila['busqueda_almacen_s']:>13.3f}s {fila['archivo_mb']:>7.1f}MB"
+            )
+
+if __name__ == '__main__':
+    main()
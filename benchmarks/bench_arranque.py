@@ -0,0 +1,54 @@
+"""Benchmark del arranque en frío del análisis por línea de comandos
+
+Mide en procesos nuevos la importación del motor, la de Streamlit (lo que
+pagaba cada ejecución cuando el motor vivía en Licitaciones.py) y una
+ejecución completa de analizar.py con archivos mínimos.
+
+Uso: python benchmarks/bench_arranque.py [repeticiones]
+"""
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+def medir(comando, repeticiones):
+    """Mediana del tiempo de pared de un comando en un proceso nuevo"""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        subprocess.run(comando, cwd=RAIZ, check=True, stdout=subprocess.DEVNULL)
+        tiempos.append(time.perf_counter() - inicio)
+    return statistics.median(tiempos)
+
+def main():
+    repeticiones = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    
+    with tempfile.TemporaryDirectory() as directorio:
+        directorio = Path(directorio)
+        (directorio / 'licitaciones.csv').write_text(
+            'nombre,descripcion\nL1,"100 paracetamol, 20 jeringas"\n', encoding='utf-8'
+        )
+        (directorio / 'inventario.csv').write_text(
+            'nombre,stock,lote,caducidad\nParacetamol 500mg,200,L001,2030-12-31\n', encoding='utf-8'
+        )
+        
+        casos = [
+            ('python vacío', [sys.executable, '-c', 'pass']),
+            ('import motor', [sys.executable, '-c', 'import motor']),
+            ('import streamlit + pandas', [sys.executable, '-c', 'import streamlit, pandas']),
+            ('analizar.py (2 archivos mínimos)', [
+                sys.executable, 'analizar.py',
+                str(directorio / 'licitaciones.csv'), str(directorio / 'inventario.csv'),
+                '--salida', str(directorio / 'resultados.csv')
+            ]),
+        ]
+        
+        for nombre, comando in casos:
+            print(f"{nombre:<35} {medir(comando, repeticiones) * 1000:8.0f} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""Benchmark de clasificar_producto_medico: recorrido lineal vs autómata
+
+Uso: python benchmarks/bench_clasificacion.py [repeticiones]
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from catalogo import cargar_catalogo, clasificar_producto_medico
+
+MUESTRAS = [
+    'paracetamol',
+    'gasas esteriles',
+    'jeringas',
+    'canula nasal',
+    'puntas nasales desechables adulto',
+    'tabletas recubiertas de cefadroxilina',
+    'equipo de venoclisis estandar sin filtro',
+    'solucion para irrigacion uso hospitalario',
+    'frasco ampula con polvo liofilizado para reconstituir',
+    'material de oficina papel bond tamano carta',
+]
+
+def clasificar_lineal(nombre):
+    """Implementación anterior: recorrido anidado de variantes y sufijos"""
+    catalogo = cargar_catalogo()
+    nombre_lower = nombre.lower()
+    for producto, variantes in catalogo['variantes'].items():
+        if any(variante in nombre_lower for variante in variantes):
+            return producto
+    for sufijo, categoria in catalogo['sufijos'].items():
+        if sufijo in nombre_lower:
+            return categoria
+    return None
+
+def medir(funcion, repeticiones):
+    """Latencia media por llamada en microsegundos"""
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        for muestra in MUESTRAS:
+            funcion(muestra)
+    return (time.perf_counter() - inicio) / (repeticiones * len(MUESTRAS)) * 1e6
+
+def main():
+    repeticiones = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    
+    for muestra in MUESTRAS:
+        assert clasificar_lineal(muestra) == clasificar_producto_medico(muestra), muestra
+    
+    antes = medir(clasificar_lineal, repeticiones)
+    despues = medir(clasificar_producto_medico, repeticiones)
+    
+    print(f"Antes (recorrido lineal): {antes:8.2f} µs/llamada")
+    print(f"Después (autómata):       {despues:8.2f} µs/llamada")
+    print(f"Mejora: {antes / despues:.1f}x")
+
+if __name__ == '__main__':
+    main()
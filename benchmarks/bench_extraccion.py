@@ -0,0 +1,106 @@
+"""Benchmark de extraer_productos_medicos con entradas patológicas
+
+Compara la cascada de expresiones regulares anterior con el extractor por
+tokens. La implementación anterior se corta al superar el límite de tiempo.
+
+Uso: python benchmarks/bench_extraccion.py [limite_segundos]
+"""
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from catalogo import clasificar_producto_medico
+from extraccion import LONGITUD_MAXIMA_DESCRIPCION, extraer_productos_medicos, normalizar_texto
+
+# Ejemplos de la guía de uso: ambos extractores deben coincidir
+EJEMPLOS = [
+    "100 paracetamol, 50 gasas esteriles, 20 jeringas",
+    "Licitación Amoxicilina 3",
+    "Licitación Paracetamol",
+    "300 jeringas, 100 agujas",
+    "10 ciprofloxacino 20 aciclovir 30 oseltamivir",
+]
+
+# Nombre seguido de dosis: se toma el número suelto tras la dosis (la versión anterior tomaba la dosis),
+# sin perder ninguno de los productos que encontraba la anterior
+EJEMPLOS_DOSIS = {
+    "doxiciclina 500mg 20": {'doxiciclina': 20},
+    "ATENOLOL 500mg 250": {'atenolol': 250},
+    "DESFIBRILADOR 250 mg 100": {'desfibrilador': 100},
+    "ibuprofeno 400mg x 200, paracetamol x 300": {'ibuprofeno': 200, 'paracetamol': 300},
+    "jeringas 5ml 2000 piezas": {'jeringas': 2000},
+    "ibuprofeno 400mg": {'ibuprofeno': 400},
+}
+
+def extraer_regex_anterior(descripcion):
+    """Patrones de la implementación anterior (sin respaldos ni deduplicación)"""
+    texto = normalizar_texto(descripcion)
+    productos = {}
+    patrones = [
+        r'(\d+)\s+([a-z\s]+?)(?=\d+\s+[a-z]|,|$)',
+        r'(\d+)\s*([a-z\s]+?)(?=,|$)',
+        r'([a-z\s]+?)\s+(\d+)'
+    ]
+    for patron in patrones:
+        for match in re.findall(patron, texto):
+            try:
+                if match[0].isdigit():
+                    cantidad, nombre = int(match[0]), match[1].strip()
+                else:
+                    cantidad, nombre = int(match[1]), match[0].strip()
+            except ValueError:
+                continue
+            if 0 < cantidad <= 100000 and len(nombre) > 2:
+                categoria = clasificar_producto_medico(nombre)
+                if categoria:
+                    productos[categoria] = max(cantidad, productos.get(categoria, 0))
+    return productos
+
+def entradas_patologicas(tamano):
+    """Descripciones largas que provocan retroceso en los patrones perezosos"""
+    return {
+        'palabras_sin_numeros': "gasas esteriles " * (tamano // 16),
+        'letras_sueltas': "a " * (tamano // 2),
+        'numero_y_texto_largo': "100 " + "jeringa desechable " * (tamano // 19),
+        'numeros_pegados': "1" * tamano + " paracetamol",
+        'especificacion_mixta': "100 paracetamol 500mg tabletas, " * (tamano // 32),
+    }
+
+def medir(funcion, texto, limite):
+    """Segundos de una llamada, o None si la anterior supera el límite"""
+    inicio = time.perf_counter()
+    funcion(texto)
+    transcurrido = time.perf_counter() - inicio
+    return transcurrido if transcurrido <= limite else None
+
+def main():
+    limite = float(sys.argv[1]) if len(sys.argv) > 1 else 5.0
+    
+    for ejemplo in EJEMPLOS:
+        nuevo = {p.nombre: p.cantidad for p in extraer_productos_medicos(ejemplo)}
+        anterior = extraer_regex_anterior(ejemplo)
+        assert not anterior or nuevo == anterior, (ejemplo, anterior, nuevo)
+    for ejemplo, esperado in EJEMPLOS_DOSIS.items():
+        nuevo = {p.nombre: p.cantidad for p in extraer_productos_medicos(ejemplo)}
+        assert nuevo == esperado and nuevo.keys() == extraer_regex_anterior(ejemplo).keys(), (ejemplo, nuevo)
+    
+    print(f"Límite por descripción: {LONGITUD_MAXIMA_DESCRIPCION} caracteres (el resto no se analiza)")
+    print(f"{'entrada':<24}{'caracteres':>12}{'anterior (s)':>15}{'tokens (s)':>13}")
+    omitidas = set()
+    for tamano in (1000, 5000, 20000, 100000, 1000000):
+        for nombre, texto in entradas_patologicas(tamano).items():
+            nuevo = medir(extraer_productos_medicos, texto, float('inf'))
+            if nombre in omitidas:
+                anterior = None
+            else:
+                anterior = medir(extraer_regex_anterior, texto, limite)
+                if anterior is None:
+                    omitidas.add(nombre)
+            columna_anterior = f"{anterior:.4f}" if anterior is not None else f"> {limite:g}"
+            print(f"{nombre:<24}{len(texto):>12}{columna_anterior:>15}{nuevo:>13.4f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+"""Benchmark del motor de evaluación con datos sintéticos de distintos tamaños
+
+Mide extraer_productos_medicos, buscar_en_inventario, verificar_caducidad,
+obtener_documentos_requeridos y evaluar_licitacion de extremo a extremo,
+además de la construcción de los índices. Cada tamaño genera licitaciones,
+inventario y documentos con ese número de filas; las funciones por llamada
+se miden sobre una muestra. Con --trabajadores N se mide además
+evaluar_licitaciones con todas las licitaciones en uno y en N procesos, sin
+el mínimo de licitaciones por proceso, para ver dónde se cruzan. La salida
+es JSON para comparar ejecuciones.
+
+Uso: python benchmarks/bench_motor.py [--tamanos 100 1000 10000] [--muestras N]
+         [--trabajadores N] [--semilla S] [--salida resultados.json]
+"""
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from catalogo import cargar_catalogo
+from esquema import preparar_documentos, preparar_licitaciones
+from extraccion import extraer_productos_medicos
+from generador import generar_documentos, generar_inventario, generar_licitaciones
+import motor
+from motor import (
+    actualizar_caducidades, buscar_en_inventario, construir_indice_documentos, construir_indice_inventario,
+    evaluar_licitacion, evaluar_licitaciones, obtener_documentos_requeridos, procesadores_disponibles,
+    productos_por_licitacion, verificar_caducidad
+)
+from registros import ProductoExtraido
+
+FECHA_REFERENCIA = datetime(2026, 6, 1)
+
+# Sinónimos cortos dentro de otras palabras ('asa' en 'gasas', 'o2' en 'co2'): no suman el stock de otros productos
+# (producto, cantidad, [(nombre, stock)], filas esperadas de los lotes)
+EJEMPLOS_SINONIMOS = [
+    ('aspirina', 100, [("Gasas esteriles 10x10", 5000), ("Aspirina", 10)], [1]),
+    ('aspirina', 100, [("Gasas esteriles 10x10", 5000), ("Guantes", 10)], []),
+    ('oxigeno', 1, [("Medidor CO2", 5), ("Oxigeno medicinal", 3)], [1]),
+    ('paracetamol', 10, [("Paracetamol500mg", 4), ("(Paracetamol) tabletas", 6)], [0, 1]),
+]
+
+def comprobar_sinonimos():
+    """Los lotes de cada ejemplo son exactamente las filas esperadas"""
+    for producto, cantidad, filas, esperadas in EJEMPLOS_SINONIMOS:
+        inventario_df = pd.DataFrame(filas, columns=['nombre', 'stock'])
+        resultado = buscar_en_inventario(
+            ProductoExtraido(producto, cantidad), inventario_df, construir_indice_inventario(inventario_df)
+        )
+        lotes = sorted(posicion for posicion, _ in resultado.get('lotes', ()))
+        assert lotes == esperadas and resultado['stock_disponible'] == sum(filas[i][1] for i in esperadas), (
+            producto, filas, resultado
+        )
+
+def medir_llamadas(funcion, argumentos):
+    """Estadísticas por llamada (µs) de funcion(*args) para cada tupla de argumentos"""
+    tiempos = []
+    for args in argumentos:
+        inicio = time.perf_counter()
+        funcion(*args)
+        tiempos.append((time.perf_counter() - inicio) * 1e6)
+    tiempos.sort()
+    return {
+        'llamadas': len(tiempos),
+        'media_us': statistics.fmean(tiempos),
+        'p50_us': tiempos[len(tiempos) // 2],
+        'p95_us': tiempos[min(len(tiempos) - 1, int(len(tiempos) * 0.95))],
+        'total_s': sum(tiempos) / 1e6
+    }
+
+def medir_total(funcion, *args):
+    """(resultado, segundos) de una sola llamada"""
+    inicio = time.perf_counter()
+    resultado = funcion(*args)
+    return resultado, time.perf_counter() - inicio
+
+def medir_paralelo(licitaciones_df, inventario_df, documentos_df, indice_documentos, trabajadores):
+    """Segundos de evaluar_licitaciones con todas las licitaciones en 1 y en N procesos (índice recién construido)"""
+    productos = productos_por_licitacion(licitaciones_df)
+    minimo = motor.MINIMO_LICITACIONES_POR_TRABAJADOR
+    motor.MINIMO_LICITACIONES_POR_TRABAJADOR = 1
+    try:
+        segundos = {}
+        for procesos in (1, trabajadores):
+            indice_inventario = construir_indice_inventario(inventario_df, FECHA_REFERENCIA)
+            _, segundos[procesos] = medir_total(
+                lambda: evaluar_licitaciones(
+                    licitaciones_df, inventario_df, documentos_df, indice_inventario, trabajadores=procesos,
+                    productos=productos, indice_documentos=indice_documentos
+                )
+            )
+    finally:
+        motor.MINIMO_LICITACIONES_POR_TRABAJADOR = minimo
+    return {'trabajadores': trabajadores, 'total_s': segundos[trabajadores], 'un_proceso_s': segundos[1]}
+
+def medir_tamano(tamano, muestras, semilla, trabajadores=None):
+    """Resultados de todas las funciones para un tamaño de archivos"""
+    aleatorio = random.Random(semilla)
+    resultados = []
+
+    def registrar(funcion, estadisticas):
+        resultados.append({'tamano': tamano, 'funcion': funcion, **estadisticas})
+    
+    inicio = time.perf_counter()
+    licitaciones_df = generar_licitaciones(tamano, semilla)
+    inventario_df = generar_inventario(tamano, semilla)
+    documentos_df = generar_documentos(tamano, licitaciones_df, semilla)
+    registrar('generar_datos', {'total_s': time.perf_counter() - inicio})
+    
+    (licitaciones_df, _), segundos = medir_total(preparar_licitaciones, licitaciones_df)
+    registrar('preparar_licitaciones', {'total_s': segundos})
+    indice_inventario, segundos = medir_total(construir_indice_inventario, inventario_df, FECHA_REFERENCIA)
+    registrar('construir_indice_inventario', {'total_s': segundos})
+    _, segundos = medir_total(actualizar_caducidades, indice_inventario, FECHA_REFERENCIA)
+    registrar('actualizar_caducidades', {'total_s': segundos})
+    (documentos_df, _), segundos = medir_total(preparar_documentos, documentos_df)
+    indice_documentos, segundos_indice = medir_total(construir_indice_documentos, documentos_df)
+    registrar('construir_indice_documentos', {'total_s': segundos + segundos_indice})
+    
+    posiciones = [aleatorio.randrange(tamano) for _ in range(min(muestras, tamano))]
+    descripciones = [licitaciones_df['_descripcion'].iat[pos] for pos in posiciones]
+    registrar('extraer_productos_medicos', medir_llamadas(
+        extraer_productos_medicos, [(descripcion,) for descripcion in descripciones]
+    ))
+    
+    productos = [producto for descripcion in descripciones for producto in extraer_productos_medicos(descripcion)]
+    productos = aleatorio.sample(productos, min(muestras, len(productos)))
+    registrar('buscar_en_inventario', medir_llamadas(
+        buscar_en_inventario, [(producto, inventario_df, indice_inventario) for producto in productos]
+    ))
+    
+    fechas = [inventario_df['caducidad'].iat[pos] for pos in posiciones]
+    registrar('verificar_caducidad', medir_llamadas(
+        verificar_caducidad, [(fecha, FECHA_REFERENCIA) for fecha in fechas]
+    ))
+    
+    ids = [licitaciones_df['_id'].iat[pos] for pos in posiciones]
+    registrar('obtener_documentos_requeridos', medir_llamadas(
+        obtener_documentos_requeridos, [(licitacion_id, documentos_df, indice_documentos) for licitacion_id in ids]
+    ))
+    
+    filas = [licitaciones_df.iloc[pos] for pos in posiciones]
+    registrar('evaluar_licitacion', medir_llamadas(
+        evaluar_licitacion,
+        [(fila, inventario_df, documentos_df, indice_inventario, None, indice_documentos) for fila in filas]
+    ))
+    
+    if trabajadores:
+        registrar('evaluar_licitaciones_paralelo', medir_paralelo(
+            licitaciones_df, inventario_df, documentos_df, indice_documentos, trabajadores
+        ))
+    return resultados
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del motor de evaluación de licitaciones")
+    parser.add_argument('--tamanos', type=int, nargs='+', default=[100, 1000, 10000],
+                        help="Filas de cada archivo sintético (hasta 1000000)")
+    parser.add_argument('--muestras', type=int, default=1000, help="Llamadas medidas por función y tamaño")
+    parser.add_argument('--trabajadores', type=int,
+                        help="Mide también evaluar_licitaciones en 1 y en N procesos")
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--salida', help="Archivo JSON de resultados (por defecto, salida estándar)")
+    args = parser.parse_args()
+    
+    cargar_catalogo()
+    comprobar_sinonimos()
+    informe = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'plataforma': platform.platform(),
+        'procesadores': procesadores_disponibles(),
+        'catalogo': cargar_catalogo()['version'],
+        'semilla': args.semilla,
+        'muestras': args.muestras,
+        'resultados': []
+    }
+    for tamano in args.tamanos:
+        informe['resultados'].extend(medir_tamano(tamano, args.muestras, args.semilla, args.trabajadores))
+        print(f"tamaño {tamano}: listo", file=sys.stderr)
+    
+    texto = json.dumps(informe, ensure_ascii=False, indent=2)
+    if args.salida:
+        Path(args.salida).write_text(texto + '\n', encoding='utf-8')
+    else:
+        print(texto)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+"""Generador reproducible de licitaciones, inventarios y documentos sintéticos
+
+Usa el vocabulario real del catálogo médico (variantes, sinónimos de marca,
+sufijos) con cantidades, unidades, ruido y formatos de fecha mezclados.
+
+Uso: python benchmarks/generador.py directorio [--licitaciones N] [--inventario N]
+         [--documentos N] [--semilla S]
+"""
+import argparse
+import json
+import random
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from catalogo import RUTA_CATALOGO
+
+PRESENTACIONES = ['tabletas', 'capsulas', 'ampolletas', 'frasco', 'caja c/100', 'sobres', 'solucion inyectable', '']
+DOSIS = ['500mg', '250 mg', '1g', '10 ml', '5ml', '100 mcg', '20mg', '']
+UNIDADES = ['piezas', 'cajas', 'unidades', 'frascos', 'ml', 'mg', '']
+RUIDO = [
+    'Adquisición de', 'Suministro urgente:', 'Compra consolidada', 'para el Hospital General',
+    'entrega inmediata', 'según especificaciones', 'Partida única', 'LOTE 3', 'IMSS', '(ver anexo técnico)'
+]
+SEPARADORES = [', ', '; ', ' y ', ' - ', '\n']
+DOCUMENTOS = [
+    'Certificado de Buenas Prácticas de Manufactura', 'Registro sanitario COFEPRIS', 'Carta de garantía',
+    'Ficha técnica', 'Constancia de situación fiscal', 'Opinión de cumplimiento SAT', 'Acta constitutiva',
+    'Poder notarial', 'Certificado de análisis', 'Carta de distribuidor autorizado'
+]
+FORMATOS_FECHA = ['%Y-%m-%d', '%d/%m/%Y', '%Y/%m/%d', '%d-%m-%Y', '%Y-%m-%d %H:%M:%S']
+
+def vocabulario():
+    """Nombres de producto del catálogo: (variantes y sinónimos por producto, palabras con sufijo)"""
+    datos = json.loads(RUTA_CATALOGO.read_text(encoding='utf-8'))
+    productos = []
+    for producto in datos['productos'].values():
+        nombres = sorted(set(producto.get('variantes', [])) | set(producto.get('sinonimos', [])))
+        if nombres:
+            productos.append(nombres)
+    # Palabras inventadas con sufijos farmacéuticos: se clasifican solo por el sufijo
+    con_sufijo = [f"{raiz}{sufijo}" for sufijo in datos['sufijos'] for raiz in ('neo', 'tri', 'bexa')]
+    return productos, con_sufijo
+
+def _variar(aleatorio, texto):
+    """Mayúsculas, tildes o espacios como aparecen en archivos reales"""
+    opcion = aleatorio.random()
+    if opcion < 0.2:
+        return texto.upper()
+    if opcion < 0.4:
+        return texto.title()
+    if opcion < 0.5:
+        return texto.replace('a', 'á', 1).replace('o', 'ó', 1)
+    if opcion < 0.55:
+        return f"  {texto} "
+    return texto
+
+def _producto_en_descripcion(aleatorio, nombre):
+    """Un producto con cantidad en alguno de los formatos habituales de las licitaciones"""
+    cantidad = aleatorio.choice([1, 5, 10, 20, 50, 100, 250, 500, 1000, aleatorio.randint(1, 5000)])
+    unidad = aleatorio.choice(UNIDADES)
+    dosis = aleatorio.choice(DOSIS)
+    formato = aleatorio.random()
+    if formato < 0.5:
+        texto = f"{cantidad} {unidad} {nombre} {dosis}"
+    elif formato < 0.7:
+        texto = f"{nombre} {dosis} {cantidad}"
+    elif formato < 0.85:
+        texto = f"{cantidad} {nombre} {aleatorio.choice(PRESENTACIONES)}"
+    else:
+        texto = f"{nombre} {aleatorio.choice(PRESENTACIONES)}"
+    return ' '.join(texto.split())
+
+def generar_licitaciones(filas, semilla=0):
+    """DataFrame de licitaciones (nombre, descripcion) con descripciones en texto libre"""
+    aleatorio = random.Random(semilla)
+    productos, con_sufijo = vocabulario()
+    nombres, descripciones = [], []
+    for numero in range(filas):
+        partes = []
+        if aleatorio.random() < 0.4:
+            partes.append(aleatorio.choice(RUIDO))
+        for _ in range(aleatorio.randint(1, 8)):
+            if aleatorio.random() < 0.05:
+                nombre = aleatorio.choice(con_sufijo)
+            else:
+                nombre = aleatorio.choice(aleatorio.choice(productos))
+            partes.append(_producto_en_descripcion(aleatorio, _variar(aleatorio, nombre)))
+        if aleatorio.random() < 0.3:
+            partes.append(aleatorio.choice(RUIDO))
+        
+        descripcion = partes[0]
+        for parte in partes[1:]:
+            descripcion += aleatorio.choice(SEPARADORES) + parte
+        # Algunas licitaciones vienen sin descripción
+        if aleatorio.random() < 0.01:
+            descripcion = None
+        nombres.append(f"LIC-{semilla:03d}-{numero:07d}")
+        descripciones.append(descripcion)
+    return pd.DataFrame({'nombre': nombres, 'descripcion': descripciones})
+
+def generar_inventario(filas, semilla=0, fecha_base=date(2026, 1, 1)):
+    """DataFrame de inventario (nombre, stock, lote, caducidad) con formatos de fecha mezclados"""
+    aleatorio = random.Random(semilla + 1)
+    productos, _ = vocabulario()
+    nombres, stocks, lotes, caducidades = [], [], [], []
+    for numero in range(filas):
+        nombre = aleatorio.choice(aleatorio.choice(productos))
+        nombres.append(_variar(aleatorio, f"{nombre} {aleatorio.choice(DOSIS)} {aleatorio.choice(PRESENTACIONES)}".strip()))
+        stocks.append(aleatorio.choice([0, aleatorio.randint(1, 50), aleatorio.randint(50, 5000)]))
+        lotes.append(f"L{aleatorio.randint(0, 99999):05d}")
+        
+        opcion = aleatorio.random()
+        if opcion < 0.03:
+            caducidades.append(None)
+        elif opcion < 0.05:
+            caducidades.append('sin fecha')
+        else:
+            fecha = fecha_base + timedelta(days=aleatorio.randint(-120, 900))
+            caducidades.append(fecha.strftime(aleatorio.choice(FORMATOS_FECHA)))
+    return pd.DataFrame({'nombre': nombres, 'stock': stocks, 'lote': lotes, 'caducidad': caducidades})
+
+def generar_documentos(filas, licitaciones_df, semilla=0):
+    """DataFrame de documentos requeridos (id_licitacion, documentos) para licitaciones existentes"""
+    aleatorio = random.Random(semilla + 2)
+    ids = licitaciones_df['nombre'].tolist()
+    return pd.DataFrame({
+        'id_licitacion': [aleatorio.choice(ids) for _ in range(filas)],
+        'documentos': [', '.join(aleatorio.sample(DOCUMENTOS, aleatorio.randint(1, 4))) for _ in range(filas)]
+    })
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera archivos CSV sintéticos para pruebas de rendimiento")
+    parser.add_argument('directorio', help="Directorio de salida")
+    parser.add_argument('--licitaciones', type=int, default=1000)
+    parser.add_argument('--inventario', type=int, default=1000)
+    parser.add_argument('--documentos', type=int, default=1000)
+    parser.add_argument('--semilla', type=int, default=0)
+    args = parser.parse_args()
+    
+    directorio = Path(args.directorio)
+    directorio.mkdir(parents=True, exist_ok=True)
+    licitaciones_df = generar_licitaciones(args.licitaciones, args.semilla)
+    licitaciones_df.to_csv(directorio / 'licitaciones.csv', index=False)
+    generar_inventario(args.inventario, args.semilla).to_csv(directorio / 'inventario.csv', index=False)
+    generar_documentos(args.documentos, licitaciones_df, args.semilla).to_csv(directorio / 'documentos.csv', index=False)
+    print(f"Archivos generados en {directorio}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""Lectura de los archivos subidos (CSV/Excel) e identificación por contenido"""
+import hashlib
+import importlib.util
+import io
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from catalogo import DIRECTORIO_CACHE
+from esquema import filtro_columnas
+from instrumentacion import etapa
+
+# Las hojas de cálculo ya leídas se guardan como Arrow (IPC sin comprimir) para mapearlas en memoria
+DIRECTORIO_TABLAS = DIRECTORIO_CACHE / 'tablas'
+MAXIMO_BYTES_TABLAS = int(os.environ.get('LICITACIONES_CACHE_TABLAS_MB', '512')) * 1024 * 1024
+FORMATO_TABLAS = 1
+
+# pyarrow es opcional: sin él, las hojas de cálculo se leen siempre con read_excel
+ARROW_DISPONIBLE = importlib.util.find_spec('pyarrow') is not None
+
+# calamine (python-calamine) es opcional y mucho más rápido que openpyxl; sin él, el motor por defecto
+MOTOR_EXCEL = 'calamine' if importlib.util.find_spec('python_calamine') is not None else None
+
+# Origen de la última lectura de cada hoja de cálculo por huella: 'acierto', 'fallo' o 'sin_cache'
+ORIGEN_TABLAS = {}
+
+def huella_contenido(contenido):
+    """Huella corta del contenido de un archivo: igual contenido, igual huella"""
+    return hashlib.sha256(contenido).hexdigest()[:16]
+
+def _clave_esquema(esquema):
+    """Identifica las columnas leídas: 'todas' o una huella de los alias del esquema"""
+    if esquema is None:
+        return 'todas'
+    aliases = sorted(alias for aliases, _ in esquema.values() for alias in aliases)
+    return huella_contenido(','.join(aliases).encode())[:8]
+
+def ruta_tabla_cache(huella, esquema=None):
+    """Archivo Arrow de la caché para una hoja de cálculo (y las columnas leídas de ella)"""
+    return DIRECTORIO_TABLAS / f"tabla_{huella}_{_clave_esquema(esquema)}_v{FORMATO_TABLAS}.arrow"
+
+def _leer_excel(contenido, esquema=None):
+    """read_excel con el motor más rápido disponible y solo las columnas del esquema"""
+    usecols = filtro_columnas(esquema) if esquema is not None else None
+    return pd.read_excel(io.BytesIO(contenido), engine=MOTOR_EXCEL, usecols=usecols)
+
+def _liberar_cache_tablas(maximo_bytes=None):
+    """Borra las tablas usadas hace más tiempo hasta que la caché quepa en el límite"""
+    maximo_bytes = MAXIMO_BYTES_TABLAS if maximo_bytes is None else maximo_bytes
+    try:
+        archivos = [(ruta.stat(), ruta) for ruta in DIRECTORIO_TABLAS.glob('tabla_*.arrow')]
+    except OSError:
+        return
+    
+    # Las lecturas actualizan la fecha de modificación: las más antiguas son las menos usadas
+    archivos.sort(key=lambda par: par[0].st_mtime)
+    total = sum(estado.st_size for estado, _ in archivos)
+    for estado, ruta in archivos:
+        if total <= maximo_bytes:
+            break
+        try:
+            ruta.unlink()
+            total -= estado.st_size
+        except OSError:
+            pass
+
+def _guardar_tabla_cache(df, ruta):
+    """Escribe la tabla en la caché; las columnas que Arrow no puede tipar dejan el archivo sin caché"""
+    temporal = ruta.with_suffix(f'.{os.getpid()}.tmp')
+    try:
+        DIRECTORIO_TABLAS.mkdir(parents=True, exist_ok=True)
+        df.to_feather(temporal, compression='uncompressed')
+        os.replace(temporal, ruta)
+    except (OSError, TypeError, ValueError):
+        # ArrowTypeError y ArrowInvalid derivan de TypeError y ValueError
+        try:
+            temporal.unlink(missing_ok=True)
+        except OSError:
+            pass
+        return False
+    
+    _liberar_cache_tablas()
+    return True
+
+def leer_hoja_calculo(contenido, huella=None, esquema=None):
+    """DataFrame de un Excel, desde la caché Arrow si ya se leyó antes el mismo contenido"""
+    huella = huella or huella_contenido(contenido)
+    if not ARROW_DISPONIBLE:
+        ORIGEN_TABLAS[huella] = 'sin_cache'
+        return _leer_excel(contenido, esquema)
+    
+    from pyarrow import feather
+    
+    ruta = ruta_tabla_cache(huella, esquema)
+    try:
+        df = feather.read_table(ruta, memory_map=True).to_pandas()
+        os.utime(ruta)
+        ORIGEN_TABLAS[huella] = 'acierto'
+        return df
+    except (OSError, ValueError):
+        pass
+    
+    df = _leer_excel(contenido, esquema)
+    ORIGEN_TABLAS[huella] = 'fallo' if _guardar_tabla_cache(df, ruta) else 'sin_cache'
+    return df
+
+@etapa('lectura_archivos')
+def leer_tabla(contenido, nombre, huella=None, esquema=None):
+    """DataFrame de un CSV o Excel sin filas vacías; con esquema, solo las columnas que este acepta"""
+    if nombre.endswith('.csv'):
+        usecols = filtro_columnas(esquema) if esquema is not None else None
+        df = pd.read_csv(io.BytesIO(contenido), usecols=usecols)
+    else:
+        df = leer_hoja_calculo(contenido, huella, esquema)
+    return df.dropna(how='all')
+
+def cargar_concurrentemente(tareas, inicializador=None):
+    """Ejecuta las cargas {nombre: función sin argumentos} en hilos; devuelve {nombre: (resultado, segundos)}"""
+    def cronometrar(funcion):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        return resultado, time.perf_counter() - inicio
+    
+    if len(tareas) <= 1:
+        return {nombre: cronometrar(funcion) for nombre, funcion in tareas.items()}
+    
+    with ThreadPoolExecutor(max_workers=len(tareas), initializer=inicializador) as executor:
+        futuros = {nombre: executor.submit(cronometrar, funcion) for nombre, funcion in tareas.items()}
+        return {nombre: futuro.result() for nombre, futuro in futuros.items()}
+
+def leer_tabla_por_bloques(fuente, nombre, filas_por_bloque, esquema=None):
+    """Genera DataFrames de hasta filas_por_bloque filas sin cargar el CSV completo en memoria"""
+    if nombre.endswith('.csv'):
+        # El índice continúa entre bloques, igual que al leer el archivo entero
+        usecols = filtro_columnas(esquema) if esquema is not None else None
+        for bloque in pd.read_csv(fuente, chunksize=filas_por_bloque, usecols=usecols):
+            yield bloque.dropna(how='all')
+    else:
+        # Excel no se puede leer por partes: se lee una vez (o desde la caché) y se entrega en bloques
+        df = leer_tabla(fuente.read(), nombre, esquema=esquema)
+        for inicio in range(0, len(df), filas_por_bloque):
+            yield df.iloc[inicio:inicio + filas_por_bloque]
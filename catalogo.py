@@ -0,0 +1,196 @@
+"""Catálogo de productos médicos: carga, compilación y caché del formato compilado"""
+import hashlib
+import json
+import os
+import pickle
+import sys
+from functools import lru_cache
+from pathlib import Path
+from types import MappingProxyType
+
+from difuso import candidatos_similares, construir_indice_trigramas, palabras_parecidas
+
+RUTA_CATALOGO = Path(__file__).resolve().parent / 'catalogo_medico.json'
+DIRECTORIO_CACHE = Path(os.environ.get('LICITACIONES_CACHE', Path(__file__).resolve().parent / '.cache'))
+
+# Cambiar al modificar la estructura compilada para invalidar las cachés antiguas
+FORMATO_COMPILADO = 2
+
+def construir_automata(patrones):
+    """Compila (patron, prioridad) en un autómata Aho-Corasick determinista"""
+    transiciones = [{}]
+    prioridad = [None]
+    
+    # Trie de patrones; si un patrón se repite gana la prioridad más baja
+    for patron, valor in patrones:
+        estado = 0
+        for caracter in patron:
+            siguiente = transiciones[estado].get(caracter)
+            if siguiente is None:
+                siguiente = len(transiciones)
+                transiciones[estado][caracter] = siguiente
+                transiciones.append({})
+                prioridad.append(None)
+            estado = siguiente
+        if prioridad[estado] is None or valor < prioridad[estado]:
+            prioridad[estado] = valor
+    
+    # Enlaces de fallo por niveles (BFS) y cierre de transiciones
+    fallo = [0] * len(transiciones)
+    cola = list(transiciones[0].values())
+    for estado in cola:
+        for caracter, siguiente in transiciones[estado].items():
+            cola.append(siguiente)
+    
+    for estado in cola:
+        padre_fallo = fallo[estado]
+        if prioridad[padre_fallo] is not None and (prioridad[estado] is None or prioridad[padre_fallo] < prioridad[estado]):
+            prioridad[estado] = prioridad[padre_fallo]
+        for caracter, siguiente in transiciones[estado].items():
+            f = fallo[estado]
+            while f and caracter not in transiciones[f]:
+                f = fallo[f]
+            destino = transiciones[f].get(caracter, 0)
+            fallo[siguiente] = destino if destino != siguiente else 0
+        # Transiciones completas: las que faltan se heredan del estado de fallo
+        if estado:
+            for caracter, destino in transiciones[fallo[estado]].items():
+                transiciones[estado].setdefault(caracter, destino)
+    
+    return {'transiciones': transiciones, 'prioridad': prioridad}
+
+def mejor_prioridad(automata, texto):
+    """Recorre el texto una sola vez y devuelve la menor prioridad encontrada"""
+    transiciones = automata['transiciones']
+    prioridad = automata['prioridad']
+    estado = 0
+    mejor = None
+    
+    for caracter in texto:
+        estado = transiciones[estado].get(caracter, 0)
+        valor = prioridad[estado]
+        if valor is not None and (mejor is None or valor < mejor):
+            mejor = valor
+            if mejor == 0:
+                break
+    
+    return mejor
+
+def compilar_catalogo(datos):
+    """Construye las tablas de búsqueda a partir del catálogo leído del JSON"""
+    productos = datos['productos']
+    sufijos = datos.get('sufijos', {})
+    
+    # Prioridad en el orden del archivo: productos con variantes y después sufijos
+    clasificaciones = []
+    patrones = []
+    for nombre, entrada in productos.items():
+        variantes = entrada.get('variantes', [])
+        if variantes:
+            patrones.extend((variante, len(clasificaciones)) for variante in variantes)
+            clasificaciones.append(nombre)
+    for sufijo, clase in sufijos.items():
+        patrones.append((sufijo, len(clasificaciones)))
+        clasificaciones.append(clase)
+    
+    # Variantes para la búsqueda aproximada (los sufijos son fragmentos y no se corrigen)
+    prioridad_variantes = {}
+    for variante, prioridad in patrones[:len(patrones) - len(sufijos)]:
+        prioridad_variantes.setdefault(variante, prioridad)
+    
+    return {
+        'version': datos['version'],
+        'automata': construir_automata(patrones),
+        'clasificaciones': tuple(clasificaciones),
+        # Uno por número de palabras: 'inyectable' no se compara con 'agua inyectable'
+        'trigramas': {
+            palabras: construir_indice_trigramas(variante for variante in prioridad_variantes if len(variante.split()) == palabras)
+            for palabras in sorted({len(variante.split()) for variante in prioridad_variantes})
+        },
+        'prioridad_variantes': prioridad_variantes,
+        'variantes': {nombre: tuple(entrada.get('variantes', [])) for nombre, entrada in productos.items()},
+        'sufijos': dict(sufijos),
+        'sinonimos': {nombre: tuple(entrada['sinonimos']) for nombre, entrada in productos.items() if 'sinonimos' in entrada},
+        # Internadas: todos los productos extraídos de una categoría comparten la misma cadena
+        'categorias': {nombre: sys.intern(entrada['categoria']) for nombre, entrada in productos.items() if 'categoria' in entrada},
+        'categoria_por_defecto': sys.intern(datos.get('categoria_por_defecto', 'Medicamentos Generales'))
+    }
+
+def _congelar(compilado):
+    """Versión de solo lectura de las tablas compiladas"""
+    automata = compilado['automata']
+    congelado = dict(compilado)
+    congelado['automata'] = MappingProxyType({
+        'transiciones': tuple(automata['transiciones']),
+        'prioridad': tuple(automata['prioridad'])
+    })
+    congelado['trigramas'] = MappingProxyType({
+        palabras: MappingProxyType({'palabras': indice['palabras'], 'trigramas': MappingProxyType(indice['trigramas'])})
+        for palabras, indice in compilado['trigramas'].items()
+    })
+    for clave in ('variantes', 'sufijos', 'sinonimos', 'categorias', 'prioridad_variantes'):
+        congelado[clave] = MappingProxyType(compilado[clave])
+    return MappingProxyType(congelado)
+
+@lru_cache(maxsize=None)
+def cargar_catalogo(ruta=None):
+    """Carga el catálogo una vez por proceso, usando la caché compilada si existe"""
+    ruta = Path(ruta or os.environ.get('LICITACIONES_CATALOGO', RUTA_CATALOGO))
+    contenido = ruta.read_bytes()
+    huella = hashlib.sha256(contenido + str(FORMATO_COMPILADO).encode()).hexdigest()[:16]
+    ruta_cache = DIRECTORIO_CACHE / f"catalogo_{huella}.pickle"
+    
+    try:
+        with open(ruta_cache, 'rb') as archivo:
+            compilado = pickle.load(archivo)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        compilado = compilar_catalogo(json.loads(contenido.decode('utf-8')))
+        try:
+            DIRECTORIO_CACHE.mkdir(parents=True, exist_ok=True)
+            temporal = ruta_cache.with_suffix(f'.{os.getpid()}.tmp')
+            with open(temporal, 'wb') as archivo:
+                pickle.dump(compilado, archivo, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporal, ruta_cache)
+        except OSError:
+            pass  # Sin caché en disco: se recompila en el próximo arranque
+    
+    return _congelar(compilado)
+
+@lru_cache(maxsize=65536)
+def prioridad_aproximada(texto):
+    """Prioridad de la variante más parecida a alguna palabra (o grupo de palabras) del texto, o None"""
+    catalogo = cargar_catalogo()
+    palabras = texto.split()
+    mejor = None
+    for tamano, indice in catalogo['trigramas'].items():
+        for inicio in range(len(palabras) - tamano + 1):
+            fragmento = ' '.join(palabras[inicio:inicio + tamano])
+            for valor, variante in candidatos_similares(indice, fragmento):
+                # 'inyectable y' se parece en conjunto a 'agua inyectable', pero no palabra a palabra
+                if tamano > 1 and not palabras_parecidas(fragmento, variante):
+                    continue
+                # Gana la más parecida; a igual similitud, la que va antes en el catálogo
+                candidato = (-valor, catalogo['prioridad_variantes'][variante])
+                if mejor is None or candidato < mejor:
+                    mejor = candidato
+    return None if mejor is None else mejor[1]
+
+def clasificar_producto_medico(nombre, aproximada=True):
+    """Clasifica productos médicos expandido; sin coincidencia exacta, tolera errores de escritura"""
+    catalogo = cargar_catalogo()
+    texto = nombre.lower()
+    posicion = mejor_prioridad(catalogo['automata'], texto)
+    if posicion is None and aproximada:
+        posicion = prioridad_aproximada(texto)
+    if posicion is None:
+        return None
+    return catalogo['clasificaciones'][posicion]
+
+def determinar_categoria(producto):
+    """Determina la categoría médica del producto"""
+    catalogo = cargar_catalogo()
+    return catalogo['categorias'].get(producto, catalogo['categoria_por_defecto'])
+
+def terminos_busqueda(producto):
+    """Sinónimos con los que se busca el producto en el inventario"""
+    return cargar_catalogo()['sinonimos'].get(producto, (producto,))
@@ -0,0 +1,92 @@
+"""Búsqueda aproximada de palabras con errores de escritura mediante un índice de trigramas"""
+from math import ceil
+
+from instrumentacion import etapa
+
+# Similitud mínima (coeficiente de Dice entre trigramas) para aceptar un candidato:
+# 'jerinjas' ~ 'jeringas' = 0.67, 'amoxicilna' ~ 'amoxicilina' = 0.78, 'ciprofloxacina' ~ 'ciprofloxacino' = 0.87
+UMBRAL_SIMILITUD = 0.65
+
+# Las palabras más cortas se parecen demasiado entre sí para corregirlas sin falsos positivos
+LONGITUD_MINIMA = 5
+
+# Tope de candidatos verificados por consulta, aunque el índice sea muy grande
+MAXIMO_CANDIDATOS = 200
+
+def trigramas(palabra):
+    """Trigramas de la palabra con relleno en los extremos: 'gasa' -> {'  g', ' ga', 'gas', 'asa', 'sa '}"""
+    texto = f"  {palabra} "
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+def similitud(a, b):
+    """Coeficiente de Dice entre los trigramas de dos conjuntos (1.0 si son iguales)"""
+    if not a or not b:
+        return 0.0
+    return 2 * len(a & b) / (len(a) + len(b))
+
+def palabras_parecidas(texto, otro, umbral=UMBRAL_SIMILITUD):
+    """Indica si cada palabra del texto es igual o parecida a la que ocupa su posición en el otro"""
+    palabras = texto.split()
+    otras = otro.split()
+    return len(palabras) == len(otras) and all(
+        palabra == otra or similitud(trigramas(palabra), trigramas(otra)) >= umbral
+        for palabra, otra in zip(palabras, otras)
+    )
+
+def distancia_edicion(a, b):
+    """Letras insertadas, borradas, cambiadas o intercambiadas con la vecina para pasar de una palabra a otra"""
+    antepenultima, anterior, fila = None, None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        antepenultima, anterior, fila = anterior, fila, [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            fila[j] = min(anterior[j] + 1, fila[j - 1] + 1, anterior[j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                fila[j] = min(fila[j], antepenultima[j - 2] + 1)
+    return fila[-1]
+
+def es_errata(palabra, candidata):
+    """Indica si la candidata puede ser la palabra mal escrita y no otra palabra completa"""
+    # Una errata cambia una o dos letras: 'lormetazepam' se parece a 'lorazepam' (Dice 0.70), pero es otro fármaco
+    return distancia_edicion(palabra, candidata) <= (1 if len(palabra) < 8 else 2)
+
+def construir_indice_trigramas(palabras):
+    """Índice invertido {trigrama: (posiciones de palabras)} de una lista de palabras sin repetir"""
+    palabras = tuple(dict.fromkeys(palabras))
+    listas = {}
+    for posicion, palabra in enumerate(palabras):
+        for trigrama in trigramas(palabra):
+            listas.setdefault(trigrama, []).append(posicion)
+    return {
+        'palabras': palabras,
+        'trigramas': {trigrama: tuple(posiciones) for trigrama, posiciones in listas.items()}
+    }
+
+@etapa('busqueda_aproximada')
+def candidatos_similares(indice, palabra, umbral=UMBRAL_SIMILITUD, maximo=MAXIMO_CANDIDATOS):
+    """Palabras del índice parecidas a la dada: [(similitud, palabra)] de mayor a menor similitud"""
+    if len(palabra) < LONGITUD_MINIMA:
+        return []
+    
+    consulta = trigramas(palabra)
+    # Con Dice >= umbral, un candidato comparte al menos umbral * |consulta| / (2 - umbral) trigramas,
+    # así que tiene alguno de los (|consulta| - mínimo + 1) menos frecuentes: solo se recorren esas listas
+    minimo_comunes = ceil(umbral * len(consulta) / (2 - umbral))
+    listas = indice['trigramas']
+    raros = sorted(consulta, key=lambda trigrama: len(listas.get(trigrama, ())))
+    
+    vistas = set()
+    for trigrama in raros[:len(consulta) - minimo_comunes + 1]:
+        vistas.update(listas.get(trigrama, ()))
+        if len(vistas) >= maximo:
+            break
+    
+    palabras = indice['palabras']
+    candidatos = []
+    for posicion in sorted(vistas)[:maximo]:
+        candidata = palabras[posicion]
+        valor = similitud(consulta, trigramas(candidata))
+        if valor >= umbral:
+            candidatos.append((valor, candidata))
+    
+    candidatos.sort(key=lambda par: -par[0])
+    return candidatos
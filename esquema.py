@@ -0,0 +1,131 @@
+"""Detección del esquema de columnas de los archivos cargados (una vez por archivo)"""
+import pandas as pd
+
+from extraccion import normalizar_columna, normalizar_texto
+
+# Campo canónico: (columnas aceptadas en orden de preferencia, regla para combinarlas)
+#   primera:   primera columna existente
+#   coalesce:  por fila, primer valor no nulo
+#   entero:    por fila, primer valor convertible a número (truncado a entero)
+#   texto:     concatenación de todos los valores no nulos
+ESQUEMA_INVENTARIO = {
+    'nombre': (['nombre', 'producto', 'descripcion', 'item'], 'primera'),
+    'stock': (['stock', 'cantidad', 'existencia', 'disponible', 'inventario', 'qty', 'unidades'], 'entero'),
+    'lote': (['lote', 'batch', 'numero_lote'], 'primera'),
+    'caducidad': (['caducidad', 'vencimiento', 'expiry', 'fecha_vencimiento', 'fecha_caducidad', 'expiracion'], 'coalesce')
+}
+
+ESQUEMA_LICITACIONES = {
+    'id': (['id', 'nombre'], 'primera'),
+    'nombre': (['nombre', 'titulo', 'licitacion', 'descripcion'], 'coalesce'),
+    'descripcion': (['descripcion', 'detalle', 'productos', 'items', 'especificaciones'], 'texto')
+}
+
+ESQUEMA_DOCUMENTOS = {
+    'nombre': (['nombre', 'id_licitacion', 'licitacion'], 'primera'),
+    'documentos': (['documentos', 'documento'], 'primera')
+}
+
+def _clave_columna(columna):
+    """Nombre de columna comparable: 'Fecha Vencimiento' -> 'fecha_vencimiento'"""
+    return normalizar_texto(columna).replace(' ', '_')
+
+def filtro_columnas(esquema):
+    """Predicado para usecols: solo las columnas que algún campo del esquema puede usar"""
+    aceptadas = {alias for aliases, _ in esquema.values() for alias in aliases}
+    return lambda columna: _clave_columna(columna) in aceptadas
+
+def detectar_esquema(df, esquema):
+    """Asigna a cada campo canónico las columnas reales del DataFrame que lo contienen"""
+    columnas = {}
+    for columna in df.columns:
+        clave = _clave_columna(columna)
+        # El nombre exacto tiene prioridad sobre variantes de mayúsculas o espacios
+        if clave not in columnas or columna == clave:
+            columnas[clave] = columna
+    
+    return {
+        campo: [columnas[alias] for alias in aliases if alias in columnas]
+        for campo, (aliases, _) in esquema.items()
+    }
+
+def combinar_columnas(df, columnas, regla):
+    """Combina las columnas detectadas de un campo según su regla (una Series por campo)"""
+    if not columnas:
+        return pd.Series("" if regla == 'texto' else None, index=df.index, dtype=object)
+    
+    if regla == 'primera':
+        return df[columnas[0]]
+    
+    if regla == 'coalesce':
+        resultado = df[columnas[0]].astype(object)
+        for columna in columnas[1:]:
+            resultado = resultado.where(resultado.notna(), df[columna])
+        return resultado
+    
+    if regla == 'entero':
+        resultado = pd.Series(float('nan'), index=df.index)
+        for columna in columnas:
+            numeros = pd.to_numeric(df[columna], errors='coerce').astype(float)
+            numeros = numeros.where(numeros.abs() != float('inf'))
+            resultado = resultado.where(resultado.notna(), numeros)
+        return resultado
+    
+    if regla == 'texto':
+        resultado = pd.Series("", index=df.index, dtype=object)
+        for columna in columnas:
+            valores = df[columna]
+            resultado = resultado + (valores.astype(str).astype(object) + " ").where(valores.notna(), "")
+        return resultado
+    
+    raise ValueError(f"Regla de esquema desconocida: {regla}")
+
+def _como_texto(serie):
+    """str() de cada valor, como al leer la celda de una fila ('nan' para nulos)"""
+    return serie.astype(str).astype(object).where(serie.notna(), 'nan')
+
+def _texto_o_vacio(serie):
+    """str() de cada valor, con 'nan' y nulos como texto vacío"""
+    texto = _como_texto(serie)
+    return texto.where(texto != 'nan', '')
+
+def _campos(df, esquema, detectado):
+    """Series combinada de cada campo canónico"""
+    return {campo: combinar_columnas(df, detectado[campo], regla) for campo, (_, regla) in esquema.items()}
+
+def preparar_inventario(inventario_df):
+    """Columnas canónicas tipadas del inventario (nombre, stock, lote, caducidad) y su esquema"""
+    esquema = detectar_esquema(inventario_df, ESQUEMA_INVENTARIO)
+    campos = _campos(inventario_df, ESQUEMA_INVENTARIO, esquema)
+    
+    canonico = pd.DataFrame({
+        'nombre': _como_texto(campos['nombre']) if esquema['nombre'] else 'Producto',
+        'stock': campos['stock'].fillna(0).astype('int64'),
+        'lote': _texto_o_vacio(campos['lote']),
+        'caducidad': _texto_o_vacio(campos['caducidad'])
+    }, index=inventario_df.index).reset_index(drop=True)
+    
+    return canonico, esquema
+
+def preparar_licitaciones(licitaciones_df):
+    """Añade las columnas canónicas _id, _nombre y _descripcion a las licitaciones"""
+    esquema = detectar_esquema(licitaciones_df, ESQUEMA_LICITACIONES)
+    campos = _campos(licitaciones_df, ESQUEMA_LICITACIONES, esquema)
+    
+    preparado = licitaciones_df.assign(
+        _id=campos['id'] if esquema['id'] else '',
+        _nombre=_como_texto(campos['nombre']).where(campos['nombre'].notna(), "Sin nombre"),
+        _descripcion=campos['descripcion']
+    )
+    return preparado, esquema
+
+def preparar_documentos(documentos_df):
+    """Añade _documentos y _nombre_normalizado (nombre de licitación normalizado) a los documentos"""
+    esquema = detectar_esquema(documentos_df, ESQUEMA_DOCUMENTOS)
+    
+    columnas = {}
+    if esquema['documentos']:
+        columnas['_documentos'] = documentos_df[esquema['documentos'][0]]
+    if esquema['nombre']:
+        columnas['_nombre_normalizado'] = normalizar_columna(documentos_df[esquema['nombre'][0]])
+    return documentos_df.assign(**columnas), esquema
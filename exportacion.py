@@ -0,0 +1,267 @@
+"""Exportación de los resultados a CSV, Parquet o Excel, escrita en disco bloque a bloque"""
+import importlib.util
+import os
+import threading
+
+import pandas as pd
+
+from catalogo import DIRECTORIO_CACHE
+from instrumentacion import etapa
+from registros import Estado
+
+DIRECTORIO_EXPORTACIONES = DIRECTORIO_CACHE / 'exportaciones'
+MAXIMO_EXPORTACIONES = 16
+
+# Filas que se convierten y escriben de una vez
+FILAS_POR_BLOQUE = 5000
+
+# pyarrow es opcional: sin él no se ofrece Parquet
+PARQUET_DISPONIBLE = importlib.util.find_spec('pyarrow') is not None
+
+# Formato: (etiqueta, tipo MIME)
+FORMATOS_EXPORTACION = {
+    'csv': ("CSV", "text/csv"),
+    'parquet': ("Parquet", "application/vnd.apache.parquet"),
+    'xlsx': ("Excel", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+}
+
+# Tablas exportables y nombre de su hoja en el Excel
+TABLAS_EXPORTACION = {
+    'resumen': "Resumen",
+    'productos': "Productos",
+    'alertas': "Alertas_Caducidad",
+    'documentos': "Documentos",
+    'tiempos': "Tiempos"
+}
+
+# Filas de datos por hoja de Excel (el límite es 1.048.576 contando el encabezado)
+MAXIMO_FILAS_HOJA = 1048575
+
+# Tipos de la tabla de resultados (tabla_resultados), para releerla del CSV con los mismos en cada bloque
+COLUMNAS_RESUMEN = {
+    'ID': 'int64',
+    'Licitación': 'string',
+    'Estado': pd.CategoricalDtype([estado.name for estado in Estado]),
+    'Productos': 'int32',
+    'Disponibles': 'int32',
+    'Sin_Stock': 'int32',
+    'Stock_Insuficiente': 'int32',
+    'Alertas_Caducidad': 'int32',
+    'Observaciones': 'string'
+}
+
+COLUMNAS_PRODUCTOS = {
+    'ID': 'int64',
+    'Licitación': 'string',
+    'Producto': 'string',
+    'Categoría': 'string',
+    'Disponibilidad': 'string',
+    'Cantidad_Requerida': 'int64',
+    'Stock_Disponible': 'int64',
+    'Faltante': 'int64',
+    'Producto_Inventario': 'string',
+    'Lotes': 'string',
+    'Caducidad': 'string'
+}
+
+COLUMNAS_ALERTAS = {
+    'ID': 'int64',
+    'Licitación': 'string',
+    'Producto': 'string',
+    'Estado_Caducidad': 'string',
+    'Dias_Restantes': 'Int64',
+    'Lote': 'string',
+    'Caducidad': 'string'
+}
+
+COLUMNAS_DOCUMENTOS = {
+    'ID': 'int64',
+    'Licitación': 'string',
+    'Documento': 'string'
+}
+
+def formatos_disponibles():
+    """Formatos que se pueden escribir con las dependencias instaladas"""
+    return [formato for formato in FORMATOS_EXPORTACION if formato != 'parquet' or PARQUET_DISPONIBLE]
+
+def _en_bloques(filas, columnas, filas_por_bloque=FILAS_POR_BLOQUE):
+    """Agrupa tuplas en DataFrames de tipos fijos (siempre al menos uno, aunque sea vacío)"""
+    bloque = []
+    vacio = True
+    for fila in filas:
+        bloque.append(fila)
+        if len(bloque) == filas_por_bloque:
+            yield pd.DataFrame(bloque, columns=list(columnas)).astype(columnas)
+            bloque = []
+            vacio = False
+    if bloque or vacio:
+        yield pd.DataFrame(bloque, columns=list(columnas)).astype(columnas)
+
+def bloques_resumen(resultados_df, filas_por_bloque=FILAS_POR_BLOQUE):
+    """La tabla de resultados en trozos consecutivos"""
+    for inicio in range(0, max(1, len(resultados_df)), filas_por_bloque):
+        yield resultados_df.iloc[inicio:inicio + filas_por_bloque]
+
+def _licitaciones(resultados_df, evaluaciones):
+    """(ID, nombre en la tabla, evaluación) de cada licitación"""
+    return zip(resultados_df['ID'].tolist(), resultados_df['Licitación'].tolist(), evaluaciones)
+
+def lineas_productos(resultados_df, evaluaciones):
+    """Una fila por producto pedido en cada licitación, con lo encontrado en el inventario"""
+    filas = (
+        (
+            id_licitacion, licitacion, producto.nombre_visible, producto.categoria, producto.disponibilidad.name,
+            producto.cantidad_requerida, producto.stock_disponible, max(0, producto.faltante),
+            producto.producto_inventario,
+            ', '.join(f"{lote or 'sin lote'}: {unidades}" for lote, unidades, _ in producto.lotes),
+            producto.caducidad
+        )
+        for id_licitacion, licitacion, evaluacion in _licitaciones(resultados_df, evaluaciones)
+        for producto in evaluacion.productos
+    )
+    return _en_bloques(filas, COLUMNAS_PRODUCTOS)
+
+def lineas_alertas(resultados_df, evaluaciones):
+    """Una fila por producto con el lote caducado o próximo a caducar"""
+    filas = (
+        (
+            id_licitacion, licitacion, producto.nombre_visible, producto.estado_caducidad,
+            producto.dias_caducidad, producto.lote, producto.caducidad
+        )
+        for id_licitacion, licitacion, evaluacion in _licitaciones(resultados_df, evaluaciones)
+        for producto in evaluacion.alertas_caducidad
+    )
+    return _en_bloques(filas, COLUMNAS_ALERTAS)
+
+def lineas_documentos(resultados_df, evaluaciones):
+    """Una fila por documento requerido en cada licitación"""
+    filas = (
+        (id_licitacion, licitacion, documento)
+        for id_licitacion, licitacion, evaluacion in _licitaciones(resultados_df, evaluaciones)
+        for documento in evaluacion.documentos_necesarios
+    )
+    return _en_bloques(filas, COLUMNAS_DOCUMENTOS)
+
+def tablas_analisis(resultados_df, evaluaciones):
+    """{tabla: función que genera sus bloques} de un análisis en memoria (nada se genera hasta exportar)"""
+    return {
+        'resumen': lambda: bloques_resumen(resultados_df),
+        'productos': lambda: lineas_productos(resultados_df, evaluaciones),
+        'alertas': lambda: lineas_alertas(resultados_df, evaluaciones),
+        'documentos': lambda: lineas_documentos(resultados_df, evaluaciones)
+    }
+
+def tablas_archivo_resultados(ruta):
+    """{tabla: función que genera sus bloques} de una tabla de resultados ya escrita en CSV (modo streaming)"""
+    # Con los tipos fijos, no deducidos de cada bloque: '007' sigue siendo texto y un bloque de nombres
+    # vacíos no cambia el tipo de la columna (ni el esquema del Parquet, que sale del primer bloque)
+    return {'resumen': lambda: pd.read_csv(
+        ruta, chunksize=FILAS_POR_BLOQUE, dtype=COLUMNAS_RESUMEN, keep_default_na=False
+    )}
+
+def _escribir_csv(bloques, ruta):
+    """CSV con el encabezado una sola vez"""
+    with open(ruta, 'w', encoding='utf-8', newline='') as archivo:
+        encabezado = True
+        for bloque in bloques:
+            bloque.to_csv(archivo, index=False, header=encabezado)
+            encabezado = False
+
+def _escribir_parquet(bloques, ruta):
+    """Parquet con un grupo de filas por bloque y el esquema del primero"""
+    import pyarrow as pa
+    from pyarrow import parquet
+    
+    escritor = None
+    try:
+        for bloque in bloques:
+            # Columnas de objetos con tipos mezclados: como texto, igual que al verlas en el CSV
+            mezcladas = [columna for columna in bloque.columns if bloque[columna].dtype == object]
+            if mezcladas:
+                bloque = bloque.astype({columna: 'string' for columna in mezcladas})
+            tabla = pa.Table.from_pandas(bloque, preserve_index=False, schema=escritor.schema if escritor else None)
+            if escritor is None:
+                escritor = parquet.ParquetWriter(ruta, tabla.schema)
+            escritor.write_table(tabla)
+    finally:
+        if escritor is not None:
+            escritor.close()
+
+def _celda(valor):
+    """Valor que openpyxl puede escribir: nulos como celda vacía y escalares de numpy como tipos de Python"""
+    if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+        return None
+    return valor.item() if hasattr(valor, 'item') else valor
+
+def _escribir_xlsx(tablas, ruta):
+    """Excel en modo de solo escritura: una hoja por tabla (y continuaciones si no cabe en una)"""
+    from openpyxl import Workbook
+    
+    libro = Workbook(write_only=True)
+    for tabla, generar in tablas.items():
+        titulo = TABLAS_EXPORTACION.get(tabla, tabla)
+        hoja = None
+        parte = 1
+        filas_hoja = 0
+        for bloque in generar():
+            encabezado = list(bloque.columns)
+            if hoja is None:
+                hoja = libro.create_sheet(titulo)
+                hoja.append(encabezado)
+            for fila in bloque.itertuples(index=False, name=None):
+                if filas_hoja == MAXIMO_FILAS_HOJA:
+                    parte += 1
+                    hoja = libro.create_sheet(f"{titulo} ({parte})")
+                    hoja.append(encabezado)
+                    filas_hoja = 0
+                hoja.append([_celda(valor) for valor in fila])
+                filas_hoja += 1
+    libro.save(ruta)
+
+def _limpiar_exportaciones():
+    """Borra las exportaciones más antiguas por encima de MAXIMO_EXPORTACIONES"""
+    try:
+        archivos = sorted(
+            (ruta for ruta in DIRECTORIO_EXPORTACIONES.glob('exportacion_*') if ruta.suffix != '.tmp'),
+            key=lambda ruta: ruta.stat().st_mtime
+        )
+    except OSError:
+        return
+    for ruta in archivos[:-MAXIMO_EXPORTACIONES]:
+        try:
+            ruta.unlink()
+        except OSError:
+            pass
+
+@etapa('exportacion')
+def exportar(tablas, formato, ruta, tabla='resumen'):
+    """Escribe la exportación en ruta: una tabla en CSV o Parquet, todas (una por hoja) en Excel"""
+    if formato not in formatos_disponibles():
+        raise ValueError(f"Formato de exportación no disponible: {formato}")
+    if formato != 'xlsx' and tabla not in tablas:
+        raise ValueError(f"Tabla de exportación desconocida: {tabla}")
+    
+    # Se escribe aparte y se reemplaza al terminar: una descarga nunca ve un archivo a medias
+    # (las descargas se generan en hilos: el temporal lleva proceso e hilo)
+    temporal = ruta.with_name(f"{ruta.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        if formato == 'csv':
+            _escribir_csv(tablas[tabla](), temporal)
+        elif formato == 'parquet':
+            _escribir_parquet(tablas[tabla](), temporal)
+        else:
+            _escribir_xlsx(tablas, temporal)
+        os.replace(temporal, ruta)
+    finally:
+        temporal.unlink(missing_ok=True)
+    return ruta
+
+def exportar_en_cache(tablas, formato, clave, tabla='resumen'):
+    """Ruta de la exportación de un análisis (identificado por clave), escribiéndola solo la primera vez"""
+    DIRECTORIO_EXPORTACIONES.mkdir(parents=True, exist_ok=True)
+    sufijo = '' if formato == 'xlsx' else f"_{tabla}"
+    ruta = DIRECTORIO_EXPORTACIONES / f"exportacion_{clave}{sufijo}.{formato}"
+    if not ruta.exists():
+        exportar(tablas, formato, ruta, tabla)
+        _limpiar_exportaciones()
+    return ruta
@@ -0,0 +1,221 @@
+"""Normalización de texto y extracción de productos de las descripciones de licitaciones"""
+import re
+import unicodedata
+
+import pandas as pd
+
+from catalogo import clasificar_producto_medico, determinar_categoria
+from instrumentacion import etapa
+from registros import ProductoExtraido
+
+def _construir_tabla_acentos():
+    """Tabla para str.translate que quita acentos y diacríticos (á, Ü, ñ, ç...)"""
+    tabla = {}
+    # Latin-1 y Latin Extendido A/B: letra base de la descomposición canónica
+    for codigo in range(0x00C0, 0x0250):
+        base = unicodedata.normalize('NFD', chr(codigo))[0]
+        if base != chr(codigo) and base.isascii():
+            tabla[codigo] = base.lower()
+    # Marcas diacríticas combinantes (texto ya descompuesto)
+    for codigo in range(0x0300, 0x0370):
+        tabla[codigo] = None
+    return tabla
+
+TABLA_ACENTOS = _construir_tabla_acentos()
+
+def normalizar_texto(texto):
+    """Normaliza texto para búsqueda"""
+    if pd.isna(texto) or texto is None:
+        return ""
+    
+    # Minúsculas y eliminación de acentos
+    texto_str = str(texto).lower().translate(TABLA_ACENTOS)
+    
+    # Limpiar caracteres especiales
+    texto_str = re.sub(r'[^\w\s]', ' ', texto_str)
+    texto_str = re.sub(r'\s+', ' ', texto_str)
+    
+    return texto_str.strip()
+
+def normalizar_columna(serie):
+    """Normaliza una columna completa (pd.Series) con operaciones vectorizadas"""
+    # dtype object: expresiones regulares de Python (\w Unicode) también con pandas+pyarrow
+    texto = serie.astype(str).astype(object).where(serie.notna(), "")
+    return (
+        texto.str.lower()
+        .str.translate(TABLA_ACENTOS)
+        .str.replace(r'[^\w\s]', ' ', regex=True)
+        .str.replace(r'\s+', ' ', regex=True)
+        .str.strip()
+    )
+
+# Límite de caracteres analizados por descripción (celdas con especificaciones de varias páginas)
+LONGITUD_MAXIMA_DESCRIPCION = 100000
+
+# Cantidad máxima aceptada para un producto
+CANTIDAD_MAXIMA = 100000
+
+UNIDADES = frozenset(['mg', 'ml', 'gr', 'kg', 'mcg', 'ui'])
+
+MEDICAMENTOS_CONOCIDOS = [
+    'paracetamol', 'ibuprofeno', 'aspirina', 'amoxicilina', 'ciprofloxacino',
+    'aciclovir', 'oseltamivir', 'insulina', 'morfina', 'tramadol',
+    'omeprazol', 'losartan', 'metformina', 'salbutamol', 'dexametasona'
+]
+
+# Expresiones aplicadas a un solo token o con búsqueda lineal (sin retroceso costoso)
+_NUMERO_PEGADO = re.compile(r'(\d+)([a-z]+)')
+_PRIMER_NUMERO = re.compile(r'\d+')
+_NOMBRE_Y_NUMERO = re.compile(r'([a-z]+)(\d*)')
+
+def _a_entero(digitos, defecto):
+    """int() acotado: evita convertir números desmesurados (coste cuadrático)"""
+    return int(digitos) if len(digitos) <= 9 else defecto
+
+def _segmentar(texto):
+    """Agrupa los tokens del texto normalizado en cantidades y secuencias de palabras"""
+    segmentos = []
+    for token in texto.split():
+        pegado = _NUMERO_PEGADO.fullmatch(token)
+        if pegado:
+            partes = [pegado.group(1), pegado.group(2)]  # '500mg' -> '500', 'mg'
+        else:
+            partes = [token]
+        
+        for parte in partes:
+            if parte.isdecimal():
+                segmentos.append(_a_entero(parte, CANTIDAD_MAXIMA + 1))
+            elif segmentos and isinstance(segmentos[-1], list):
+                segmentos[-1].append(parte)
+            else:
+                segmentos.append([parte])
+    return segmentos
+
+def _nuevo_producto(clasificacion, cantidad, unidad=None):
+    """Registro de producto extraído (nombre del catálogo y su categoría)"""
+    return ProductoExtraido(clasificacion, cantidad, determinar_categoria(clasificacion), unidad)
+
+def _cantidad_tras_dosis(segmentos, posicion):
+    """Número suelto que sigue a la unidad de una dosis ('500 mg 20', '400mg x 200'), o None"""
+    unidad = segmentos[posicion]
+    numero = segmentos[posicion + 1] if posicion + 1 < len(segmentos) else None
+    if not isinstance(numero, int):
+        return None
+    # El número no puede ser a su vez otra dosis ('500 mg 5 ml')
+    despues = segmentos[posicion + 2] if posicion + 2 < len(segmentos) else None
+    if isinstance(despues, list) and despues[0] in UNIDADES:
+        return None
+    # Las palabras entre la unidad y el número ('x', 'tabletas') no pueden nombrar otro producto
+    if len(unidad) > 1 and clasificar_producto_medico(' '.join(unidad[1:])):
+        return None
+    return numero
+
+def _productos_clasificados(candidatos):
+    """Registros de los (cantidad, nombre, unidad) con cantidad válida cuyo nombre está en el catálogo"""
+    productos = []
+    for cantidad, nombre, unidad in candidatos:
+        if cantidad > 0 and cantidad <= CANTIDAD_MAXIMA and len(nombre) > 2:
+            categoria = clasificar_producto_medico(nombre)
+            if categoria:
+                productos.append(_nuevo_producto(categoria, cantidad, unidad))
+    return productos
+
+@etapa('extraccion')
+def extraer_productos_medicos(descripcion):
+    """Extrae productos médicos de la descripción con reconocimiento expandido"""
+    if pd.isna(descripcion):
+        return []
+    
+    texto = normalizar_texto(str(descripcion)[:LONGITUD_MAXIMA_DESCRIPCION])
+    segmentos = _segmentar(texto)
+    
+    # Un solo recorrido: "cantidad [unidad] nombre" y "nombre cantidad"
+    cantidad_nombre = []
+    nombre_cantidad = []
+    solo_dosis = []
+    total = len(segmentos)
+    for i, segmento in enumerate(segmentos):
+        siguiente = segmentos[i + 1] if i + 1 < total else None
+        
+        if isinstance(segmento, int):
+            if not isinstance(siguiente, list):
+                continue
+            # El nombre termina al final del texto o antes de otra "cantidad nombre"
+            if i + 2 < total:
+                otra = segmentos[i + 3] if i + 3 < total else None
+                if not (isinstance(otra, list) and 'a' <= otra[0][0] <= 'z'):
+                    continue
+            unidad = siguiente[0] if siguiente[0] in UNIDADES else None
+            palabras = siguiente[1:] if unidad else siguiente
+            cantidad_nombre.append((segmento, ' '.join(palabras), unidad))
+        elif isinstance(siguiente, int):
+            despues = segmentos[i + 2] if i + 2 < total else None
+            if not (isinstance(despues, list) and despues[0] in UNIDADES):
+                nombre_cantidad.append((siguiente, ' '.join(segmento), None))
+                continue
+            # Una cantidad seguida de unidad es una dosis: "nombre dosis unidad cantidad" pide el número suelto
+            # que sigue a la dosis; sin él, se conserva el producto con la dosis como cantidad
+            cantidad = _cantidad_tras_dosis(segmentos, i + 2)
+            if cantidad is not None:
+                nombre_cantidad.append((cantidad, ' '.join(segmento), None))
+            else:
+                solo_dosis.append((siguiente, ' '.join(segmento), None))
+    
+    productos = _productos_clasificados(cantidad_nombre + nombre_cantidad)
+    # Un nombre que solo aparece con su dosis no se pierde, pero no sustituye a una cantidad encontrada
+    encontrados = {producto.nombre for producto in productos}
+    productos += [
+        producto for producto in _productos_clasificados(solo_dosis)
+        if producto.nombre not in encontrados
+    ]
+    
+    # Si no se encontraron productos con cantidad, buscar por nombres de medicamentos conocidos
+    if not productos:
+        primer_numero = None
+        for medicamento in MEDICAMENTOS_CONOCIDOS:
+            if medicamento in texto:
+                # La cantidad es el primer número del texto (1 por defecto)
+                if primer_numero is None:
+                    encontrado = _PRIMER_NUMERO.search(texto)
+                    primer_numero = _a_entero(encontrado.group(), 1) if encontrado else 1
+                
+                categoria = clasificar_producto_medico(medicamento)
+                if categoria:
+                    productos.append(_nuevo_producto(categoria, primer_numero))
+    
+    # Extraer del nombre de la licitación si contiene nombres de medicamentos
+    if not productos:
+        # Buscar patrones como "Licitación Amoxicilina 3"
+        tokens = texto.split()
+        for i in range(len(tokens) - 1):
+            if not tokens[i].endswith('licitacion'):
+                continue
+            match = _NOMBRE_Y_NUMERO.match(tokens[i + 1])
+            if not match:
+                continue
+            
+            nombre_medicamento = match.group(1)
+            cantidad = 1
+            if match.group(2):
+                cantidad = _a_entero(match.group(2), 1)
+            elif match.end() == len(tokens[i + 1]) and i + 2 < len(tokens):
+                numero = _PRIMER_NUMERO.match(tokens[i + 2])
+                if numero:
+                    cantidad = _a_entero(numero.group(), 1)
+            
+            categoria = clasificar_producto_medico(nombre_medicamento)
+            if categoria:
+                productos.append(_nuevo_producto(categoria, cantidad))
+            break
+    
+    # Eliminar duplicados manteniendo la mayor cantidad
+    productos_unicos = {}
+    for producto in productos:
+        nombre = producto.nombre
+        if nombre in productos_unicos:
+            if producto.cantidad > productos_unicos[nombre].cantidad:
+                productos_unicos[nombre] = producto
+        else:
+            productos_unicos[nombre] = producto
+    
+    return list(productos_unicos.values())
@@ -0,0 +1,81 @@
+"""Contadores y tiempos acumulados por etapa del análisis (desactivados por defecto)"""
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+_activa = False
+_etapas = {}
+_cerrojo = threading.Lock()
+
+def activar(activa=True):
+    """Enciende o apaga la instrumentación para todo el proceso"""
+    global _activa
+    _activa = bool(activa)
+
+def activa():
+    """Indica si la instrumentación está encendida"""
+    return _activa
+
+def reiniciar():
+    """Borra los contadores acumulados"""
+    with _cerrojo:
+        _etapas.clear()
+
+def acumular(etapa, segundos, llamadas=1):
+    """Suma llamadas y segundos a una etapa"""
+    with _cerrojo:
+        acumulado = _etapas.setdefault(etapa, [0, 0.0])
+        acumulado[0] += llamadas
+        acumulado[1] += segundos
+
+def estadisticas():
+    """Copia de los contadores: {etapa: (llamadas, segundos)}"""
+    with _cerrojo:
+        return {etapa: tuple(acumulado) for etapa, acumulado in _etapas.items()}
+
+def combinar(otras):
+    """Suma los contadores de otro proceso (p. ej. un trabajador del pool) a los de este"""
+    for etapa, (llamadas, segundos) in otras.items():
+        acumular(etapa, segundos, llamadas)
+
+def etapa(nombre):
+    """Decorador que acumula llamadas y tiempo de la función; apagado solo cuesta una comprobación"""
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            if not _activa:
+                return funcion(*args, **kwargs)
+            inicio = time.perf_counter()
+            try:
+                return funcion(*args, **kwargs)
+            finally:
+                acumular(nombre, time.perf_counter() - inicio)
+        return envoltura
+    return decorador
+
+@contextmanager
+def medir(nombre):
+    """Bloque cronometrado como una etapa (para secciones que no son una función)"""
+    if not _activa:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        acumular(nombre, time.perf_counter() - inicio)
+
+def tabla_tiempos(contadores=None):
+    """Filas (etapa, llamadas, segundos, ms por llamada) ordenadas por tiempo total"""
+    contadores = estadisticas() if contadores is None else contadores
+    filas = [
+        {
+            'Etapa': nombre,
+            'Llamadas': llamadas,
+            'Segundos': round(segundos, 4),
+            'ms_por_llamada': round(segundos / llamadas * 1000, 4) if llamadas else 0.0
+        }
+        for nombre, (llamadas, segundos) in contadores.items()
+    ]
+    return sorted(filas, key=lambda fila: fila['Segundos'], reverse=True)
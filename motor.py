@@ -0,0 +1,873 @@
+"""Motor de evaluación de licitaciones: índice de inventario, caducidades, documentos y evaluación"""
+import os
+import re
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+from catalogo import cargar_catalogo, clasificar_producto_medico, terminos_busqueda
+from difuso import LONGITUD_MINIMA, candidatos_similares, construir_indice_trigramas, es_errata
+from esquema import preparar_documentos, preparar_inventario, preparar_licitaciones
+from extraccion import extraer_productos_medicos, normalizar_texto
+from instrumentacion import activa, activar, combinar, estadisticas, etapa, reiniciar
+from registros import Disponibilidad, Estado, Evaluacion, ProductoEvaluado, ProductoExtraido
+
+# Partes de un token sin signos y con letras y números separados: 'paracetamol,500mg' -> paracetamol, 500, mg
+_PARTES_TOKEN = re.compile(r'[^\W\d_]+|\d+')
+
+def palabras_texto(texto):
+    """Palabras completas de un texto de fila: cada token y sus partes sin signos ni números pegados"""
+    palabras = set()
+    for token in texto.split():
+        palabras.add(token)
+        palabras.update(_PARTES_TOKEN.findall(token))
+    return palabras
+
+def texto_fila(valores):
+    """Texto de búsqueda de una fila: sus valores no nulos en minúsculas, separados por espacios"""
+    texto = ""
+    for valor in valores:
+        if pd.notna(valor):
+            texto += str(valor).lower() + " "
+    return texto
+
+@etapa('indice_inventario')
+def construir_indice_inventario(inventario_df, fecha_referencia=None, almacen=None):
+    """Construye un índice invertido del inventario (una vez por archivo); con almacen, busca en ese SQLite"""
+    textos = []
+    tokens = {}
+    
+    # Con almacen, textos y palabras ya están indexados en la base: no se recorren las filas
+    if almacen is None:
+        for pos, valores in enumerate(inventario_df.itertuples(index=False, name=None)):
+            # Mismo texto de fila que se usaba en la búsqueda secuencial
+            texto = texto_fila(valores)
+            textos.append(texto)
+            
+            for token in palabras_texto(texto):
+                tokens.setdefault(token, []).append(pos)
+    
+    # Columnas canónicas (stock entero, lote, caducidad...) resueltas una sola vez
+    canonico, esquema = preparar_inventario(inventario_df)
+    fechas_caducidad = fechas_caducidad_inventario(inventario_df, esquema['caducidad'])
+    
+    indice = {
+        'textos': textos,
+        'tokens': tokens,
+        'fragmentos': {},
+        'terminos': {},
+        'palabras': {},
+        'lotes': {},
+        'aproximados': {},
+        'almacen': almacen,
+        # Índice de trigramas de los tokens, solo si alguna búsqueda exacta falla (se rellena en el sitio:
+        # lo comparten las copias a otra fecha de indice_a_fecha)
+        'trigramas': {},
+        'esquema': esquema,
+        'canonico': canonico,
+        'fechas_caducidad': fechas_caducidad,
+        # Por fila, como listas (leer una lista es mucho más barato que .iat): stock no negativo,
+        # nombre, lote y caducidad para los resultados, y fecha de caducidad para el orden FEFO
+        'stock': canonico['stock'].clip(lower=0).astype(int).tolist(),
+        'nombre_fila': canonico['nombre'].tolist(),
+        'lote_fila': canonico['lote'].tolist(),
+        'caducidad_fila': canonico['caducidad'].tolist(),
+        'sin_fecha': fechas_caducidad['fecha'].isna().tolist(),
+        'fecha_ns': fechas_caducidad['fecha'].to_numpy().astype('int64').tolist()
+    }
+    actualizar_caducidades(indice, fecha_referencia)
+    return indice
+
+def _filas_con_fragmento(indice, fragmento):
+    """Filas con algún token que contiene el fragmento (sin espacios)"""
+    filas = indice['fragmentos'].get(fragmento)
+    if filas is None:
+        if indice['almacen'] is not None:
+            # Sin espacios, estar dentro de un token es estar dentro del texto de la fila
+            from almacen import filas_con_texto
+            filas = filas_con_texto(fragmento, indice['almacen'])
+        else:
+            encontradas = set()
+            for token, posiciones in indice['tokens'].items():
+                if fragmento in token:
+                    encontradas.update(posiciones)
+            filas = sorted(encontradas)
+        indice['fragmentos'][fragmento] = filas
+    return filas
+
+def _texto_de_fila(indice, posicion):
+    """Texto de búsqueda de una fila, de la memoria o del almacén"""
+    if indice['almacen'] is not None:
+        from almacen import texto_guardado
+        return texto_guardado(posicion, indice['almacen'])
+    return indice['textos'][posicion]
+
+def filas_con_termino(indice, termino):
+    """Devuelve las posiciones ordenadas de las filas cuyo texto contiene el término"""
+    filas = indice['terminos'].get(termino)
+    if filas is not None:
+        return filas
+    
+    partes = termino.split()
+    if indice['almacen'] is not None:
+        # Inventario guardado en SQLite: una consulta indexada (importada aquí: almacen depende de este módulo)
+        from almacen import filas_con_texto
+        filas = filas_con_texto(termino, indice['almacen'])
+    elif not partes:
+        filas = [pos for pos, texto in enumerate(indice['textos']) if termino in texto]
+    elif len(partes) == 1 and partes[0] == termino:
+        filas = _filas_con_fragmento(indice, termino)
+    else:
+        # Términos con espacios: candidatos por cada parte y verificación sobre el texto
+        candidatas = set(_filas_con_fragmento(indice, partes[0]))
+        for parte in partes[1:]:
+            candidatas.intersection_update(_filas_con_fragmento(indice, parte))
+        textos = indice['textos']
+        filas = sorted(pos for pos in candidatas if termino in textos[pos])
+    
+    indice['terminos'][termino] = filas
+    return filas
+
+def filas_con_palabras(indice, termino):
+    """Posiciones ordenadas de las filas en las que el término aparece como palabras completas"""
+    filas = indice['palabras'].get(termino)
+    if filas is not None:
+        return filas
+    
+    if indice['almacen'] is not None:
+        # Inventario guardado en SQLite: su tabla de palabras tiene las mismas que indice['tokens']
+        from almacen import filas_con_palabras as filas_guardadas_con_palabras
+        filas = filas_guardadas_con_palabras(termino, indice['almacen'])
+    else:
+        partes = termino.split()
+        tokens = indice['tokens']
+        candidatas = set(tokens.get(partes[0], ())) if partes else set()
+        for parte in partes[1:]:
+            candidatas.intersection_update(tokens.get(parte, ()))
+        if len(partes) > 1:
+            # Todas las palabras en la fila, y además juntas y en el orden del término
+            textos = indice['textos']
+            candidatas = {pos for pos in candidatas if termino in textos[pos]}
+        filas = sorted(candidatas)
+    
+    indice['palabras'][termino] = filas
+    return filas
+
+def _filas_aproximadas(indice, nombre, palabra):
+    """Filas del token más parecido a la palabra que puede ser una errata suya y no nombra a otro producto"""
+    if not indice['trigramas']:
+        if indice['almacen'] is not None:
+            # Del almacén solo se lee el vocabulario, no las filas
+            from almacen import palabras_guardadas
+            vocabulario = palabras_guardadas(indice['almacen'])
+        else:
+            vocabulario = indice['tokens']
+        indice['trigramas'].update(construir_indice_trigramas(
+            token for token in vocabulario if len(token) >= LONGITUD_MINIMA and not token.isdigit()
+        ))
+    
+    productos = cargar_catalogo()['variantes']
+    for _, token in candidatos_similares(indice['trigramas'], palabra):
+        # 'omeprazol' se parece a 'esomeprazol' y 'lormetazepam' a 'lorazepam', pero no son erratas suyas
+        otro = clasificar_producto_medico(token, aproximada=False)
+        if (otro is None or otro == nombre or otro not in productos) and es_errata(palabra, token):
+            return set(filas_con_palabras(indice, token))
+    return set()
+
+def posibles_coincidencias(indice, nombre):
+    """Filas en las que cada palabra de algún término aparece tal cual o con errores de escritura, en orden"""
+    posibles = indice['aproximados'].get(nombre)
+    if posibles is None:
+        filas = set()
+        for termino in terminos_busqueda(nombre):
+            coincidentes = None
+            corregidas = set()
+            # Los productos sin sinónimos se buscan por su clave: 'vacuna_bcg' son dos palabras
+            for parte in termino.replace('_', ' ').split():
+                exactas = set(_filas_con_fragmento(indice, parte))
+                aproximadas = _filas_aproximadas(indice, nombre, parte)
+                corregidas.update(aproximadas - exactas)
+                encontradas = exactas | aproximadas
+                coincidentes = encontradas if coincidentes is None else coincidentes & encontradas
+            # Solo las filas con alguna palabra corregida: las demás ya las descartó la búsqueda exacta
+            filas.update(coincidentes & corregidas)
+        posibles = sorted(filas)
+        indice['aproximados'][nombre] = posibles
+    return posibles
+
+def _dentro_de_otro_producto(indice, posicion, termino, nombre):
+    """Indica si el término solo aparece en la fila dentro de palabras que nombran a otro producto ('asa' en 'gasas')"""
+    if ' ' in termino:
+        return False
+    productos = cargar_catalogo()['variantes']
+    for token in _texto_de_fila(indice, posicion).split():
+        if termino in token:
+            otro = clasificar_producto_medico(token, aproximada=False)
+            if otro is None or otro == nombre or otro not in productos:
+                return False
+    return True
+
+def _primera_fila_parcial(indice, nombre, terminos):
+    """{primera fila} que contiene algún término dentro de otra palabra, como la búsqueda secuencial, o vacío"""
+    # Nunca más de una fila: no se suma el stock de filas que quizá son de otro producto
+    primeras = []
+    for termino in terminos:
+        for posicion in filas_con_termino(indice, termino):
+            if not _dentro_de_otro_producto(indice, posicion, termino, nombre):
+                primeras.append(posicion)
+                break
+    return {min(primeras)} if primeras else set()
+
+def lotes_producto(indice, nombre):
+    """Filas del inventario (lotes) con algún término de búsqueda del producto como palabra completa, en orden"""
+    lotes = indice['lotes'].get(nombre)
+    if lotes is None:
+        terminos = terminos_busqueda(nombre)
+        filas = set()
+        for termino in terminos:
+            filas.update(filas_con_palabras(indice, termino))
+        # Un nombre mal escrito en el inventario no es un lote: se muestra como posible coincidencia
+        if not filas and not posibles_coincidencias(indice, nombre):
+            # Último recurso: una sola fila que contiene un término dentro de otra palabra
+            filas = _primera_fila_parcial(indice, nombre, terminos)
+        lotes = sorted(filas)
+        indice['lotes'][nombre] = lotes
+    return lotes
+
+def clave_fefo(indice, posicion):
+    """Orden FEFO de un lote: vigentes por fecha de caducidad, después sin fecha y al final los caducados"""
+    return (indice['caducado'][posicion], indice['sin_fecha'][posicion], indice['fecha_ns'][posicion], posicion)
+
+def lotes_fefo(indice, nombre):
+    """Lotes del producto en orden FEFO y su stock total (se recalculan al cambiar la fecha de referencia)"""
+    orden = indice['lotes_fefo'].get(nombre)
+    if orden is None:
+        lotes = sorted(lotes_producto(indice, nombre), key=lambda posicion: clave_fefo(indice, posicion))
+        orden = (lotes, sum(indice['stock'][posicion] for posicion in lotes))
+        indice['lotes_fefo'][nombre] = orden
+    return orden
+
+def _resultado_lotes(indice, lotes, stock, cantidad_necesaria):
+    """Resultado de búsqueda con los lotes usados ((fila, unidades), ...) y el stock con el que se cuenta"""
+    posicion = lotes[0][0]
+    return {
+        'encontrado': True,
+        'posible_coincidencia': False,
+        'posicion': posicion,
+        'lotes': lotes,
+        'stock_disponible': stock,
+        'stock_suficiente': stock >= cantidad_necesaria,
+        'producto_match': indice['nombre_fila'][posicion],
+        'lote': indice['lote_fila'][posicion],
+        'caducidad': indice['caducidad_fila'][posicion]
+    }
+
+@etapa('busqueda_inventario')
+def buscar_en_inventario(producto_buscado, inventario_df, indice=None):
+    """Busca un producto en todos sus lotes del inventario: suma su stock y toma primero los que caducan antes"""
+    if inventario_df.empty:
+        return {
+            'encontrado': False,
+            'posible_coincidencia': False,
+            'stock_disponible': 0,
+            'producto_match': '',
+            'lote': '',
+            'caducidad': ''
+        }
+    
+    if indice is None:
+        indice = construir_indice_inventario(inventario_df)
+    
+    # Lotes: filas que contienen alguno de los términos de búsqueda del producto
+    lotes, stock_total = lotes_fefo(indice, producto_buscado.nombre)
+    
+    if lotes:
+        # Unidades tomadas de cada lote, en orden FEFO, hasta cubrir la cantidad pedida
+        stock = indice['stock']
+        usados = []
+        pendiente = producto_buscado.cantidad
+        for posicion in lotes:
+            if pendiente <= 0:
+                break
+            if stock[posicion] > 0:
+                unidades = min(pendiente, stock[posicion])
+                usados.append((posicion, unidades))
+                pendiente -= unidades
+        return _resultado_lotes(indice, tuple(usados) or ((lotes[0], 0),), stock_total, producto_buscado.cantidad)
+    
+    # Una fila con el nombre mal escrito se muestra para revisarla, pero su stock no cuenta
+    posibles = posibles_coincidencias(indice, producto_buscado.nombre)
+    if posibles:
+        posicion = posibles[0]
+        return {
+            'encontrado': False,
+            'posible_coincidencia': True,
+            'stock_disponible': 0,
+            'stock_suficiente': False,
+            'producto_match': indice['nombre_fila'][posicion],
+            'lote': indice['lote_fila'][posicion],
+            'caducidad': indice['caducidad_fila'][posicion]
+        }
+    
+    return {
+        'encontrado': False,
+        'posible_coincidencia': False,
+        'stock_disponible': 0,
+        'stock_suficiente': False,
+        'producto_match': '',
+        'lote': '',
+        'caducidad': ''
+    }
+
+FORMATOS_FECHA = ['%Y-%m-%d', '%d/%m/%Y', '%m/%d/%Y', '%d-%m-%Y', '%Y/%m/%d', '%Y-%m-%d %H:%M:%S']
+
+def _estado_por_dias(dias_restantes):
+    """Estado de caducidad según los días restantes"""
+    if dias_restantes < 0:
+        return {'estado': 'caducado', 'dias_restantes': dias_restantes, 'alerta': True}
+    elif dias_restantes <= 30:
+        return {'estado': 'proximo_caducar', 'dias_restantes': dias_restantes, 'alerta': True}
+    elif dias_restantes <= 90:
+        return {'estado': 'vigilar', 'dias_restantes': dias_restantes, 'alerta': False}
+    else:
+        return {'estado': 'vigente', 'dias_restantes': dias_restantes, 'alerta': False}
+
+def verificar_caducidad(fecha_str, fecha_referencia=None):
+    """Verifica si un producto está próximo a caducar"""
+    if not fecha_str or pd.isna(fecha_str) or fecha_str == 'nan':
+        return {'estado': 'sin_fecha', 'dias_restantes': None, 'alerta': False}
+    
+    try:
+        fecha_cad = None
+        
+        for formato in FORMATOS_FECHA:
+            try:
+                fecha_cad = datetime.strptime(str(fecha_str).strip(), formato)
+                break
+            except:
+                continue
+        
+        if not fecha_cad:
+            return {'estado': 'formato_invalido', 'dias_restantes': None, 'alerta': False}
+        
+        return _estado_por_dias((fecha_cad - (fecha_referencia or datetime.now())).days)
+    except:
+        return {'estado': 'error', 'dias_restantes': None, 'alerta': False}
+
+def inferir_formato_fecha(textos):
+    """Formato de FORMATOS_FECHA que interpreta más valores de una muestra de la columna"""
+    muestra = textos.dropna().head(500)
+    mejor_formato, mejor_aciertos = None, 0
+    for formato in FORMATOS_FECHA:
+        aciertos = pd.to_datetime(muestra, format=formato, errors='coerce').notna().sum()
+        if aciertos > mejor_aciertos:
+            mejor_formato, mejor_aciertos = formato, aciertos
+    return mejor_formato
+
+def parsear_fechas(serie):
+    """Convierte una columna a fechas con el formato inferido una vez para toda la columna"""
+    serie = serie.reset_index(drop=True)
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        fechas = serie
+    else:
+        textos = serie.astype(str).astype(object).str.strip().where(serie.notna())
+        fechas = pd.Series(pd.NaT, index=serie.index, dtype='datetime64[ns]')
+        formato = inferir_formato_fecha(textos)
+        if formato is not None:
+            # Formato dominante primero; el resto solo para los valores que no encajan
+            pendientes = textos.notna()
+            for formato_actual in [formato] + [f for f in FORMATOS_FECHA if f != formato]:
+                if not pendientes.any():
+                    break
+                convertidas = pd.to_datetime(textos[pendientes], format=formato_actual, errors='coerce').dropna()
+                fechas[convertidas.index] = convertidas
+                pendientes[convertidas.index] = False
+    
+    if getattr(fechas.dt, 'tz', None) is not None:
+        fechas = fechas.dt.tz_localize(None)
+    return fechas
+
+def fechas_caducidad_inventario(inventario_df, columnas_caducidad):
+    """Fecha de caducidad por fila (primera columna de caducidad con valor), una vez por archivo"""
+    total = len(inventario_df)
+    fecha = pd.Series(pd.NaT, index=range(total), dtype='datetime64[ns]')
+    con_fecha = pd.Series(False, index=range(total))
+    asignadas = pd.Series(False, index=range(total))
+    
+    for col_cad in columnas_caducidad:
+        valores = inventario_df[col_cad].reset_index(drop=True)
+        presentes = valores.notna() & ~asignadas
+        if not presentes.any():
+            continue
+        fecha[presentes] = parsear_fechas(valores[presentes]).values
+        con_fecha[presentes] = ~valores[presentes].astype(str).isin(['', 'nan'])
+        asignadas |= presentes
+    
+    return pd.DataFrame({'fecha': fecha, 'con_fecha': con_fecha})
+
+def evaluar_caducidades(fechas_caducidad, fecha_referencia):
+    """Estado de caducidad de todo el inventario como columnas, a una fecha de referencia"""
+    dias = (fechas_caducidad['fecha'] - pd.Timestamp(fecha_referencia)).dt.days
+    
+    estado = pd.Series('vigente', index=fechas_caducidad.index, dtype=object)
+    estado[dias <= 90] = 'vigilar'
+    estado[dias <= 30] = 'proximo_caducar'
+    estado[dias < 0] = 'caducado'
+    estado[dias.isna()] = 'formato_invalido'
+    estado[~fechas_caducidad['con_fecha']] = 'sin_fecha'
+    
+    return pd.DataFrame({
+        'estado': estado,
+        'dias_restantes': dias.where(estado != 'sin_fecha').astype('Int64'),
+        'alerta': estado.isin(['caducado', 'proximo_caducar'])
+    })
+
+@etapa('caducidades_inventario')
+def actualizar_caducidades(indice, fecha_referencia=None):
+    """Recalcula en el sitio el estado de caducidad del inventario indexado (índices no compartidos)"""
+    indice['fecha_referencia'] = fecha_referencia or datetime.now()
+    indice['caducidades'] = evaluar_caducidades(indice['fechas_caducidad'], indice['fecha_referencia'])
+    caducidades = indice['caducidades']
+    indice['caducidad_por_fila'] = (
+        caducidades['estado'].tolist(),
+        [None if pd.isna(dias) else int(dias) for dias in caducidades['dias_restantes']],
+        caducidades['alerta'].tolist()
+    )
+    # Los caducados pasan al final del orden FEFO: el orden de lotes depende de la fecha de referencia
+    indice['caducado'] = (caducidades['estado'] == 'caducado').tolist()
+    indice['lotes_fefo'] = {}
+
+def indice_a_fecha(indice, fecha_referencia=None):
+    """Copia ligera del índice con el estado de caducidad a otra fecha; el índice original no cambia"""
+    # Las columnas, los tokens y las cachés de búsqueda se comparten; solo se recalcula lo que depende de la fecha
+    copia = dict(indice)
+    actualizar_caducidades(copia, fecha_referencia)
+    return copia
+
+@etapa('caducidad')
+def caducidad_en_fila(indice, posicion):
+    """Lee el estado de caducidad precalculado de una fila del inventario"""
+    estados, dias, alertas = indice['caducidad_por_fila']
+    return {
+        'estado': estados[posicion],
+        'dias_restantes': dias[posicion],
+        'alerta': alertas[posicion]
+    }
+
+def caducidad_de_lotes(indice, lotes):
+    """Estado de caducidad del lote usado más urgente ((fila, unidades), ...): el que tiene alerta y menos días"""
+    peor = None
+    for posicion, _ in lotes:
+        info = caducidad_en_fila(indice, posicion)
+        if info['alerta'] and (peor is None or info['dias_restantes'] < peor['dias_restantes']):
+            peor = info
+    return peor or caducidad_en_fila(indice, lotes[0][0])
+
+def lotes_usados(indice, lotes):
+    """(lote, unidades, caducidad) de cada fila de la que se toman unidades"""
+    return tuple(
+        (indice['lote_fila'][posicion], unidades, indice['caducidad_fila'][posicion])
+        for posicion, unidades in lotes if unidades > 0
+    )
+
+@etapa('indice_documentos')
+def construir_indice_documentos(documentos_df):
+    """Índice de documentos requeridos por nombre de licitación normalizado (una vez por archivo)"""
+    indice = {'documentos': [], 'filas_por_nombre': {}, 'trigramas': {}, 'consultas': {}}
+    if documentos_df is None or documentos_df.empty:
+        return indice
+    
+    # Columnas canónicas: precalculadas al cargar el archivo si es posible
+    if '_documentos' not in documentos_df.columns:
+        documentos_df, _ = preparar_documentos(documentos_df)
+    
+    # Sin columna de documentos ('documentos' o 'documento') o de licitación no hay nada que listar
+    if '_documentos' not in documentos_df.columns or '_nombre_normalizado' not in documentos_df.columns:
+        return indice
+    
+    # Listas de documentos ya divididas por comas y sin espacios
+    indice['documentos'] = [
+        [doc.strip() for doc in str(lista_documentos).split(',')]
+        for lista_documentos in documentos_df['_documentos']
+    ]
+    for pos, nombre in enumerate(documentos_df['_nombre_normalizado']):
+        indice['filas_por_nombre'].setdefault(nombre, []).append(pos)
+    
+    # Trigramas de cada nombre distinto para buscar subcadenas sin recorrer todos los nombres
+    for nombre in indice['filas_por_nombre']:
+        for inicio in range(len(nombre) - 2):
+            indice['trigramas'].setdefault(nombre[inicio:inicio + 3], set()).add(nombre)
+    
+    return indice
+
+def filas_documentos(indice, nombre_normalizado, exacto=False):
+    """Filas cuyo nombre de licitación normalizado es (exacto) o contiene el nombre buscado"""
+    if exacto:
+        return indice['filas_por_nombre'].get(nombre_normalizado, [])
+    
+    filas = indice['consultas'].get(nombre_normalizado)
+    if filas is not None:
+        return filas
+    
+    if len(nombre_normalizado) >= 3:
+        # Candidatos: nombres con todos los trigramas de la búsqueda, verificados como subcadena
+        trigramas = sorted(
+            (indice['trigramas'].get(nombre_normalizado[inicio:inicio + 3], set()) for inicio in range(len(nombre_normalizado) - 2)),
+            key=len
+        )
+        candidatos = set(trigramas[0]).intersection(*trigramas[1:])
+    else:
+        candidatos = indice['filas_por_nombre']
+    
+    filas = sorted(
+        pos
+        for nombre in candidatos if nombre_normalizado in nombre
+        for pos in indice['filas_por_nombre'][nombre]
+    )
+    indice['consultas'][nombre_normalizado] = filas
+    return filas
+
+@etapa('documentos')
+def obtener_documentos_requeridos(licitacion_id, documentos_df, indice_documentos=None, exacto=False):
+    """Obtiene la lista de documentos requeridos para una licitación específica."""
+    if indice_documentos is None:
+        if documentos_df is None or documentos_df.empty:
+            return []
+        indice_documentos = construir_indice_documentos(documentos_df)
+    
+    # Normalizar el texto de búsqueda para una coincidencia flexible ('nombre' o 'id_licitacion')
+    nombre_licitacion_normalizado = normalizar_texto(licitacion_id)
+    
+    documentos = []
+    for pos in filas_documentos(indice_documentos, nombre_licitacion_normalizado, exacto):
+        documentos.extend(indice_documentos['documentos'][pos])
+    return documentos
+
+@etapa('evaluar_licitacion')
+def evaluar_licitacion(fila, inventario_df, documentos_df=None, indice_inventario=None, productos=None,
+                       indice_documentos=None, asignacion=None):
+    """Evalúa una licitación completa (productos: extracción previa; asignacion: stock reservado por asignar_stock)"""
+    # Campos canónicos (_id, _nombre, _descripcion) resueltos al cargar el archivo
+    if '_descripcion' not in fila.index:
+        fila = preparar_licitaciones(fila.to_frame().T)[0].iloc[0]
+    
+    # Obtener descripción de la licitación
+    descripcion = fila['_descripcion']
+    
+    if not descripcion.strip():
+        return Evaluacion(Estado.AMARILLO, sin_descripcion=True)
+    
+    # Extraer productos usando función médica especializada
+    if productos is None:
+        productos = extraer_productos_medicos(descripcion)
+    
+    # Obtener documentos requeridos (nueva funcionalidad)
+    licitacion_id = fila['_id']
+    documentos = tuple(obtener_documentos_requeridos(licitacion_id, documentos_df, indice_documentos))
+    
+    if not productos:
+        return Evaluacion(Estado.AMARILLO, documentos_necesarios=documentos)
+    
+    if indice_inventario is None:
+        indice_inventario = construir_indice_inventario(inventario_df)
+    
+    # Evaluar cada producto médico
+    evaluados = []
+    estado = Estado.VERDE
+    for producto in productos:
+        busqueda = buscar_en_inventario(producto, inventario_df, indice_inventario)
+        if asignacion is not None and busqueda['encontrado']:
+            # Solo cuentan los lotes reservados (si no quedó nada, el primer lote encontrado y sin unidades)
+            reservado, lotes = asignacion.get(producto.nombre, (0, ()))
+            busqueda = _resultado_lotes(indice_inventario, lotes or ((busqueda['posicion'], 0),), reservado, producto.cantidad)
+        
+        if busqueda['posible_coincidencia']:
+            # Solo un nombre parecido en el inventario: queda para revisar a mano
+            evaluados.append(ProductoEvaluado(
+                producto.nombre, producto.categoria, producto.cantidad, Disponibilidad.POSIBLE_COINCIDENCIA, 0,
+                busqueda['producto_match'], busqueda['lote'], busqueda['caducidad']
+            ))
+            estado = max(estado, Estado.AMARILLO)
+        elif not busqueda['encontrado']:
+            # No encontrado en inventario
+            evaluados.append(ProductoEvaluado(
+                producto.nombre, producto.categoria, producto.cantidad, Disponibilidad.SIN_STOCK
+            ))
+            estado = Estado.ROJO
+        elif not busqueda['stock_suficiente']:
+            # Stock insuficiente
+            evaluados.append(ProductoEvaluado(
+                producto.nombre, producto.categoria, producto.cantidad, Disponibilidad.INSUFICIENTE,
+                busqueda['stock_disponible'], lotes=lotes_usados(indice_inventario, busqueda['lotes'])
+            ))
+            estado = max(estado, Estado.AMARILLO)
+        else:
+            # La alerta más urgente de los lotes de los que sale el pedido
+            info_caducidad = caducidad_de_lotes(indice_inventario, busqueda['lotes'])
+            evaluado = ProductoEvaluado(
+                producto.nombre, producto.categoria, producto.cantidad, Disponibilidad.DISPONIBLE,
+                busqueda['stock_disponible'], busqueda['producto_match'], busqueda['lote'], busqueda['caducidad'],
+                lotes=lotes_usados(indice_inventario, busqueda['lotes'])
+            )
+            if info_caducidad['alerta']:
+                evaluado.estado_caducidad = info_caducidad['estado']
+                evaluado.dias_caducidad = info_caducidad['dias_restantes']
+                estado = max(estado, Estado.AMARILLO)
+            evaluados.append(evaluado)
+    
+    return Evaluacion(estado, tuple(evaluados), documentos)
+
+def tabla_resultados(licitaciones_df, evaluaciones):
+    """Tabla de resultados (una fila por licitación) en columnas de tipo fijo, sin un dict por fila"""
+    conteos = [evaluacion.conteos() for evaluacion in evaluaciones]
+    productos, disponibles, sin_stock, insuficientes, alertas = zip(*conteos) if conteos else ((),) * 5
+    nombres = licitaciones_df['_nombre'].astype(object)
+    
+    return pd.DataFrame({
+        'ID': licitaciones_df.index.to_numpy(dtype='int64') + 1,
+        'Licitación': [nombre[:60] + ("..." if len(nombre) > 60 else "") for nombre in nombres],
+        'Estado': pd.Categorical.from_codes(
+            [int(evaluacion.estado) for evaluacion in evaluaciones], [estado.name for estado in Estado]
+        ),
+        'Productos': pd.array(productos, dtype='int32'),
+        'Disponibles': pd.array(disponibles, dtype='int32'),
+        'Sin_Stock': pd.array(sin_stock, dtype='int32'),
+        'Stock_Insuficiente': pd.array(insuficientes, dtype='int32'),
+        'Alertas_Caducidad': pd.array(alertas, dtype='int32'),
+        'Observaciones': [' | '.join(evaluacion.observaciones) for evaluacion in evaluaciones]
+    })
+
+# Licitaciones que necesita cada proceso para compensar su arranque y la serialización de sus resultados
+# (medido con benchmarks/bench_motor.py --trabajadores: con menos, un solo proceso termina antes)
+MINIMO_LICITACIONES_POR_TRABAJADOR = 500
+
+# Contexto compartido con los procesos de trabajo (heredado con fork o recibido una vez por proceso)
+_CONTEXTO_TRABAJADOR = {}
+
+def _iniciar_trabajador(contexto):
+    """Guarda en el proceso de trabajo las licitaciones, el inventario y su índice"""
+    _CONTEXTO_TRABAJADOR.update(contexto)
+    activar(contexto['instrumentacion'])
+
+def _evaluar_bloque(rango):
+    """Evalúa las licitaciones de las posiciones [inicio, fin) del contexto compartido"""
+    inicio, fin = rango
+    contexto = _CONTEXTO_TRABAJADOR
+    # Los tiempos de cada bloque vuelven al proceso principal junto con las evaluaciones
+    reiniciar()
+    bloque = contexto['licitaciones'].iloc[inicio:fin]
+    productos = contexto['productos'][inicio:fin] if contexto['productos'] is not None else [None] * len(bloque)
+    asignaciones = contexto['asignaciones'][inicio:fin] if contexto['asignaciones'] is not None else [None] * len(bloque)
+    evaluaciones = [
+        evaluar_licitacion(
+            fila, contexto['inventario'], contexto['documentos'], contexto['indice'], productos_fila,
+            contexto['indice_documentos'], asignacion
+        )
+        for (_, fila), productos_fila, asignacion in zip(bloque.iterrows(), productos, asignaciones)
+    ]
+    return evaluaciones, estadisticas() if activa() else None
+
+def procesadores_disponibles():
+    """CPUs que puede usar este proceso (las asignadas, no todas las de la máquina)"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def evaluar_licitaciones(licitaciones_df, inventario_df, documentos_df=None, indice_inventario=None,
+                         trabajadores=1, tamano_bloque=None, productos=None, indice_documentos=None,
+                         asignaciones=None):
+    """Evalúa todas las licitaciones, en paralelo por bloques si hay más de un trabajador, en el orden original"""
+    if '_descripcion' not in licitaciones_df.columns:
+        licitaciones_df = preparar_licitaciones(licitaciones_df)[0]
+    if indice_inventario is None:
+        indice_inventario = construir_indice_inventario(inventario_df)
+    if indice_documentos is None:
+        indice_documentos = construir_indice_documentos(documentos_df)
+    
+    # Más procesos que CPUs solo se reparten las mismas, y cada uno necesita bastantes licitaciones
+    total = len(licitaciones_df)
+    trabajadores = max(1, min(
+        int(trabajadores or 1), procesadores_disponibles(), total // MINIMO_LICITACIONES_POR_TRABAJADOR
+    ))
+    if trabajadores == 1:
+        return [
+            evaluar_licitacion(
+                fila, inventario_df, documentos_df, indice_inventario, productos_fila, indice_documentos, asignacion
+            )
+            for (_, fila), productos_fila, asignacion in zip(
+                licitaciones_df.iterrows(), productos or [None] * total, asignaciones or [None] * total
+            )
+        ]
+    
+    # Varios bloques por trabajador para repartir la carga de descripciones desiguales
+    tamano_bloque = tamano_bloque or max(1, -(-total // (trabajadores * 4)))
+    rangos = [(inicio, min(inicio + tamano_bloque, total)) for inicio in range(0, total, tamano_bloque)]
+    
+    # Importados aquí para no cargar multiprocessing en el arranque del modo secuencial
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    
+    # El catálogo se compila y los lotes de cada producto pedido se buscan antes de crear los procesos,
+    # para que los hereden ya calculados en vez de repetir la búsqueda en cada uno
+    cargar_catalogo()
+    if productos is not None and not inventario_df.empty:
+        for nombre in {producto.nombre for productos_fila in productos for producto in productos_fila}:
+            if not lotes_fefo(indice_inventario, nombre)[0]:
+                posibles_coincidencias(indice_inventario, nombre)
+    contexto = {
+        'licitaciones': licitaciones_df,
+        'inventario': inventario_df,
+        'documentos': documentos_df,
+        'indice': indice_inventario,
+        'indice_documentos': indice_documentos,
+        'productos': productos,
+        'asignaciones': asignaciones,
+        'instrumentacion': activa()
+    }
+    
+    if 'fork' in multiprocessing.get_all_start_methods():
+        # Con fork los procesos heredan el contexto sin serializarlo
+        _CONTEXTO_TRABAJADOR.update(contexto)
+        opciones = {'mp_context': multiprocessing.get_context('fork')}
+    else:
+        # Sin fork el contexto se envía una sola vez a cada proceso, no con cada bloque
+        opciones = {'initializer': _iniciar_trabajador, 'initargs': (contexto,)}
+    
+    try:
+        with ProcessPoolExecutor(max_workers=trabajadores, **opciones) as executor:
+            # map conserva el orden de los bloques
+            evaluaciones = []
+            for bloque, estadisticas_bloque in executor.map(_evaluar_bloque, rangos):
+                evaluaciones.extend(bloque)
+                if estadisticas_bloque:
+                    combinar(estadisticas_bloque)
+            return evaluaciones
+    finally:
+        _CONTEXTO_TRABAJADOR.clear()
+
+def productos_por_licitacion(licitaciones_df):
+    """Productos extraídos de la descripción de cada licitación, en el orden del DataFrame"""
+    if '_descripcion' not in licitaciones_df.columns:
+        licitaciones_df = preparar_licitaciones(licitaciones_df)[0]
+    return [
+        extraer_productos_medicos(descripcion) if descripcion.strip() else []
+        for descripcion in licitaciones_df['_descripcion']
+    ]
+
+def dependencias_productos(productos):
+    """Índice (producto, cantidad) -> posiciones de las licitaciones que lo piden"""
+    dependencias = {}
+    for posicion, productos_licitacion in enumerate(productos):
+        for producto in productos_licitacion:
+            dependencias.setdefault((producto.nombre, producto.cantidad), set()).add(posicion)
+    return dependencias
+
+def firma_producto(nombre, inventario_df, indice_inventario, cantidad=None):
+    """Lo que la evaluación lee del inventario para un pedido: el stock del producto y los lotes FEFO que lo cubren"""
+    if inventario_df.empty:
+        return None
+    lotes, stock_total = lotes_fefo(indice_inventario, nombre)
+    if not lotes:
+        # De una posible coincidencia solo se muestra la primera fila
+        posibles = posibles_coincidencias(indice_inventario, nombre)
+        if not posibles:
+            return None
+        posicion = posibles[0]
+        return ('posible_coincidencia', indice_inventario['nombre_fila'][posicion],
+                indice_inventario['lote_fila'][posicion], indice_inventario['caducidad_fila'][posicion])
+    
+    # Con la cantidad pedida, solo los lotes de los que sale el pedido (sin ella, todos)
+    firma = [stock_total]
+    pendiente = cantidad
+    for posicion in lotes:
+        if pendiente is not None and pendiente <= 0 and len(firma) > 1:
+            break
+        caducidad = caducidad_en_fila(indice_inventario, posicion)
+        # Los días restantes solo se muestran en las alertas: fuera de ellas, mover la fecha no cambia la firma
+        firma.append((
+            indice_inventario['nombre_fila'][posicion],
+            indice_inventario['stock'][posicion],
+            indice_inventario['lote_fila'][posicion],
+            indice_inventario['caducidad_fila'][posicion],
+            caducidad['estado'],
+            caducidad['alerta'],
+            caducidad['dias_restantes'] if caducidad['alerta'] else None
+        ))
+        if pendiente is not None:
+            pendiente -= indice_inventario['stock'][posicion]
+    return tuple(firma)
+
+def firmas_productos(productos, inventario_df, indice_inventario):
+    """Firma en el inventario de cada producto y cantidad pedidos por alguna licitación"""
+    return {
+        (nombre, cantidad): firma_producto(nombre, inventario_df, indice_inventario, cantidad)
+        for nombre, cantidad in dependencias_productos(productos)
+    }
+
+def reevaluar_licitaciones(licitaciones_df, inventario_df, documentos_df, indice_inventario, productos,
+                           evaluaciones, firmas_anteriores, trabajadores=1, indice_documentos=None):
+    """Reevalúa solo las licitaciones con algún producto cuya firma cambió en el nuevo inventario"""
+    firmas = firmas_productos(productos, inventario_df, indice_inventario)
+    
+    afectadas = set()
+    for pedido, posiciones in dependencias_productos(productos).items():
+        if pedido not in firmas_anteriores or firmas[pedido] != firmas_anteriores[pedido]:
+            afectadas.update(posiciones)
+    afectadas = sorted(afectadas)
+    
+    # Las licitaciones no afectadas conservan su evaluación tal cual
+    evaluaciones = list(evaluaciones)
+    if afectadas:
+        nuevas = evaluar_licitaciones(
+            licitaciones_df.iloc[afectadas], inventario_df, documentos_df, indice_inventario,
+            trabajadores=trabajadores, productos=[productos[posicion] for posicion in afectadas],
+            indice_documentos=indice_documentos
+        )
+        for posicion, evaluacion in zip(afectadas, nuevas):
+            evaluaciones[posicion] = evaluacion
+    
+    return evaluaciones, firmas, afectadas
+
+def evaluar_por_bloques(bloques, inventario_df, documentos_df=None, indice_inventario=None, trabajadores=1,
+                        indice_documentos=None, politica=None):
+    """Evalúa licitaciones que llegan por bloques; genera (licitaciones del bloque, evaluaciones)"""
+    if indice_inventario is None:
+        indice_inventario = construir_indice_inventario(inventario_df)
+    if indice_documentos is None:
+        indice_documentos = construir_indice_documentos(documentos_df)
+    
+    reserva = None
+    if politica is not None:
+        # La reserva sigue de un bloque al siguiente (importada aquí: asignacion depende de este módulo)
+        from asignacion import nueva_reserva, reservar
+        reserva = nueva_reserva(indice_inventario, politica, por_bloques=True)
+    
+    for bloque in bloques:
+        licitaciones_bloque = preparar_licitaciones(bloque)[0]
+        productos = productos_por_licitacion(licitaciones_bloque)
+        asignaciones = [reservar(reserva, productos_fila) for productos_fila in productos] if reserva else None
+        evaluaciones = evaluar_licitaciones(
+            licitaciones_bloque, inventario_df, documentos_df, indice_inventario,
+            trabajadores=trabajadores, productos=productos, indice_documentos=indice_documentos,
+            asignaciones=asignaciones
+        )
+        yield licitaciones_bloque, evaluaciones
+
+def escribir_resultados_por_bloques(bloques_evaluados, ruta):
+    """Añade al CSV de ruta la tabla de resultados de cada bloque y la genera para resumirla"""
+    # Se escribe aparte y se reemplaza al terminar: quien lea ruta a la vez nunca ve un archivo a medias
+    temporal = ruta.with_name(f"{ruta.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(temporal, 'w', encoding='utf-8', newline='') as archivo:
+            encabezado = True
+            for licitaciones_bloque, evaluaciones in bloques_evaluados:
+                resultados = tabla_resultados(licitaciones_bloque, evaluaciones)
+                if len(resultados):
+                    resultados.to_csv(archivo, header=encabezado, index=False)
+                    encabezado = False
+                yield resultados
+        os.replace(temporal, ruta)
+    finally:
+        temporal.unlink(missing_ok=True)
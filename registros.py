@@ -0,0 +1,235 @@
+"""Registros compactos de productos extraídos y de licitaciones evaluadas"""
+from dataclasses import dataclass
+from enum import IntEnum
+
+class Estado(IntEnum):
+    """Estado de una licitación evaluada; el código ocupa un byte en la tabla de resultados"""
+    VERDE = 0
+    AMARILLO = 1
+    ROJO = 2
+
+class Disponibilidad(IntEnum):
+    """Situación de un producto pedido frente al inventario"""
+    DISPONIBLE = 0
+    INSUFICIENTE = 1
+    SIN_STOCK = 2
+    # Solo un nombre parecido (¿errata?) en el inventario: no se cuenta su stock
+    POSIBLE_COINCIDENCIA = 3
+
+@dataclass(slots=True)
+class ProductoExtraido:
+    """Producto encontrado en la descripción de una licitación"""
+    nombre: str
+    cantidad: int
+    categoria: str = ''
+    unidad: str | None = None
+
+@dataclass(slots=True)
+class ProductoEvaluado:
+    """Producto pedido y lo que se encontró de él en el inventario"""
+    nombre: str
+    categoria: str
+    cantidad_requerida: int
+    disponibilidad: Disponibilidad
+    stock_disponible: int = 0
+    producto_inventario: str = ''
+    lote: str = ''
+    caducidad: str = ''
+    # Solo en productos disponibles con alerta de caducidad
+    estado_caducidad: str | None = None
+    dias_caducidad: int | None = None
+    # Lotes de los que sale el pedido, en el orden en que se toman: ((lote, unidades, caducidad), ...)
+    lotes: tuple = ()
+
+    @property
+    def nombre_visible(self):
+        """Nombre del catálogo para mostrar: 'gasas_esteriles' -> 'Gasas Esteriles'"""
+        return self.nombre.replace('_', ' ').title()
+
+    @property
+    def faltante(self):
+        """Unidades que faltan para cubrir la cantidad requerida"""
+        return self.cantidad_requerida - self.stock_disponible
+
+    @property
+    def alerta_caducidad(self):
+        """Indica si el lote encontrado está caducado o próximo a caducar"""
+        return self.estado_caducidad is not None
+
+@dataclass(slots=True)
+class Evaluacion:
+    """Resultado de evaluar una licitación; listas y observaciones se derivan de los productos"""
+    estado: Estado
+    productos: tuple = ()
+    documentos_necesarios: tuple = ()
+    sin_descripcion: bool = False
+
+    def _con_disponibilidad(self, disponibilidad):
+        """Productos en una situación de disponibilidad, en el orden de la licitación"""
+        return [producto for producto in self.productos if producto.disponibilidad == disponibilidad]
+
+    @property
+    def productos_analizados(self):
+        """Productos pedidos en la licitación"""
+        return len(self.productos)
+
+    @property
+    def productos_con_stock(self):
+        """Cuántos productos tienen stock suficiente"""
+        return sum(1 for producto in self.productos if producto.disponibilidad == Disponibilidad.DISPONIBLE)
+
+    @property
+    def productos_disponibles(self):
+        """Productos con stock suficiente"""
+        return self._con_disponibilidad(Disponibilidad.DISPONIBLE)
+
+    @property
+    def productos_con_stock_insuficiente(self):
+        """Productos encontrados con menos stock del pedido"""
+        return self._con_disponibilidad(Disponibilidad.INSUFICIENTE)
+
+    @property
+    def productos_sin_stock(self):
+        """Productos que no están en el inventario"""
+        return self._con_disponibilidad(Disponibilidad.SIN_STOCK)
+
+    @property
+    def posibles_coincidencias(self):
+        """Productos de los que solo hay un nombre parecido en el inventario, para revisar"""
+        return self._con_disponibilidad(Disponibilidad.POSIBLE_COINCIDENCIA)
+
+    @property
+    def alertas_caducidad(self):
+        """Productos disponibles con el lote caducado o próximo a caducar"""
+        return [producto for producto in self.productos if producto.alerta_caducidad]
+
+    @property
+    def categorias_productos(self):
+        """{categoría: (productos, disponibles)} en el orden en que aparecen"""
+        categorias = {}
+        for producto in self.productos:
+            total, disponibles = categorias.get(producto.categoria, (0, 0))
+            categorias[producto.categoria] = (
+                total + 1, disponibles + (producto.disponibilidad == Disponibilidad.DISPONIBLE)
+            )
+        return categorias
+
+    def conteos(self):
+        """(productos, disponibles, sin stock, stock insuficiente, alertas) en un solo recorrido"""
+        conteos = [0, 0, 0, 0]
+        alertas = 0
+        for producto in self.productos:
+            conteos[producto.disponibilidad] += 1
+            alertas += producto.estado_caducidad is not None
+        return len(self.productos), conteos[0], conteos[2], conteos[1], alertas
+
+    @property
+    def observaciones(self):
+        """Observaciones de la tabla de resultados (se generan al pedirlas, no se guardan)"""
+        if self.sin_descripcion:
+            return ["Sin descripción de productos"]
+        if not self.productos:
+            return ["No se identificaron productos médicos específicos"]
+        
+        sin_stock = self.productos_sin_stock
+        insuficientes = self.productos_con_stock_insuficiente
+        posibles = self.posibles_coincidencias
+        alertas = self.alertas_caducidad
+        observaciones = []
+        
+        if sin_stock:
+            nombres = [producto.nombre_visible for producto in sin_stock[:3]]
+            observaciones.append(f"Sin inventario: {', '.join(nombres)}")
+        
+        if insuficientes:
+            nombres = [f"{producto.nombre_visible} (faltan {producto.faltante})" for producto in insuficientes[:2]]
+            observaciones.append(f"Stock insuficiente: {', '.join(nombres)}")
+        
+        if posibles:
+            nombres = [f"{producto.nombre_visible} ({producto.producto_inventario}?)" for producto in posibles[:2]]
+            observaciones.append(f"Posible coincidencia, revisar: {', '.join(nombres)}")
+        
+        if alertas:
+            caducados = [producto for producto in alertas if producto.estado_caducidad == 'caducado']
+            if caducados:
+                observaciones.append(f"Productos caducados: {len(caducados)}")
+            else:
+                observaciones.append(f"Próximos a caducar: {len(alertas)}")
+        
+        disponibles = self.productos_con_stock
+        if not observaciones and disponibles:
+            observaciones.append(f"Todos los productos disponibles ({disponibles})")
+        
+        observaciones.append(f"Disponibilidad: {disponibles / len(self.productos) * 100:.0f}%")
+        return observaciones
+
+    def como_dict(self):
+        """Evaluación como diccionarios y listas (formato del JSON de detalle)"""
+        disponibles = []
+        for producto in self.productos_disponibles:
+            info = {
+                'nombre': producto.nombre_visible,
+                'cantidad_requerida': producto.cantidad_requerida,
+                'stock_disponible': producto.stock_disponible,
+                'producto_inventario': producto.producto_inventario,
+                'categoria': producto.categoria,
+                'lote': producto.lote,
+                'caducidad': producto.caducidad,
+                'lotes': [
+                    {'lote': lote, 'cantidad': unidades, 'caducidad': caducidad}
+                    for lote, unidades, caducidad in producto.lotes
+                ]
+            }
+            if producto.alerta_caducidad:
+                info['alerta_caducidad'] = {
+                    'estado': producto.estado_caducidad,
+                    'dias_restantes': producto.dias_caducidad,
+                    'alerta': True
+                }
+            disponibles.append(info)
+        
+        return {
+            'estado': self.estado.name.lower(),
+            'observaciones': self.observaciones,
+            'productos_analizados': self.productos_analizados,
+            'productos_con_stock': self.productos_con_stock,
+            'productos_sin_stock': [
+                {'nombre': producto.nombre_visible, 'cantidad_requerida': producto.cantidad_requerida, 'categoria': producto.categoria}
+                for producto in self.productos_sin_stock
+            ],
+            'productos_con_stock_insuficiente': [
+                {
+                    'nombre': producto.nombre_visible,
+                    'cantidad_requerida': producto.cantidad_requerida,
+                    'stock_disponible': producto.stock_disponible,
+                    'faltante': producto.faltante,
+                    'categoria': producto.categoria,
+                    'lotes': [
+                        {'lote': lote, 'cantidad': unidades, 'caducidad': caducidad}
+                        for lote, unidades, caducidad in producto.lotes
+                    ]
+                }
+                for producto in self.productos_con_stock_insuficiente
+            ],
+            'productos_disponibles': disponibles,
+            'posibles_coincidencias': [
+                {
+                    'nombre': producto.nombre_visible,
+                    'cantidad_requerida': producto.cantidad_requerida,
+                    'producto_inventario': producto.producto_inventario,
+                    'categoria': producto.categoria,
+                    'lote': producto.lote,
+                    'caducidad': producto.caducidad
+                }
+                for producto in self.posibles_coincidencias
+            ],
+            'alertas_caducidad': [
+                {'producto': producto.nombre, 'estado': producto.estado_caducidad, 'dias': producto.dias_caducidad}
+                for producto in self.alertas_caducidad
+            ],
+            'categorias_productos': {
+                categoria: {'total': total, 'disponibles': disponibles}
+                for categoria, (total, disponibles) in self.categorias_productos.items()
+            },
+            'documentos_necesarios': list(self.documentos_necesarios)
+        }
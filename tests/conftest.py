@@ -0,0 +1,5 @@
+"""Configuración de pytest: los módulos del proyecto se importan desde la raíz del repositorio"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
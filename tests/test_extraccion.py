@@ -0,0 +1,32 @@
+"""Pruebas de la extracción de productos y cantidades de las descripciones"""
+import pytest
+
+from extraccion import extraer_productos_medicos
+
+def cantidades(descripcion):
+    """{producto: cantidad} extraídos de la descripción"""
+    return {producto.nombre: producto.cantidad for producto in extraer_productos_medicos(descripcion)}
+
+@pytest.mark.parametrize('descripcion, esperado', [
+    # El producto va antes de la dosis y la cantidad, después
+    ("doxiciclina 500mg 20", {'doxiciclina': 20}),
+    ("ATENOLOL 500mg 250", {'atenolol': 250}),
+    ("DESFIBRILADOR 250 mg 100", {'desfibrilador': 100}),
+    ("ibuprofeno 400mg x 200, paracetamol x 300", {'ibuprofeno': 200, 'paracetamol': 300}),
+    ("jeringas 5ml 2000 piezas", {'jeringas': 2000}),
+])
+def test_producto_antes_de_la_dosis(descripcion, esperado):
+    """La cantidad es el número que sigue a la dosis, no la dosis"""
+    assert cantidades(descripcion) == esperado
+
+def test_solo_dosis():
+    """Sin otra cantidad, el producto se conserva con la dosis como cantidad"""
+    assert cantidades("ibuprofeno 400mg") == {'ibuprofeno': 400}
+
+def test_cantidad_antes_del_producto():
+    """El orden habitual, cantidad y después producto, sigue funcionando"""
+    assert cantidades("100 unidades de paracetamol") == {'paracetamol': 100}
+
+def test_sin_productos():
+    """Una descripción sin productos del catálogo no extrae nada"""
+    assert cantidades("servicio de mantenimiento de instalaciones") == {}
@@ -0,0 +1,110 @@
+"""Pruebas de la búsqueda de lotes en el inventario"""
+from datetime import datetime
+
+import pandas as pd
+
+from difuso import es_errata
+from motor import buscar_en_inventario, construir_indice_inventario, evaluar_licitaciones, lotes_producto
+from registros import Disponibilidad, Estado, ProductoExtraido
+
+FECHA_REFERENCIA = datetime(2026, 6, 1)
+
+def inventario(filas):
+    """Inventario de prueba con filas (nombre, stock, lote, caducidad)"""
+    return pd.DataFrame(filas, columns=['nombre', 'stock', 'lote', 'caducidad'])
+
+def buscar(producto, cantidad, inventario_df):
+    """Resultado de buscar el producto en el inventario a la fecha de referencia"""
+    indice = construir_indice_inventario(inventario_df, FECHA_REFERENCIA)
+    return buscar_en_inventario(ProductoExtraido(producto, cantidad), inventario_df, indice)
+
+def test_sinonimo_dentro_de_otra_palabra():
+    """'asa' dentro de 'gasas' no suma el stock de las gasas a la aspirina"""
+    inventario_df = inventario([
+        ("Gasas esteriles 10x10", 5000, 'G1', '2027-01-01'),
+        ("Aspirina 500mg", 10, 'A1', '2027-01-01'),
+    ])
+    resultado = buscar('aspirina', 100, inventario_df)
+    assert [posicion for posicion, _ in resultado['lotes']] == [1]
+    assert resultado['stock_disponible'] == 10
+
+def test_palabra_completa_con_puntuacion():
+    """El nombre pegado a la dosis o entre paréntesis cuenta como palabra completa"""
+    inventario_df = inventario([
+        ("Paracetamol500mg", 4, 'P1', '2027-01-01'),
+        ("(Paracetamol) tabletas", 6, 'P2', '2027-01-01'),
+        ("Medidor CO2", 5, 'M1', '2027-01-01'),
+        ("Oxigeno medicinal", 3, 'O1', '2027-01-01'),
+    ])
+    indice = construir_indice_inventario(inventario_df, FECHA_REFERENCIA)
+    assert lotes_producto(indice, 'paracetamol') == [0, 1]
+    # 'o2' es sinónimo de oxígeno, pero no dentro de 'co2'
+    assert lotes_producto(indice, 'oxigeno') == [3]
+
+def test_lotes_en_orden_fefo():
+    """Se toma primero el lote que caduca antes, después los sin fecha y al final los caducados"""
+    inventario_df = inventario([
+        ("Ibuprofeno 400mg", 100, 'CADUCADO', '2026-01-01'),
+        ("Ibuprofeno 400mg", 100, 'SIN_FECHA', None),
+        ("Ibuprofeno 400mg", 100, 'TARDE', '2028-01-01'),
+        ("Ibuprofeno 400mg", 100, 'PRONTO', '2027-01-01'),
+    ])
+    resultado = buscar('ibuprofeno', 350, inventario_df)
+    assert [(posicion, unidades) for posicion, unidades in resultado['lotes']] == [(3, 100), (2, 100), (1, 100), (0, 50)]
+    assert resultado['lote'] == 'PRONTO'
+    assert resultado['stock_disponible'] == 400 and resultado['stock_suficiente']
+
+def test_lotes_sin_stock_se_saltan():
+    """Un lote vacío no aporta unidades aunque caduque antes"""
+    inventario_df = inventario([
+        ("Jeringas 5ml", 0, 'VACIO', '2026-07-01'),
+        ("Jeringas 5ml", 50, 'LLENO', '2027-01-01'),
+    ])
+    resultado = buscar('jeringas', 20, inventario_df)
+    assert resultado['lotes'] == ((1, 20),)
+
+def evaluar(descripcion, inventario_df):
+    """Evaluación de una licitación con la descripción dada"""
+    licitaciones_df = pd.DataFrame({'id': [1], 'nombre': ["Prueba"], 'descripcion': [descripcion]})
+    indice = construir_indice_inventario(inventario_df, FECHA_REFERENCIA)
+    return evaluar_licitaciones(licitaciones_df, inventario_df, indice_inventario=indice)[0]
+
+def test_errata_frente_a_otra_palabra():
+    """Una o dos letras cambiadas son una errata; un fragmento añadido es otra palabra"""
+    assert es_errata('amoxicilina', 'amoxicilna')
+    assert es_errata('lorazepam', 'lorazepma')
+    assert not es_errata('lorazepam', 'lormetazepam')
+
+def test_errata_es_posible_coincidencia():
+    """Un nombre mal escrito se muestra para revisarlo, sin contar su stock"""
+    inventario_df = inventario([("Amoxicilna 500mg", 300, 'A1', '2027-01-01')])
+    resultado = buscar('amoxicilina', 50, inventario_df)
+    assert not resultado['encontrado'] and resultado['posible_coincidencia']
+    assert resultado['stock_disponible'] == 0
+    
+    evaluacion = evaluar("50 unidades de amoxicilina", inventario_df)
+    producto, = evaluacion.productos
+    assert producto.disponibilidad == Disponibilidad.POSIBLE_COINCIDENCIA
+    assert producto.producto_inventario == "Amoxicilna 500mg"
+    assert evaluacion.estado == Estado.AMARILLO
+
+def test_otro_farmaco_parecido_no_es_coincidencia():
+    """'lormetazepam' se parece a 'lorazepam' (Dice 0.70), pero su stock no es de lorazepam"""
+    inventario_df = inventario([("Lormetazepam 1mg", 500, 'L1', '2027-01-01')])
+    resultado = buscar('lorazepam', 100, inventario_df)
+    assert not resultado['encontrado'] and not resultado['posible_coincidencia']
+    
+    evaluacion = evaluar("100 unidades de lorazepam", inventario_df)
+    assert evaluacion.productos[0].disponibilidad == Disponibilidad.SIN_STOCK
+    assert evaluacion.estado == Estado.ROJO
+
+def test_solo_el_candidato_mas_parecido():
+    """De varias palabras parecidas solo cuenta la más parecida, no todas las que pasan el umbral"""
+    inventario_df = inventario([
+        ("Amoxicilna 500mg", 300, 'A1', '2027-01-01'),
+        ("Amoxicillin 500mg", 200, 'A2', '2027-01-01'),
+    ])
+    indice = construir_indice_inventario(inventario_df, FECHA_REFERENCIA)
+    resultado = buscar_en_inventario(ProductoExtraido('amoxicilina', 50), inventario_df, indice)
+    assert resultado['producto_match'] == "Amoxicilna 500mg"
+    assert indice['aproximados']['amoxicilina'] == [0]